@@ -0,0 +1,191 @@
+import hashlib
+import random
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from wagtail.wagtailcore.models import Page
+
+_random = random.SystemRandom()
+
+# backends not shared between processes, the versions incremented by one process
+# would not invalidate the entries cached by the others
+LOCAL_CACHE_BACKENDS = (LocMemCache, DummyCache)
+
+
+def get_cache():
+    """
+    Returns the cache of the API responses or None if disabled, i.e. if settings.API_CACHE_ALIAS
+    is not set or it's not a cache shared between processes.
+    """
+    if not settings.API_CACHE_ALIAS:
+        return None
+
+    cache = caches[settings.API_CACHE_ALIAS]
+    if isinstance(cache, LOCAL_CACHE_BACKENDS):
+        return None
+    return cache
+
+
+def get_page_dependency(page_id):
+    return 'page:{}'.format(page_id)
+
+
+def get_image_dependency(image_id):
+    return 'image:{}'.format(image_id)
+
+
+def get_payload_dependencies(page_ids, image_ids):
+    """
+    Returns the list of dependencies of a payload including the given pages and images.
+    """
+    return (
+        [get_page_dependency(page_id) for page_id in page_ids] +
+        [get_image_dependency(image_id) for image_id in image_ids]
+    )
+
+
+def get_version_key(dependency):
+    return 'api:version:{}'.format(dependency)
+
+
+def get_response_key(*parts):
+    """
+    Returns the cache key of a response identified by `parts`
+    (e.g. endpoint, site, lookup and query string).
+    """
+    return 'api:response:{}'.format(
+        hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    )
+
+
+def get_dependency_versions(dependencies):
+    """
+    Returns a dict of {dependency: current version} for the given `dependencies`.
+
+    Dependencies without a version (never seen or evicted) get a new random one so that
+    entries built with a previous version of them can't be considered valid by mistake.
+
+    This has to be called before building the entry so that changes happening in the
+    meantime invalidate it.
+    """
+    cache = get_cache()
+    if not cache:
+        return {}
+
+    keys = {get_version_key(dependency): dependency for dependency in dependencies}
+
+    versions = cache.get_many(keys.keys())
+    missing_keys = set(keys) - set(versions)
+    for key in missing_keys:
+        cache.add(key, _random.randint(1, 2 ** 31), timeout=None)
+
+    if missing_keys:
+        versions.update(cache.get_many(missing_keys))
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def get_cached_response(key):
+    """
+    Returns the cached entry with the given `key` if it exists and none of its dependencies
+    changed since it was built, None otherwise.
+
+    An entry is a dict with the keys `content`, `etag` and `dependencies`.
+    """
+    cache = get_cache()
+    if not cache:
+        return None
+
+    entry = cache.get(key)
+    if not entry:
+        return None
+
+    dependencies = entry['dependencies']
+    versions = cache.get_many([get_version_key(dependency) for dependency in dependencies])
+    for dependency, version in dependencies.items():
+        if versions.get(get_version_key(dependency)) != version:
+            return None
+    return entry
+
+
+def set_cached_response(key, content, dependencies, etag=''):
+    """
+    Caches the rendered `content` with its validators.
+
+    `dependencies` is the dict of {dependency: version} as returned by `get_dependency_versions`.
+    """
+    cache = get_cache()
+    if not cache:
+        return
+
+    cache.set(
+        key, {
+            'content': content,
+            'etag': etag,
+            'dependencies': dependencies,
+        },
+        timeout=settings.API_CACHE_TIMEOUT
+    )
+
+
+def invalidate_dependencies(dependencies):
+    """
+    Increments the versions of `dependencies` so that all the entries built with them
+    are not valid any more.
+    """
+    cache = get_cache()
+    if not cache:
+        return
+
+    for dependency in dependencies:
+        try:
+            cache.incr(get_version_key(dependency))
+        except ValueError:  # no version, no entries depending on it
+            pass
+
+
+def invalidate_page_dependencies(page):
+    """
+    Invalidates the entries that include data about `page`.
+
+    Entries depend on all the pages in their payload so this only has to invalidate:
+        - the page itself
+        - its parent, whose children (and the siblings of the children) might have changed
+        - its descendants with a stale url_path (e.g. after moving the page or changing its slug)
+    """
+    if not get_cache():
+        return
+
+    page_ids = {page.pk}
+    if page.depth > 1:
+        page_ids.update(
+            Page.objects.filter(
+                path=Page._get_basepath(page.path, page.depth - 1)
+            ).values_list('pk', flat=True)
+        )
+    page_ids.update(
+        Page.objects.filter(
+            path__startswith=page.path
+        ).exclude(
+            url_path__startswith=page.url_path
+        ).values_list('pk', flat=True)
+    )
+    invalidate_dependencies(get_page_dependency(page_id) for page_id in page_ids)
+
+
+def invalidate_descendant_dependencies(page):
+    """
+    Invalidates the entries of `page` and all its descendants.
+    """
+    if not get_cache():
+        return
+
+    invalidate_dependencies(
+        get_page_dependency(page_id)
+        for page_id in Page.objects.filter(path__startswith=page.path).values_list('pk', flat=True)
+    )
+
+
+def invalidate_image_dependencies(image):
+    invalidate_dependencies([get_image_dependency(image.pk)])
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_pagesnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pagesnapshot',
+            name='etag',
+            field=models.CharField(blank=True, max_length=40),
+        ),
+    ]
@@ -0,0 +1,27 @@
+from django.contrib.postgres.fields import ArrayField
+from django.db import models
+
+
+class PageSnapshot(models.Model):
+    """
+    Pre-rendered content API payload of a live page.
+
+    It's created when the page gets published (or the first time it gets requested)
+    and deleted every time the page or one of its neighbours changes so that the
+    API can serve it without serializing the page again.
+    """
+    page = models.OneToOneField(
+        'wagtailcore.Page', on_delete=models.CASCADE,
+        primary_key=True, related_name='api_snapshot'
+    )
+    site = models.ForeignKey('wagtailcore.Site', on_delete=models.CASCADE)
+    url_path = models.TextField(db_index=True)
+    content = models.BinaryField()
+    etag = models.CharField(max_length=40, blank=True)
+    # ids of the pages and images included in the payload
+    page_ids = ArrayField(models.IntegerField(), default=list, blank=True)
+    image_ids = ArrayField(models.IntegerField(), default=list, blank=True)
+    created_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.url_path
@@ -0,0 +1,88 @@
+from collections import defaultdict
+
+from django.db.models import Q
+from wagtail.api.v2.utils import pages_for_site
+from wagtail.wagtailcore.models import Page
+
+
+class PageNeighbourhood(object):
+    """
+    The pages related to a page that are included in its API payload:
+        - parent: specific parent page or None if it's not visible from the API
+        - children: list of live child pages
+        - siblings: list of live sibling pages (including the page itself) if the parent is a guide
+    """
+    def __init__(self, parent=None, children=None, siblings=None):
+        self.parent = parent
+        self.children = children or []
+        self.siblings = siblings or []
+
+
+def get_parent_path(page):
+    return Page._get_basepath(page.path, page.depth - 1)
+
+
+def load_neighbourhoods(pages, site):
+    """
+    Returns a dict of {page id: PageNeighbourhood} for the given `pages` using a fixed
+    number of queries which doesn't depend on the number of pages, children or siblings.
+
+    The specific parent pages are also cached on the page objects so that
+    `page.get_parent().specific` doesn't hit the db again.
+    """
+    pages = list(pages)
+    if not pages:
+        return {}
+
+    # parents, as specific pages
+    parent_paths = {get_parent_path(page) for page in pages if page.depth > 1}
+    parents = {}
+    if parent_paths:
+        parents = {
+            parent.path: parent
+            for parent in Page.objects.filter(path__in=parent_paths).specific()
+        }
+    visible_parent_ids = set()
+    if parents:
+        visible_parent_ids = set(
+            pages_for_site(site).filter(
+                id__in=[parent.id for parent in parents.values()]
+            ).values_list('id', flat=True)
+        )
+
+    # children of the pages and of the guide parents (siblings) in one go
+    guide_parent_paths = {
+        path for path, parent in parents.items() if getattr(parent, 'guide', False)
+    }
+    children_of = Q()
+    for path in {page.path for page in pages} | guide_parent_paths:
+        children_of |= Q(path__startswith=path, depth=(len(path) // Page.steplen) + 1)
+
+    children_by_parent_path = defaultdict(list)
+    for child in Page.objects.filter(children_of).live().order_by('path'):
+        children_by_parent_path[get_parent_path(child)].append(child)
+
+    neighbourhoods = {}
+    for page in pages:
+        parent = parents.get(get_parent_path(page)) if page.depth > 1 else None
+        if parent:
+            page._cached_parent_obj = parent
+
+        neighbourhoods[page.pk] = PageNeighbourhood(
+            parent=parent if parent and parent.id in visible_parent_ids else None,
+            children=children_by_parent_path[page.path],
+            siblings=children_by_parent_path[parent.path] if parent and parent.path in guide_parent_paths else []
+        )
+    return neighbourhoods
+
+
+def get_neighbourhood(page, context):
+    """
+    Returns the PageNeighbourhood of `page` loading it if it's not already in the serializer `context`.
+    """
+    neighbourhoods = context.setdefault('neighbourhoods', {})
+    if page.pk not in neighbourhoods:
+        neighbourhoods.update(
+            load_neighbourhoods([page], context['request'].site)
+        )
+    return neighbourhoods[page.pk]
@@ -1,4 +1,9 @@
+import hashlib
+
+from django.conf import settings
 from django.conf.urls import url
+from django.http import Http404, HttpResponse
+from django.test import RequestFactory
 from djangorestframework_camel_case.render import CamelCaseJSONRenderer
 from oauth2_provider.ext.rest_framework import (
     OAuth2Authentication, TokenHasScope
@@ -8,15 +13,29 @@ from rest_framework.response import Response
 from wagtail.api.v2.endpoints import PagesAPIEndpoint as WagtailPagesAPIEndpoint
 from wagtail.api.v2.endpoints import BaseAPIEndpoint
 from wagtail.api.v2.router import WagtailAPIRouter
+from wagtail.api.v2.utils import BadRequestError
+from wagtail.wagtailimages import get_image_model
 
 from home.models import HomePage
 
-from .serializers import PageSerializer
+from .cache import (
+    get_cached_response, get_dependency_versions, get_payload_dependencies,
+    get_response_key, set_cached_response
+)
+from .neighbourhood import get_neighbourhood, load_neighbourhoods
+from .serializers import (
+    CachedSerializerClassMixin, PageSerializer, get_page_image_ids
+)
+from .snapshots import get_snapshot, save_snapshot
+from .validators import (
+    get_not_modified_response, get_page_etag,
+    get_payload_pages, set_validators
+)
 
 api_router = WagtailAPIRouter('wagtailapi')
 
 
-class BasePagesAPIEndpoint(WagtailPagesAPIEndpoint):
+class BasePagesAPIEndpoint(CachedSerializerClassMixin, WagtailPagesAPIEndpoint):
     authentication_classes = [OAuth2Authentication]
     permission_classes = [TokenHasScope]
     required_scopes = ['read']
@@ -38,12 +57,57 @@ class BasePagesAPIEndpoint(WagtailPagesAPIEndpoint):
         'siblings',
     ]
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.neighbourhoods = {}
+
+    def get_serializer_context(self):
+        """
+        Shares the loaded page neighbourhoods between all the serializers used by this endpoint.
+        """
+        context = super().get_serializer_context()
+        context['neighbourhoods'] = self.neighbourhoods
+        return context
+
+    def get_query_string(self):
+        return '&'.join(
+            '{}={}'.format(key, value) for key, value in sorted(self.request.GET.items())
+        )
+
+    def get_page_serializer(self, page):
+        """
+        Returns the serializer for the default detail payload of `page`.
+        """
+        serializer_class = self._get_serializer_class(
+            self.request.wagtailapi_router, type(page), [], show_details=True
+        )
+        return serializer_class(page, context=self.get_serializer_context())
+
+    def render_page(self, page):
+        """
+        Returns the JSON payload of the detail view of `page` as bytes.
+        """
+        serializer = self.get_serializer(page)
+        renderer = self.renderer_classes[0]()
+        return renderer.render(
+            serializer.data, renderer_context=self.get_renderer_context()
+        )
+
+    def get_rendered_response(self, content):
+        return HttpResponse(content, content_type=self.renderer_classes[0].media_type)
+
 
 class PagesAPIEndpoint(BasePagesAPIEndpoint):
     """
     Gets live content.
+
+    The payloads are stored as snapshots so that following requests for the same page
+    can be served without serializing it again.
     """
 
+    def detail_view(self, request, pk):
+        return self.serve_page(page_id=pk)
+
     def detail_view_by_path(self, request, path):
         """
         Same as the default view but getting the page by its path
@@ -52,9 +116,222 @@ class PagesAPIEndpoint(BasePagesAPIEndpoint):
         self.lookup_url_kwarg = 'path'
         self.kwargs[self.lookup_url_kwarg] = '/{}/{}'.format(HomePage.default_slug, path)
 
+        return self.serve_page(url_path=self.kwargs[self.lookup_url_kwarg])
+
+    def can_use_snapshots(self):
+        """
+        Snapshots only include the default payload so they can't be used if
+        the request defines query params (e.g. `fields`).
+        """
+        return not self.request.GET
+
+    def get_etag(self, page):
+        """
+        Returns the ETag of the payload of `page` without serializing it.
+        """
+        neighbourhood = get_neighbourhood(page, self.get_serializer_context())
+        image_ids = get_page_image_ids(page)
+        image_versions = []
+        if image_ids:
+            image_versions = get_image_model().objects.filter(
+                pk__in=image_ids
+            ).values_list('pk', 'version')
+        return get_page_etag(
+            page, neighbourhood,
+            query_string=self.get_query_string(), image_versions=image_versions
+        )
+
+    def get_page_dependencies(self, page):
+        """
+        Returns a tuple (page ids, image ids) of the pages and images included in the payload of `page`.
+        """
+        neighbourhood = get_neighbourhood(page, self.get_serializer_context())
+        return (
+            sorted({obj.pk for obj in get_payload_pages(page, neighbourhood)}),
+            sorted(get_page_image_ids(page))
+        )
+
+    def get_cache_key(self, **lookup):
+        return get_response_key(
+            type(self).__name__, self.request.site.pk,
+            *('{}={}'.format(key, value) for key, value in sorted(lookup.items())),
+            self.get_query_string()
+        )
+
+    def get_cached_content_response(self, content, etag):
+        return (
+            get_not_modified_response(self.request, etag) or
+            set_validators(self.get_rendered_response(content), etag)
+        )
+
+    def cache_snapshot(self, cache_key, snapshot, **lookup):
+        """
+        Caches the content of `snapshot` with the current versions of its dependencies
+        unless the snapshot got replaced while reading them.
+        """
+        dependencies = get_dependency_versions(
+            get_payload_dependencies(snapshot.page_ids, snapshot.image_ids)
+        )
+        if not dependencies:
+            return
+
+        current_snapshot = get_snapshot(self.request.site, **lookup)
+        if current_snapshot and current_snapshot.etag == snapshot.etag:
+            set_cached_response(cache_key, bytes(current_snapshot.content), dependencies, etag=snapshot.etag)
+
+    def serve_page(self, **lookup):
+        """
+        Returns the payload of the page matching `lookup` from, in order:
+            - the shared response cache
+            - the snapshot of the page if the request doesn't define query params
+            - by serializing the page, in which case both the cache and the snapshot get populated
+
+        If the client already has the current version of the page, a 304 response
+        is returned without serializing or sending the payload.
+        """
+        cache_key = self.get_cache_key(**lookup)
+        entry = get_cached_response(cache_key)
+        if entry:
+            return self.get_cached_content_response(entry['content'], entry['etag'])
+
+        use_snapshots = self.can_use_snapshots()
+        if use_snapshots:
+            snapshot = get_snapshot(self.request.site, **lookup)
+            if snapshot:
+                content = bytes(snapshot.content)
+                if snapshot.page_ids:
+                    self.cache_snapshot(cache_key, snapshot, **lookup)
+                return self.get_cached_content_response(content, snapshot.etag)
+
         instance = self.get_object()
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+        etag = self.get_etag(instance)
+        not_modified_response = get_not_modified_response(self.request, etag)
+        if not_modified_response:
+            return not_modified_response
+
+        page_ids, image_ids = self.get_page_dependencies(instance)
+        dependencies = get_dependency_versions(get_payload_dependencies(page_ids, image_ids))
+        if dependencies:
+            # the page is loaded again after reading the versions so that a change published
+            # in the meantime can't be cached with them
+            instance = self.get_object()
+            etag = self.get_etag(instance)
+            page_ids, image_ids = self.get_page_dependencies(instance)
+        content = self.render_page(instance)
+
+        set_cached_response(cache_key, content, dependencies, etag=etag)
+        if use_snapshots:
+            save_snapshot(
+                instance, self.request.site, content,
+                etag=etag, page_ids=page_ids, image_ids=image_ids
+            )
+        return set_validators(self.get_rendered_response(content), etag)
+
+    def get_bulk_lookup(self):
+        """
+        Returns a tuple (lookup field, list of (requested value, lookup value)) from
+        the query params of the bulk view.
+        """
+        if 'ids' in self.request.GET:
+            try:
+                values = [
+                    (int(value), int(value)) for value in self.request.GET['ids'].split(',')
+                ]
+            except ValueError:
+                raise BadRequestError('ids must be a comma separated list of integers')
+            lookup_field = 'id'
+        elif 'paths' in self.request.GET:
+            values = [
+                (path, '/{}/{}'.format(HomePage.default_slug, path))
+                for path in self.request.GET['paths'].split(',')
+            ]
+            lookup_field = 'url_path'
+        else:
+            raise BadRequestError('please specify either ids or paths')
+
+        if len(values) > settings.API_BULK_PAGES_LIMIT:
+            raise BadRequestError(
+                'too many pages requested, the limit is {}'.format(settings.API_BULK_PAGES_LIMIT)
+            )
+        return (lookup_field, values)
+
+    def bulk_view(self, request):
+        """
+        Returns the details of multiple pages in one go.
+        The pages are selected using either
+            - the query param `ids`: a comma separated list of page ids or
+            - the query param `paths`: a comma separated list of page paths
+
+        The details of each page are the same as the ones returned by the detail view
+        and are in the same order as requested.
+        """
+        lookup_field, values = self.get_bulk_lookup()
+
+        queryset = self.get_queryset().filter(**{
+            lookup_field + '__in': [lookup_value for _, lookup_value in values]
+        })
+        pages = {
+            getattr(page, lookup_field): page for page in queryset.specific()
+        }
+        self.neighbourhoods.update(
+            load_neighbourhoods(pages.values(), request.site)
+        )
+
+        items = []
+        not_found = []
+        for requested_value, lookup_value in values:
+            if lookup_value in pages:
+                items.append(self.get_page_serializer(pages[lookup_value]).data)
+            else:
+                not_found.append(requested_value)
+
+        return Response({
+            'meta': {
+                'total_count': len(items),
+                'not_found': not_found
+            },
+            'items': items
+        })
+
+    @classmethod
+    def get_offline_endpoint(cls, site):
+        """
+        Returns an instance of this endpoint that can be used to render pages of `site`
+        outside of the request/response cycle (e.g. when a page gets published).
+        """
+        request = RequestFactory().get('/', SERVER_NAME=site.hostname, SERVER_PORT=str(site.port))
+        request.site = site
+        request.wagtailapi_router = api_router
+
+        endpoint = cls(action_map={'get': 'detail_view'})
+        endpoint.args = ()
+        endpoint.kwargs = {}
+        endpoint.format_kwarg = None
+        endpoint.request = endpoint.initialize_request(request)
+        return endpoint
+
+    @classmethod
+    def build_snapshot(cls, page):
+        """
+        Renders and stores the snapshot of the live `page`.
+        It does nothing if the page is not visible through this endpoint (e.g. private or not live).
+        """
+        site = page.get_site()
+        if not site:
+            return
+
+        endpoint = cls.get_offline_endpoint(site)
+        endpoint.kwargs['pk'] = page.pk
+        try:
+            instance = endpoint.get_object()
+        except Http404:
+            return
+
+        page_ids, image_ids = endpoint.get_page_dependencies(instance)
+        save_snapshot(
+            instance, site, endpoint.render_page(instance),
+            etag=endpoint.get_etag(instance), page_ids=page_ids, image_ids=image_ids, replace=True
+        )
 
     @classmethod
     def get_urlpatterns(cls):
@@ -62,9 +339,10 @@ class PagesAPIEndpoint(BasePagesAPIEndpoint):
         Extends the default Wagtail list of endpoints.
         """
         url_patterns = list(super().get_urlpatterns())
-        url_patterns.append(
-            url(r'^with-path/(?P<path>[\w/-]*)$', cls.as_view({'get': 'detail_view_by_path'}), name='detail_by_path')
-        )
+        url_patterns += [
+            url(r'^with-path/(?P<path>[\w/-]*)$', cls.as_view({'get': 'detail_view_by_path'}), name='detail_by_path'),
+            url(r'^bulk/$', cls.as_view({'get': 'bulk_view'}), name='bulk'),
+        ]
         return url_patterns
 
 
@@ -91,12 +369,38 @@ class PreviewPagesAPIEndpoint(BasePagesAPIEndpoint):
             revision = obj.revisions.order_by('-created_at').first()
 
         # in case of no revisions, return the object (edge case)
+        self.revision = revision
         if not revision:
             return obj
 
         base = revision.as_page_object()
         return base.specific
 
+    def get_revision_etag(self, page):
+        """
+        Returns the ETag of the payload of the selected revision of `page`.
+        """
+        return hashlib.sha1(
+            '{}|{}|{}'.format(page.pk, self.revision.pk, self.get_query_string()).encode('utf-8')
+        ).hexdigest()
+
+    def detail_view(self, request, pk):
+        """
+        Same as the default view but returning a 304 response if the client
+        already has the selected revision.
+        """
+        instance = self.get_object()
+        if not self.revision:
+            return super().detail_view(request, pk)
+
+        etag = self.get_revision_etag(instance)
+        not_modified_response = get_not_modified_response(request, etag)
+        if not_modified_response:
+            return not_modified_response
+
+        serializer = self.get_serializer(instance)
+        return set_validators(Response(serializer.data), etag)
+
     @classmethod
     def get_urlpatterns(cls):
         """
@@ -1,14 +1,67 @@
+from functools import lru_cache
+
 from wagtail.api.v2.serializers import PageParentField as WagtailPageParentField
 from wagtail.api.v2.serializers import PageSerializer as WagtailPageSerializer
 from wagtail.api.v2.serializers import Field, StreamField, get_serializer_class
 
+from images.blocks import prefetched_images
+from pages.blocks import get_stream_image_ids
+
+from .neighbourhood import get_neighbourhood
+
+# max number of generated serializer classes kept in memory by each cache
+SERIALIZER_CLASSES_CACHE_SIZE = 512
+
+
+@lru_cache(maxsize=SERIALIZER_CLASSES_CACHE_SIZE)
+def get_cached_serializer_class(model, fields, meta_fields, base):
+    """
+    Same as the Wagtail get_serializer_class but reusing the generated class
+    for the same (model, fields, meta_fields, base) instead of building a new one every time.
+
+    `fields` and `meta_fields` have to be tuples so that they can be used as cache key.
+    """
+    return get_serializer_class(model, fields, meta_fields=meta_fields, base=base)
+
 
 def get_page_serializer_class(value):
-    return get_serializer_class(
+    return get_cached_serializer_class(
         value.__class__,
-        ['id', 'type', 'detail_url', 'html_url', 'title', 'slug'],
-        meta_fields=['type', 'detail_url', 'html_url'],
-        base=PageSerializer
+        ('id', 'type', 'detail_url', 'html_url', 'title', 'slug'),
+        ('type', 'detail_url', 'html_url'),
+        PageSerializer
+    )
+
+
+def freeze_fields_config(fields_config):
+    """
+    Returns the parsed `fields` query param as nested tuples so that it can be used as cache key.
+    """
+    return tuple(
+        (field_name, negated, freeze_fields_config(sub_fields) if sub_fields else None)
+        for field_name, negated, sub_fields in fields_config or ()
+    )
+
+
+class CachedSerializerClassMixin(object):
+    """
+    API endpoint mixin which reuses the serializer classes built by `_get_serializer_class`
+    instead of generating new ones on every call.
+
+    The cache key includes the endpoint class (and therefore its fields, meta fields and
+    base serializer), the router, the model and the requested fields.
+    """
+    @classmethod
+    def _get_serializer_class(cls, router, model, fields_config, show_details=False, nested=False):
+        return _get_endpoint_serializer_class(
+            cls, router, model, freeze_fields_config(fields_config), show_details, nested
+        )
+
+
+@lru_cache(maxsize=SERIALIZER_CLASSES_CACHE_SIZE)
+def _get_endpoint_serializer_class(endpoint_class, router, model, fields_config, show_details, nested):
+    return super(CachedSerializerClassMixin, endpoint_class)._get_serializer_class(
+        router, model, fields_config, show_details=show_details, nested=nested
     )
 
 
@@ -31,18 +84,22 @@ class PageListField(Field):
 
 class SiblingsField(PageListField):
     def get_attribute(self, instance):
-        return instance.get_guide_siblings()
+        return get_neighbourhood(instance, self.context).siblings
 
 
 class ChildrenField(PageListField):
     def get_attribute(self, instance):
-        return instance.get_live_children()
+        return get_neighbourhood(instance, self.context).children
 
 
 class PageParentField(WagtailPageParentField):
     """
-    Like the Wagtail PageParentField but using a consistent page serializer.
+    Like the Wagtail PageParentField but using a consistent page serializer
+    and the preloaded page neighbourhood.
     """
+    def get_attribute(self, instance):
+        return get_neighbourhood(instance, self.context).parent
+
     def to_representation(self, value):
         serializer_class = get_page_serializer_class(value)
         serializer = serializer_class(context=self.context)
@@ -55,6 +112,9 @@ class ContentField(Field):
     The param `fields` is a list of tuples (field name, serializer field) of the content fields
     to be returned.
 
+    The images referenced anywhere in the StreamField values are loaded in one go
+    before serializing them.
+
     Example of returned value:
         {
             "header": [
@@ -82,15 +142,25 @@ class ContentField(Field):
         content = {}
 
         if page:
-            for field_name, serializer_field in self.fields:
-                if hasattr(page, field_name):
-                    value = getattr(page, field_name)
-
-                    field = serializer_field()
-                    field.context = dict(self.context)
-                    content[field_name] = field.to_representation(value)
+            with prefetched_images(self.get_image_ids(page)):
+                for field_name, serializer_field in self.fields:
+                    if hasattr(page, field_name):
+                        value = getattr(page, field_name)
+
+                        field = serializer_field()
+                        field.context = dict(self.context)
+                        content[field_name] = field.to_representation(value)
         return content
 
+    def get_image_ids(self, page):
+        """
+        Returns the set of ids of the images referenced in the content fields of `page`.
+        """
+        image_ids = set()
+        for field_name, _ in self.fields:
+            image_ids |= get_stream_image_ids(getattr(page, field_name, None))
+        return image_ids
+
 
 class PageSerializer(WagtailPageSerializer):
     parent = PageParentField(read_only=True)
@@ -103,3 +173,10 @@ class PageSerializer(WagtailPageSerializer):
         ],
         read_only=True
     )
+
+
+def get_page_image_ids(page):
+    """
+    Returns the set of ids of the images included in the API payload of `page`.
+    """
+    return PageSerializer._declared_fields['content'].get_image_ids(page)
@@ -0,0 +1,51 @@
+from django.db.models.signals import post_delete, post_save
+from wagtail.wagtailcore.models import PageViewRestriction, get_page_models
+from wagtail.wagtailcore.signals import page_published
+from wagtail.wagtailimages import get_image_model
+
+from .cache import (
+    invalidate_descendant_dependencies, invalidate_image_dependencies,
+    invalidate_page_dependencies
+)
+from .snapshots import (
+    invalidate_descendant_snapshots, invalidate_image_snapshots,
+    invalidate_page_snapshots
+)
+
+
+def page_changed_signal_handler(instance, **kwargs):
+    invalidate_page_snapshots(instance)
+    invalidate_page_dependencies(instance)
+
+
+def page_published_signal_handler(instance, **kwargs):
+    from .router import PagesAPIEndpoint
+
+    PagesAPIEndpoint.build_snapshot(instance)
+
+
+def view_restriction_changed_signal_handler(instance, **kwargs):
+    invalidate_descendant_snapshots(instance.page)
+    invalidate_descendant_dependencies(instance.page)
+
+
+def image_changed_signal_handler(instance, **kwargs):
+    if not kwargs.get('created', False):
+        invalidate_image_snapshots(instance)
+        invalidate_image_dependencies(instance)
+
+
+def register_signal_handlers():
+    Image = get_image_model()
+
+    # connected per page model so that saving other models doesn't trigger the handler
+    for model in get_page_models():
+        post_save.connect(page_changed_signal_handler, sender=model)
+        post_delete.connect(page_changed_signal_handler, sender=model)
+    page_published.connect(page_published_signal_handler)
+
+    post_save.connect(view_restriction_changed_signal_handler, sender=PageViewRestriction)
+    post_delete.connect(view_restriction_changed_signal_handler, sender=PageViewRestriction)
+
+    post_save.connect(image_changed_signal_handler, sender=Image)
+    post_delete.connect(image_changed_signal_handler, sender=Image)
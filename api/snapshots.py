@@ -0,0 +1,82 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from wagtail.wagtailcore.models import Page
+
+from .models import PageSnapshot
+
+
+def get_snapshot(site, **lookup):
+    """
+    Returns the snapshot of the page in `site` matching `lookup` or None if it doesn't exist.
+    """
+    return PageSnapshot.objects.filter(site=site, **lookup).first()
+
+
+def save_snapshot(page, site, content, etag='', page_ids=(), image_ids=(), replace=False):
+    """
+    Stores the rendered API `content` of `page` together with its validators and
+    the ids of the pages and images included in it.
+
+    If `replace` == False and a snapshot already exists, the existing one is kept.
+    This is so that a request serializing the page at the same time as it gets published
+    cannot overwrite the fresher snapshot created by the publish action.
+    """
+    if replace:
+        PageSnapshot.objects.update_or_create(
+            page_id=page.pk,
+            defaults={
+                'site': site,
+                'url_path': page.url_path,
+                'content': content,
+                'etag': etag,
+                'page_ids': list(page_ids),
+                'image_ids': list(image_ids),
+            }
+        )
+        return
+
+    try:
+        with transaction.atomic():
+            PageSnapshot.objects.create(
+                page_id=page.pk, site=site, url_path=page.url_path, content=content,
+                etag=etag, page_ids=list(page_ids), image_ids=list(image_ids)
+            )
+    except IntegrityError:
+        pass
+
+
+def get_neighbourhood_q(page):
+    """
+    Returns a Q object matching the pages whose API payload includes data about `page`:
+    the page itself, its parent, its siblings and its children.
+    """
+    q = Q(pk=page.pk) | Q(path__startswith=page.path, depth=page.depth + 1)
+    if page.depth > 1:
+        parent_path = Page._get_basepath(page.path, page.depth - 1)
+        q |= Q(path=parent_path) | Q(path__startswith=parent_path, depth=page.depth)
+    return q
+
+
+def invalidate_page_snapshots(page):
+    """
+    Deletes the snapshots that include data about `page` together with the snapshots
+    of its descendants with a stale url_path (e.g. after moving the page or changing its slug).
+    """
+    PageSnapshot.objects.filter(
+        Q(page__in=Page.objects.filter(get_neighbourhood_q(page))) |
+        (Q(page__path__startswith=page.path) & ~Q(url_path__startswith=page.url_path))
+    ).delete()
+
+
+def invalidate_descendant_snapshots(page):
+    """
+    Deletes the snapshots of `page` and all its descendants.
+    """
+    PageSnapshot.objects.filter(page__path__startswith=page.path).delete()
+
+
+def invalidate_image_snapshots(image):
+    """
+    Deletes the snapshots that include data about `image`.
+    """
+    PageSnapshot.objects.filter(image_ids__contains=[image.pk]).delete()
@@ -0,0 +1,65 @@
+from django.core.urlresolvers import reverse
+from django.test import override_settings
+
+from .test_hierarchy import HierarchyBaseTestCase
+
+
+class BulkEndpointTestCase(HierarchyBaseTestCase):
+    """
+    Tests related to the bulk endpoint of the Content API.
+    """
+    def get_bulk_response(self, **params):
+        return self.client.get(
+            reverse('wagtailapi:pages:bulk'), params,
+            **self.get_auth_header(self.nhsuk_frontend_token.token)
+        )
+
+    def test_by_ids(self):
+        """
+        Tests that the items are the same as the detail responses and in the requested order.
+        """
+        response = self.get_bulk_response(ids='{},{}'.format(self.page2.id, self.page1.id))
+        self.assertEqual(response.status_code, 200)
+
+        data = response.json()
+        self.assertEqual(data['meta']['totalCount'], 2)
+        self.assertEqual(data['meta']['notFound'], [])
+        self.assertEqual(
+            data['items'],
+            [
+                self.get_content_api_response(page_id=self.page2.id).json(),
+                self.get_content_api_response(page_id=self.page1.id).json(),
+            ]
+        )
+
+    def test_by_paths(self):
+        path = self.page1.url_path.split('/', 2)[-1]
+        response = self.get_bulk_response(paths='{},invalid/'.format(path))
+        self.assertEqual(response.status_code, 200)
+
+        data = response.json()
+        self.assertEqual(data['meta']['totalCount'], 1)
+        self.assertEqual(data['meta']['notFound'], ['invalid/'])
+        self.assertEqual(data['items'][0]['id'], self.page1.id)
+
+    def test_not_live(self):
+        """
+        Tests that pages not live are reported as not found.
+        """
+        response = self.get_bulk_response(ids='{},{}'.format(self.page1.id, self.page3.id))
+        data = response.json()
+        self.assertEqual([item['id'] for item in data['items']], [self.page1.id])
+        self.assertEqual(data['meta']['notFound'], [self.page3.id])
+
+    def test_invalid_ids(self):
+        response = self.get_bulk_response(ids='1,a')
+        self.assertEqual(response.status_code, 400)
+
+    def test_no_lookup(self):
+        response = self.get_bulk_response()
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(API_BULK_PAGES_LIMIT=1)
+    def test_too_many_pages(self):
+        response = self.get_bulk_response(ids='{},{}'.format(self.page1.id, self.page2.id))
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,130 @@
+import json
+
+from api.models import PageSnapshot
+from images.factories import ImageFactory
+
+from .test_hierarchy import HierarchyBaseTestCase
+
+
+class ConditionalRequestsTestCase(HierarchyBaseTestCase):
+    """
+    Tests related to the ETag header of the Content API.
+    """
+    def get_conditional_headers(self, **headers):
+        headers.update(
+            self.get_auth_header(self.nhsuk_frontend_token.token)
+        )
+        return headers
+
+    def test_validators(self):
+        """
+        Tests that the response includes the ETag header, which doesn't change between requests,
+        and no Last-Modified header.
+        """
+        self.page1.save_revision().publish()
+
+        response = self.get_content_api_response(page_id=self.page1.id)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['ETag'])
+        self.assertFalse(response.has_header('Last-Modified'))
+
+        # the second response comes from the snapshot
+        second_response = self.get_content_api_response(page_id=self.page1.id)
+        self.assertEqual(second_response['ETag'], response['ETag'])
+        self.assertFalse(second_response.has_header('Last-Modified'))
+
+    def test_if_none_match(self):
+        """
+        Tests that if the client already has the current version of the page, it returns 304.
+        """
+        response = self.get_content_api_response(page_id=self.page1.id)
+
+        for _ in range(2):  # first time from the snapshot, then without it
+            response = self.get_content_api_response(
+                page_id=self.page1.id,
+                auth_headers=self.get_conditional_headers(HTTP_IF_NONE_MATCH=response['ETag'])
+            )
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.content, b'')
+
+            PageSnapshot.objects.all().delete()
+
+    def test_if_none_match_after_changing_a_child(self):
+        """
+        Tests that if a child of the page changes, the ETag changes as well.
+        """
+        response = self.get_content_api_response(page_id=self.folder.id)
+        etag = response['ETag']
+
+        self.page1.title = 'New title'
+        self.page1.save_revision().publish()
+
+        response = self.get_content_api_response(
+            page_id=self.folder.id,
+            auth_headers=self.get_conditional_headers(HTTP_IF_NONE_MATCH=etag)
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_if_modified_since_after_deleting_a_child(self):
+        """
+        Tests that after deleting a child, a request with only If-Modified-Since gets the new payload.
+        """
+        self.page1.save_revision().publish()
+        self.get_content_api_response(page_id=self.folder.id)
+
+        page2_id = self.page2.id
+        self.page2.delete()
+
+        response = self.get_content_api_response(
+            page_id=self.folder.id,
+            auth_headers=self.get_conditional_headers(HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT')
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(
+            page2_id,
+            [child['id'] for child in json.loads(response.content.decode('utf-8'))['meta']['children']]
+        )
+
+    def test_preview_if_none_match(self):
+        """
+        Tests that if the client already has the revision of the page, it returns 304.
+        """
+        revision = self.page1.save_revision()
+
+        response = self.get_preview_content_api_response(self.page1.id, revision_id=revision.id)
+        self.assertEqual(response.status_code, 200)
+
+        response = self.get_preview_content_api_response(
+            self.page1.id, revision_id=revision.id,
+            auth_headers=self.get_conditional_headers(HTTP_IF_NONE_MATCH=response['ETag'])
+        )
+        self.assertEqual(response.status_code, 304)
+
+        new_revision = self.page1.save_revision()
+        response = self.get_preview_content_api_response(
+            self.page1.id, revision_id=new_revision.id,
+            auth_headers=self.get_conditional_headers(HTTP_IF_NONE_MATCH=response['ETag'])
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_if_none_match_after_changing_an_image(self):
+        """
+        Tests that if an image in the content of the page changes, the ETag changes as well.
+        """
+        image = ImageFactory(title='Image')
+        self.page1.main = json.dumps([{'type': 'image', 'value': image.id}])
+        self.page1.save()
+
+        response = self.get_content_api_response(page_id=self.page1.id)
+        etag = response['ETag']
+
+        image.title = 'New title'
+        image.save()
+
+        response = self.get_content_api_response(
+            page_id=self.page1.id,
+            auth_headers=self.get_conditional_headers(HTTP_IF_NONE_MATCH=etag)
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
@@ -1,5 +1,8 @@
 from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
+from api.models import PageSnapshot
 from pages.models import EditorialPage, FolderPage
 
 from .base import ContentAPIBaseTestCase
@@ -200,3 +203,51 @@ class GuideTestCase(HierarchyBaseTestCase):
             json_data = response.json()
 
             self.assertFalse(json_data['guide'])
+
+
+class NeighbourhoodQueriesTestCase(HierarchyBaseTestCase):
+    """
+    Tests that the number of queries needed to get the parent, children and siblings
+    of a page doesn't depend on the number of pages.
+    """
+
+    def add_child_pages(self, num):
+        for index in range(4, 4 + num):
+            EditorialPage.objects.create(
+                title="Page {}".format(index),
+                slug='page-{}'.format(index),
+                content_type=ContentType.objects.get_for_model(EditorialPage),
+                path='00010001{:04d}'.format(index),
+                depth=3,
+                numchild=0,
+                url_path='/folder/page-{}/'.format(index),
+            )
+        self.folder.numchild += num
+        self.folder.save()
+
+    def get_num_queries(self, page):
+        """
+        Returns the number of queries needed to serialize `page`.
+        """
+        PageSnapshot.objects.all().delete()
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.get_content_api_response(page_id=page.id)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_children(self):
+        self.get_num_queries(self.folder)  # warm up caches
+        num_queries = self.get_num_queries(self.folder)
+
+        self.add_child_pages(5)
+        self.assertEqual(self.get_num_queries(self.folder), num_queries)
+
+    def test_siblings(self):
+        self.folder.guide = True
+        self.folder.save()
+        self.get_num_queries(self.page1)  # warm up caches
+        num_queries = self.get_num_queries(self.page1)
+
+        self.add_child_pages(5)
+        self.assertEqual(self.get_num_queries(self.page1), num_queries)
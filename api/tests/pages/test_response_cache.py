@@ -0,0 +1,171 @@
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.urlresolvers import reverse
+from django.test import override_settings
+
+from api.cache import get_dependency_versions
+from api.models import PageSnapshot
+from images.factories import ImageFactory
+from pages.factories import ConditionPageFactory
+from pages.models import EditorialPage
+
+from .test_hierarchy import HierarchyBaseTestCase
+
+
+@override_settings(
+    CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.path.join(tempfile.gettempdir(), 'nhsuk-api-tests'),
+        }
+    },
+    API_CACHE_ALIAS='default'
+)
+class ResponseCacheTestCase(HierarchyBaseTestCase):
+    """
+    Tests related to the shared cache of the Content API responses.
+    """
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def test_cached(self):
+        """
+        Tests that following requests are served from the cache without using the snapshot.
+        """
+        response = self.get_content_api_response(page_id=self.page1.id)
+        PageSnapshot.objects.all().delete()
+
+        cached_response = self.get_content_api_response(page_id=self.page1.id)
+        self.assertEqual(cached_response.content, response.content)
+        self.assertEqual(cached_response['ETag'], response['ETag'])
+        self.assertFalse(PageSnapshot.objects.exists())
+
+    def test_populated_from_snapshot(self):
+        """
+        Tests that serving a snapshot populates the cache.
+        """
+        self.page1.save_revision().publish()
+        cache.clear()
+
+        response = self.get_content_api_response(page_id=self.page1.id)
+        PageSnapshot.objects.all().delete()
+
+        self.assertEqual(
+            self.get_content_api_response(page_id=self.page1.id).content,
+            response.content
+        )
+
+    def test_query_params(self):
+        """
+        Tests that responses with different query params are cached separately.
+        """
+        self.get_content_api_response(page_id=self.page1.id)
+
+        response = self.client.get(
+            '{}?fields=title'.format(reverse('wagtailapi:pages:detail', args=(self.page1.id, ))),
+            **self.get_auth_header(self.nhsuk_frontend_token.token)
+        )
+        self.assertNotIn('content', response.json())
+
+    def test_page_changed_while_serving(self):
+        """
+        Tests that a change published after loading the page but before reading the versions
+        of its dependencies doesn't get cached with the new versions.
+        """
+        PageSnapshot.objects.all().delete()
+
+        def change_page(dependencies):
+            if not changed:
+                changed.append(True)
+                page = EditorialPage.objects.get(pk=self.page1.pk)
+                page.title = 'New title'
+                page.save()
+            return get_dependency_versions(dependencies)
+
+        changed = []
+        with mock.patch('api.router.get_dependency_versions', side_effect=change_page), \
+                mock.patch('api.router.save_snapshot'):
+            self.get_content_api_response(page_id=self.page1.id)
+
+        response = self.get_content_api_response(page_id=self.page1.id)
+        self.assertEqual(response.json()['title'], 'New title')
+
+    def test_page_changed(self):
+        self.get_content_api_response(page_id=self.page1.id)
+
+        self.page1.title = 'New title'
+        self.page1.save()
+
+        response = self.get_content_api_response(page_id=self.page1.id)
+        self.assertEqual(response.json()['title'], 'New title')
+
+    def test_child_changed(self):
+        self.get_content_api_response(page_id=self.folder.id)
+
+        self.page2.title = 'New title'
+        self.page2.save()
+
+        response = self.get_content_api_response(page_id=self.folder.id)
+        children_data = response.json()['meta']['children']
+        self.assertEqual(children_data[1]['title'], 'New title')
+
+    def test_child_unpublished(self):
+        self.get_content_api_response(page_id=self.folder.id)
+
+        self.page2.unpublish()
+
+        response = self.get_content_api_response(page_id=self.folder.id)
+        children_data = response.json()['meta']['children']
+        self.assertEqual([child['id'] for child in children_data], [self.page1.id])
+
+    def test_parent_changed(self):
+        self.get_content_api_response(page_id=self.page1.id)
+
+        self.folder.guide = True
+        self.folder.save()
+
+        response = self.get_content_api_response(page_id=self.page1.id)
+        self.assertTrue(response.json()['guide'])
+
+    def test_image_changed(self):
+        image = ImageFactory(title='Image')
+        page = ConditionPageFactory(
+            title='Page',
+            main=json.dumps([{'type': 'image', 'value': image.id}])
+        )
+        self.get_content_api_response(page_id=page.id)
+        self.assertEqual(PageSnapshot.objects.get(page=page).image_ids, [image.id])
+
+        image.title = 'New title'
+        image.save()
+
+        self.assertFalse(PageSnapshot.objects.filter(page=page).exists())
+        response = self.get_content_api_response(page_id=page.id)
+        self.assertEqual(response.json()['content']['main'][0]['props']['title'], 'New title')
+
+
+@override_settings(
+    CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'api-tests',
+        }
+    },
+    API_CACHE_ALIAS='default'
+)
+class LocalResponseCacheTestCase(HierarchyBaseTestCase):
+    """
+    Tests that local-memory caches, not shared between processes, are not used.
+    """
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def test_not_cached(self):
+        self.get_content_api_response(page_id=self.page1.id)
+        self.assertFalse([key for key in cache._cache if ':api:' in key])
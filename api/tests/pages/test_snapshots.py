@@ -0,0 +1,116 @@
+from django.core.urlresolvers import reverse
+from wagtail.wagtailcore.models import Collection
+
+from api.models import PageSnapshot
+from pages.factories import ConditionPageFactory
+
+from .base import ContentAPIBaseTestCase
+from .test_hierarchy import HierarchyBaseTestCase
+
+
+class SnapshotTestCase(ContentAPIBaseTestCase):
+    """
+    Tests related to the snapshots of the live pages.
+    """
+    def setUp(self):
+        super().setUp()
+        self.page = ConditionPageFactory(title='Page')
+
+    def test_created_on_first_request(self):
+        """
+        Tests that the first request of a page stores its payload so that
+        the following ones return exactly the same content.
+        """
+        self.assertFalse(PageSnapshot.objects.filter(page=self.page).exists())
+
+        response = self.get_content_api_response(page_id=self.page.id)
+        self.assertEqual(response.status_code, 200)
+
+        snapshot = PageSnapshot.objects.get(page=self.page)
+        self.assertEqual(bytes(snapshot.content), response.content)
+
+        response = self.get_content_api_response(page_path='conditions/page/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(bytes(snapshot.content), response.content)
+
+    def test_created_on_publish(self):
+        """
+        Tests that publishing a page creates its snapshot.
+        """
+        self.page.title = 'New title'
+        self.page.save_revision().publish()
+
+        snapshot = PageSnapshot.objects.get(page=self.page)
+        self.assertEqual(snapshot.url_path, self.page.url_path)
+
+        response = self.get_content_api_response(page_id=self.page.id)
+        self.assertEqual(response.json()['title'], 'New title')
+        self.assertEqual(bytes(snapshot.content), response.content)
+
+    def test_not_used_with_query_params(self):
+        """
+        Tests that snapshots are not created or used if the request includes query params.
+        """
+        response = self.client.get(
+            '{}?fields=title'.format(reverse('wagtailapi:pages:detail', args=(self.page.id, ))),
+            **self.get_auth_header(self.nhsuk_frontend_token.token)
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(PageSnapshot.objects.filter(page=self.page).exists())
+
+    def test_not_live(self):
+        """
+        Tests that unpublishing a page deletes its snapshot.
+        """
+        self.get_content_api_response(page_id=self.page.id)
+        self.page.unpublish()
+
+        self.assertFalse(PageSnapshot.objects.filter(page=self.page).exists())
+        response = self.get_content_api_response(page_id=self.page.id)
+        self.assertEqual(response.status_code, 404)
+
+
+class SnapshotInvalidationTestCase(HierarchyBaseTestCase):
+    """
+    Tests that changing a page deletes the snapshots of the pages that include data about it.
+    """
+    def test_child_changed(self):
+        self.get_content_api_response(page_id=self.folder.id)
+
+        self.page1.title = 'New title'
+        self.page1.save()
+
+        self.assertFalse(PageSnapshot.objects.filter(page=self.folder).exists())
+
+        response = self.get_content_api_response(page_id=self.folder.id)
+        children_data = response.json()['meta']['children']
+        self.assertEqual(children_data[0]['title'], 'New title')
+
+    def test_sibling_changed(self):
+        self.get_content_api_response(page_id=self.page2.id)
+
+        self.page1.title = 'New title'
+        self.page1.save()
+
+        self.assertFalse(PageSnapshot.objects.filter(page=self.page2).exists())
+
+    def test_parent_changed(self):
+        self.get_content_api_response(page_id=self.page1.id)
+
+        self.folder.guide = True
+        self.folder.save()
+
+        self.assertFalse(PageSnapshot.objects.filter(page=self.page1).exists())
+
+        response = self.get_content_api_response(page_id=self.page1.id)
+        self.assertTrue(response.json()['guide'])
+
+    def test_other_model_saved(self):
+        """
+        Tests that saving a model which is not a page doesn't delete any snapshots.
+        """
+        self.get_content_api_response(page_id=self.page1.id)
+
+        Collection.get_first_root_node().add_child(name='Collection')
+
+        self.assertTrue(PageSnapshot.objects.filter(page=self.page1).exists())
@@ -3,7 +3,10 @@ from unittest import mock
 from django.test import TestCase
 from rest_framework.fields import CharField
 
-from ..serializers import ContentField
+from pages.models import EditorialPage
+
+from ..router import PagesAPIEndpoint
+from ..serializers import ContentField, get_page_serializer_class
 
 
 class ContentFieldTestCase(TestCase):
@@ -58,3 +61,36 @@ class ContentFieldTestCase(TestCase):
         self.assertEqual(
             value, {}
         )
+
+
+class SerializerClassCacheTestCase(TestCase):
+    """
+    Tests that the generated serializer classes are reused.
+    """
+    def test_page_serializer_class(self):
+        page = EditorialPage(title='test')
+        self.assertIs(
+            get_page_serializer_class(page),
+            get_page_serializer_class(EditorialPage(title='other'))
+        )
+
+    def test_endpoint_serializer_class(self):
+        router = mock.MagicMock()
+        serializer_class = PagesAPIEndpoint._get_serializer_class(
+            router, EditorialPage, [], show_details=True
+        )
+
+        self.assertIs(
+            PagesAPIEndpoint._get_serializer_class(router, EditorialPage, [], show_details=True),
+            serializer_class
+        )
+        self.assertIsNot(
+            PagesAPIEndpoint._get_serializer_class(
+                router, EditorialPage, [('title', False, None)], show_details=True
+            ),
+            serializer_class
+        )
+        self.assertIsNot(
+            PagesAPIEndpoint._get_serializer_class(router, EditorialPage, []),
+            serializer_class
+        )
@@ -0,0 +1,58 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+
+def get_page_etag(page, neighbourhood, query_string='', image_versions=()):
+    """
+    Returns a strong ETag for the API payload of `page`.
+
+    The payload includes data about the parent, children and siblings of the page and
+    about the images in its content so the ETag is derived from the revision timestamps
+    of all the pages and from `image_versions`, a list of (image id, version) tuples.
+    """
+    etag = hashlib.sha1(query_string.encode('utf-8'))
+    for obj in get_payload_pages(page, neighbourhood):
+        etag.update(
+            '{}|{}|{}|{}|{}|{};'.format(
+                obj.pk,
+                obj.url_path,
+                obj.title,
+                getattr(obj, 'guide', ''),
+                obj.last_published_at and obj.last_published_at.isoformat(),
+                obj.latest_revision_created_at and obj.latest_revision_created_at.isoformat(),
+            ).encode('utf-8')
+        )
+    for image_id, version in sorted(image_versions):
+        etag.update('image|{}|{};'.format(image_id, version).encode('utf-8'))
+    return etag.hexdigest()
+
+
+def get_payload_pages(page, neighbourhood):
+    pages = [page]
+    if neighbourhood.parent:
+        pages.append(neighbourhood.parent)
+    return pages + neighbourhood.children + neighbourhood.siblings
+
+
+def get_not_modified_response(request, etag):
+    """
+    Returns a 304 response if the client already has the version of the resource
+    identified by `etag` (or 412 if an If-Match precondition fails), None otherwise.
+    """
+    response = get_conditional_response(request, etag=etag)
+    if response:
+        set_validators(response, etag)
+    return response
+
+
+def set_validators(response, etag):
+    """
+    Adds the ETag header to `response`.
+
+    There is no Last-Modified header as no timestamp changes when a child or sibling
+    gets deleted, unpublished or moved or when an image changes.
+    """
+    response['ETag'] = quote_etag(etag)
+    return response
@@ -1,42 +1,93 @@
+import hashlib
 import json
 import logging
 import os
-from datetime import timedelta
+import shutil
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
 from bakery.views import BuildableMixin
-from django.core.urlresolvers import reverse
-from django.utils.timezone import now
-from oauth2_provider.models import AccessToken
-from rest_framework.test import APIClient
+from django.conf import settings
+from django.db import connection
+from django.http import Http404
+from django.test import RequestFactory
+from django.utils.functional import cached_property
+from djangorestframework_camel_case.util import camelize
+from rest_framework.utils.encoders import JSONEncoder
+from wagtail.wagtailcore.models import Site
 
+from api.router import PagesAPIEndpoint
 from pages.models import Page
 
-from .components import StructuralComponent
+from .assets import AssetStore
+from .components import StructuralComponent, get_transform_config
 
 logger = logging.getLogger(__name__)
 
 
+class ExportError(Exception):
+    """
+    Raised when some pages could not be exported.
+    `errors` is the list of (page, exception) tuples in export order.
+    """
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(
+            'Could not export {} page(s): {}'.format(
+                len(errors),
+                ', '.join('{} ({})'.format(page, exc) for page, exc in errors)
+            )
+        )
+
+
 class BakeryPageView(BuildableMixin):
     CONTENT_AREAS = ['header', 'main']
 
     def __init__(self, build_path):
         super().__init__()
         self.build_path = build_path
+        self.assets = AssetStore()
+
+    @cached_property
+    def site(self):
+        """
+        Site the pages are exported from, the same one used by the API for requests to localhost.
+        """
+        return Site.find_for_request(RequestFactory().get('/', SERVER_NAME='localhost'))
 
     def transform_content(self, obj, raw_content):
         """
-        Transforms the content returned by the API into something that the frontend expects.
-        This is because there are some differences between the frontend REST handler and the filesystem one
-        (e.g. images with different formats etc.)
+        Same as transform_data but accepting the raw JSON content returned by the API.
+        """
+        return self.transform_data(obj, json.loads(raw_content.decode('utf-8')))
+
+    def get_context(self, obj):
         """
-        content = json.loads(raw_content.decode('utf-8'))
-        context = {
+        Returns the context used by the components when exporting the page `obj`.
+        """
+        return {
             'page': obj,
             'root_path': self.build_path,
             'item_base_path': self.get_item_base_path(obj),
+            'assets': self.assets,
+            'asset_paths': [],
             'new_files': []
         }
 
+    def transform_data(self, obj, content, context=None):
+        """
+        Transforms the content returned by the API into something that the frontend expects.
+        This is because there are some differences between the frontend REST handler and the filesystem one
+        (e.g. images with different formats etc.)
+
+        `content` is the dict of the page data and gets changed in place.
+        Returns the list of (path, content) of the files to create.
+        """
+        if context is None:
+            context = self.get_context(obj)
+
         component_exporter = StructuralComponent(context)
         for area in self.CONTENT_AREAS:
             content_area = content.get('content', {}).get(area, [])
@@ -47,86 +98,361 @@ class BakeryPageView(BuildableMixin):
         content_files.append(
             (
                 os.path.join(context['item_base_path'], 'manifest.json'),
-                json.dumps(content, indent=2, sort_keys=True)
+                json.dumps(content, indent=2, sort_keys=True, cls=JSONEncoder)
             )
         )
         return content_files
 
-    def build_objects(self, ids, include_children=False):
+    def get_pages_to_build(self, ids, include_children=False):
+        """
+        Returns the ordered list of specific live pages to export: the ones with id == `ids`
+        and, if `include_children` == True, all their descendants reachable through live pages.
+        """
+        pages = Page.objects.live().filter(id__in=ids).order_by('path')
+        if not include_children:
+            return [page.specific for page in pages]
+
+        planned = []
+        planned_paths = set()
+        for root in pages:
+            if root.path in planned_paths:
+                continue
+
+            for page in Page.objects.live().descendant_of(root, inclusive=True).order_by('path'):
+                parent_path = Page._get_basepath(page.path, page.depth - 1)
+                if page.pk == root.pk or parent_path in planned_paths:
+                    planned.append(page)
+                    planned_paths.add(page.path)
+        return [page.specific for page in planned]
+
+    def map_pages(self, func, pages, workers=None):
+        """
+        Calls `func` for each page in `pages` using a pool of `workers` threads
+        (settings.EXPORTER_WORKERS by default) and yields the tuples (page, result) in order.
+
+        If `func` raises an exception, the exception is used as result.
+        At most 2 * `workers` pages are processed ahead of the one being yielded.
+        """
+        if workers is None:
+            workers = settings.EXPORTER_WORKERS
+
+        if workers <= 1:
+            for page in pages:
+                yield (page, self.call_safely(func, page))
+            return
+
+        batch_size = workers * 2
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for index in range(0, len(pages), batch_size):
+                batch = pages[index:index + batch_size]
+                yield from zip(
+                    batch, executor.map(partial(self.call_in_thread, func), batch)
+                )
+
+    def call_safely(self, func, page):
+        """
+        Returns `func(page)` or the exception raised if any.
+        """
+        try:
+            return func(page)
+        except Exception as e:
+            logger.exception('Could not export %s', page)
+            return e
+
+    def call_in_thread(self, func, page):
+        """
+        Same as call_safely but closing the db connection opened by the worker thread.
+        """
+        try:
+            return self.call_safely(func, page)
+        finally:
+            connection.close()
+
+    def build_objects(self, ids, include_children=False, workers=None):
         """
         Exports the live pages with id == `ids` including their children if `include_children` == True.
+
+        The pages are planned up front and built by a pool of `workers` threads
+        (settings.EXPORTER_WORKERS by default).
+        All the pages are attempted and, if any fails, an ExportError with all the errors is raised.
         """
-        for page in Page.objects.live().filter(id__in=ids):
-            self.build_object(page, include_children=include_children)
+        pages = self.get_pages_to_build(ids, include_children=include_children)
+
+        errors = [
+            (page, result)
+            for page, result in self.map_pages(self.build_page, pages, workers=workers)
+            if isinstance(result, Exception)
+        ]
+        if errors:
+            raise ExportError(errors)
 
     def build_object(self, obj, include_children=False):
         """
         Exports the live page `obj` including its children if `include_children` == True.
         """
+        self.build_objects([obj.pk], include_children=include_children)
+
+    def get_page_data(self, obj):
+        """
+        Returns the data of the specific page `obj` as returned by the pages API endpoint
+        by serializing it in-process instead of making a request to the API.
+        """
+        endpoint = PagesAPIEndpoint.get_offline_endpoint(self.site)
+        if not endpoint.get_queryset().filter(pk=obj.pk).exists():
+            raise Http404('{} is not available through the API'.format(obj))
+        return camelize(endpoint.get_page_serializer(obj).data)
+
+    def get_page_files(self, obj):
+        """
+        Returns the list of (path, content) of the files to create when exporting the page `obj`.
+        """
         logger.debug("Building %s" % obj)
 
         obj = obj.specific
+        return self.transform_data(obj, self.get_page_data(obj))
 
-        client = APIClient(SERVER_NAME='localhost')
-        client.handler._force_token = self.get_auth_token()
-        response = client.get(self.get_url(obj))
-
-        content_files = self.transform_content(obj, response.content)
-        for path, content in content_files:
+    def build_page(self, obj):
+        """
+        Exports the live page `obj` without its children.
+        """
+        for path, content in self.get_page_files(obj):
             self.build_file(path, content)
 
-        if include_children:
-            for child in obj.get_live_children():
-                self.build_object(child, include_children=include_children)
-
     def build_file(self, path, content, *args, **kargs):
         """
         Saves the `content` in a file with the given `path`.
         """
         folder_path = os.path.dirname(path)
-        os.path.exists(folder_path) or os.makedirs(folder_path)
+        os.makedirs(folder_path, exist_ok=True)
 
         # if file
         if hasattr(content, 'file'):
             content.file.open('rb')
-            with open(path, 'wb+') as destination:
-                for chunk in content.file.chunks():
-                    destination.write(chunk)
+            try:
+                with open(path, 'wb+') as destination:
+                    for chunk in content.file.chunks():
+                        destination.write(chunk)
+            finally:
+                content.file.close()
             return
 
         # if text
         content = content.encode('utf-8')
         return super().build_file(path, content, *args, **kargs)
 
-    def get_url(self, obj):
+    def get_item_base_path(self, obj):
         """
-        Returns the url to the page detail API for the object `obj`.
+        Returns the path to the folder that will contain the export of the object `obj`.
         """
-        return reverse('wagtailapi:pages:detail', kwargs={'pk': obj.pk})
+        return os.path.join(self.build_path, obj.url[1:])
 
-    def get_auth_token(self):
+
+class IncrementalBakeryPageView(BakeryPageView):
+    """
+    Same as BakeryPageView but only rebuilding what changed since the previous export
+    to the same folder.
+
+    A manifest with the hash of the API data and of the transform configuration (see get_transform_config),
+    the list of files and the list of shared assets (e.g. images) of each exported page is kept in the build folder.
+    A page is rebuilt only if its hash changed or any of its files or assets is missing,
+    assets are only written if they are not already there and the files and assets
+    not used any more are deleted.
+    """
+    MANIFEST_FILENAME = '.export-manifest.json'
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.build_path, self.MANIFEST_FILENAME)
+
+    def load_manifest(self):
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return {'pages': {}}
+
+    def save_manifest(self, manifest):
+        os.makedirs(self.build_path, exist_ok=True)
+        with open(self.manifest_path, 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+
+    @cached_property
+    def transform_config(self):
+        return get_transform_config()
+
+    def file_exists(self, relative_path):
+        return os.path.exists(os.path.join(self.build_path, relative_path))
+
+    def build_page(self, obj):
         """
-        Instantiate a valid auth token to be used for the request.
+        Exports the page `obj` if its data changed since the previous export and
+        returns its manifest entry.
         """
-        return AccessToken(
-            scope='read',
-            expires=now() + timedelta(days=1)
-        )
+        obj = obj.specific
+        data = self.get_page_data(obj)
+        payload_hash = hashlib.sha1(
+            json.dumps([data, self.transform_config], sort_keys=True, cls=JSONEncoder).encode('utf-8')
+        ).hexdigest()
 
-    def get_item_base_path(self, obj):
+        previous_entry = self.previous_manifest['pages'].get(str(obj.pk))
+        if (
+            previous_entry and previous_entry['hash'] == payload_hash and
+            all(self.file_exists(path) for path in self.get_entry_paths(previous_entry))
+        ):
+            logger.debug("Skipping unchanged %s" % obj)
+            return previous_entry
+
+        logger.debug("Building %s" % obj)
+        context = self.get_context(obj)
+        files = self.transform_data(obj, data, context=context)
+
+        asset_paths = set(context['asset_paths'])
+        for path, content in files:
+            self.build_file(path, content)
+
+        return {
+            'hash': payload_hash,
+            'files': [
+                os.path.relpath(path, self.build_path)
+                for path, _ in files if path not in asset_paths
+            ],
+            'assets': sorted({
+                os.path.relpath(path, self.build_path) for path in asset_paths
+            }),
+        }
+
+    def get_entry_paths(self, entry):
         """
-        Returns the path to the folder that will contain the export of the object `obj`.
-        It creates those folder if they don't exist.
+        Returns the relative paths of all the files and assets of the manifest `entry`.
         """
-        path = os.path.join(self.build_path, obj.url[1:])
-        os.path.exists(path) or os.makedirs(path)
-        return path
+        return entry['files'] + entry.get('assets', [])
 
+    def delete_files(self, relative_paths):
+        """
+        Deletes the files with the given paths and their folders if they become empty.
+        """
+        for relative_path in relative_paths:
+            path = os.path.join(self.build_path, relative_path)
+            if os.path.exists(path):
+                os.remove(path)
+
+            folder = os.path.dirname(path)
+            while os.path.abspath(folder) != os.path.abspath(self.build_path):
+                try:
+                    os.rmdir(folder)
+                except OSError:  # not empty
+                    break
+                folder = os.path.dirname(folder)
 
-def export(build_dir, page_ids):
+    def build_objects(self, ids, include_children=False, workers=None):
+        """
+        Same as BakeryPageView.build_objects but only rebuilding the pages that changed
+        and deleting the files that are not part of the export any more.
+
+        The pages that fail keep their previous files and manifest entry.
+        """
+        self.previous_manifest = self.load_manifest()
+        self.assets = AssetStore(
+            os.path.join(self.build_path, path)
+            for entry in self.previous_manifest['pages'].values()
+            for path in entry.get('assets', [])
+            if self.file_exists(path)
+        )
+
+        pages = self.get_pages_to_build(ids, include_children=include_children)
+
+        manifest = {'pages': {}}
+        errors = []
+        for page, result in self.map_pages(self.build_page, pages, workers=workers):
+            if isinstance(result, Exception):
+                errors.append((page, result))
+                result = self.previous_manifest['pages'].get(str(page.pk))
+            if result:
+                manifest['pages'][str(page.pk)] = result
+
+        def get_files(manifest):
+            return {
+                path for entry in manifest['pages'].values() for path in self.get_entry_paths(entry)
+            }
+
+        self.delete_files(sorted(get_files(self.previous_manifest) - get_files(manifest)))
+        self.save_manifest(manifest)
+
+        if errors:
+            raise ExportError(errors)
+
+
+def export(build_dir, page_ids, workers=None, incremental=False):
     """
-    Exports the live pages with id == `page_ids` to the folder `build_dir` including their children pages.
+    Exports the live pages with id == `page_ids` to the folder `build_dir` including their children pages
+    using `workers` threads (settings.EXPORTER_WORKERS by default).
+
+    If `incremental` == True, only the pages that changed since the previous export to `build_dir`
+    are rebuilt and the pages not exported any more are deleted.
     """
-    BakeryPageView(build_dir).build_objects(
-        page_ids, include_children=True
+    view_class = IncrementalBakeryPageView if incremental else BakeryPageView
+    view_class(build_dir).build_objects(
+        page_ids, include_children=True, workers=workers
     )
+
+
+class ZipStream(object):
+    """
+    Write-only, unseekable file-like object which keeps the bytes written by a ZipFile
+    until they are popped so that they can be streamed.
+    """
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def export_zip(root_dir, page_ids, workers=None):
+    """
+    Exports the live pages with id == `page_ids` including their children pages as zip
+    with all the files inside the folder `root_dir`.
+
+    All the pages are exported to a temporary folder before returning so that an ExportError is raised
+    straightaway if any of them fails, then it returns an iterator of the zip data in chunks so that it can
+    be streamed without keeping the whole zip in memory.
+    Only the path of one file at a time is kept in memory, the files are read from the temporary folder
+    as they get added to the zip and the folder is deleted once the zip is complete.
+    """
+    build_dir = tempfile.mkdtemp()
+    try:
+        BakeryPageView(os.path.join(build_dir, root_dir)).build_objects(
+            page_ids, include_children=True, workers=workers
+        )
+    except BaseException:
+        shutil.rmtree(build_dir, ignore_errors=True)
+        raise
+    return iter_zip_chunks(build_dir)
+
+
+def iter_zip_chunks(build_dir):
+    """
+    Yields the data of the zip with the files in the folder `build_dir` in chunks, one for each file,
+    and deletes the folder at the end.
+    """
+    stream = ZipStream()
+    try:
+        with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+            for folder, folders, filenames in os.walk(build_dir):
+                folders.sort()
+                for filename in sorted(filenames):
+                    path = os.path.join(folder, filename)
+                    zf.write(path, os.path.relpath(path, build_dir))
+                    yield stream.pop()
+        yield stream.pop()
+    finally:
+        shutil.rmtree(build_dir, ignore_errors=True)
@@ -0,0 +1,24 @@
+import threading
+
+
+class AssetStore(object):
+    """
+    Keeps track of the assets (e.g. image renditions) of an export shared by multiple pages
+    so that each one gets generated and written only once.
+
+    It can be used by multiple threads at the same time.
+    """
+    def __init__(self, existing_paths=()):
+        self._lock = threading.Lock()
+        self._paths = set(existing_paths)
+
+    def claim(self, path):
+        """
+        Returns True if the asset with the given `path` was not already claimed,
+        in which case the caller is responsible for creating it.
+        """
+        with self._lock:
+            if path in self._paths:
+                return False
+            self._paths.add(path)
+            return True
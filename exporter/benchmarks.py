@@ -0,0 +1,141 @@
+"""
+Micro-benchmark of the transformation of the components done by the exporter.
+
+It compares the current implementation with the previous one, which deep copied each
+component at every nesting level, using synthetic deep and wide content trees.
+
+Usage:
+    python -m exporter.benchmarks
+"""
+import copy
+import os
+import timeit
+
+
+def get_text_component(index):
+    return {
+        'type': 'text',
+        'props': {
+            'variant': 'markdown',
+            'value': 'lorem ipsum {}'.format(index)
+        }
+    }
+
+
+def get_deep_tree(depth, width=2):
+    """
+    Returns a list with one tree of panels nested `depth` times, each one with
+    `width` text components in each area.
+    """
+    node = [get_text_component(index) for index in range(width)]
+    for _ in range(depth):
+        node = [{
+            'type': 'panel',
+            'props': {
+                'header': [get_text_component(index) for index in range(width)],
+                'body': node,
+                'footer': [],
+            }
+        }]
+    return node
+
+
+def get_wide_tree(width):
+    """
+    Returns a list of `width` tabs, each one with a tab of text components and a gallery.
+    """
+    return [
+        {
+            'type': 'tabs',
+            'props': {
+                'variant': 'top',
+                'children': [{
+                    'type': 'tab',
+                    'props': {
+                        'label': 'tab {}'.format(index),
+                        'children': [get_text_component(index) for index in range(5)]
+                    }
+                }]
+            }
+        }
+        for index in range(width)
+    ]
+
+
+class DeepCopyTransformer(object):
+    """
+    Reference implementation deep copying each component at every level of nesting
+    and loading a new component class for each node.
+    """
+    def __init__(self, context):
+        self.context = context
+
+    def transform_components(self, data):
+        from . import components
+
+        transformed_data = []
+        for comp_data in data:
+            component_class = getattr(components, components.StructuralComponent.COMPONENTS[comp_data['type']])
+            if issubclass(component_class, components.StructuralComponent):
+                transformed_data.append(self.transform_structural(component_class, comp_data))
+            else:
+                transformed_data.append(self.transform_text(comp_data))
+        return transformed_data
+
+    def transform_structural(self, component_class, data):
+        transformed_data = copy.deepcopy(data)
+        for child_prop in component_class.CHILDREN_PROPS:
+            transformed_data['props'][child_prop] = self.transform_components(
+                transformed_data['props'][child_prop]
+            )
+        return transformed_data
+
+    def transform_text(self, data):
+        md_files = self.context.setdefault('new_files', [])
+        md_filename = 'content-{}.md'.format(len(md_files) + 1)
+
+        return_data = copy.deepcopy(data)
+        return_data['props']['value'] = '!file=%s' % md_filename
+        md_files.append((os.path.join(self.context['item_base_path'], md_filename), data['props']['value']))
+        return return_data
+
+
+def get_context():
+    return {'item_base_path': '/item/path', 'new_files': []}
+
+
+def run(number=20):
+    """
+    Returns a list of (tree name, seconds with deepcopy, seconds with the current implementation).
+    """
+    from .components import StructuralComponent
+
+    trees = [
+        ('deep (depth=50)', get_deep_tree(50)),
+        ('wide (width=500)', get_wide_tree(500)),
+    ]
+
+    results = []
+    for name, tree in trees:
+        deepcopy_time = timeit.timeit(
+            lambda: DeepCopyTransformer(get_context()).transform_components(tree),
+            number=number
+        )
+        current_time = timeit.timeit(
+            lambda: StructuralComponent(get_context()).transform_components(tree),
+            number=number
+        )
+        results.append((name, deepcopy_time, current_time))
+    return results
+
+
+if __name__ == '__main__':
+    import django
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'nhsuk.settings.dev')
+    django.setup()
+
+    for name, deepcopy_time, current_time in run():
+        print('{:<20} deepcopy: {:.4f}s  current: {:.4f}s  speedup: {:.1f}x'.format(
+            name, deepcopy_time, current_time, deepcopy_time / current_time
+        ))
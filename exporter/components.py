@@ -1,8 +1,34 @@
-import copy
 import os
-import sys
+
+from django.conf import settings
 
 from images.models import Image
+from images.renditions import get_or_generate_webp_rendition, is_webp_enabled
+
+from .assets import AssetStore
+
+
+def get_webp_rendition(image, spec):
+    """
+    Returns the WebP rendition of `image` for `spec`, waiting for other workers generating it
+    until their locks expire.
+    """
+    rendition = get_or_generate_webp_rendition(image, spec, wait=settings.IMAGE_RENDITION_LOCK_TIMEOUT)
+    if not rendition:
+        raise RuntimeError('Timed out waiting for the {} WebP rendition of image {}'.format(spec, image.pk))
+    return rendition
+
+
+def get_transform_config():
+    """
+    Returns the configuration changing the files generated by the components,
+    the pages exported with a different one have to be built again.
+    """
+    return {
+        'webp': is_webp_enabled(),
+        'image_sizes': [ImageComponent.DEFAULT_SIZES, ImageComponent.IN_GALLERY_SIZES],
+        'images_root': ImageComponent.IMAGES_ROOT,
+    }
 
 
 class Component(object):
@@ -28,30 +54,38 @@ class StructuralComponent(Component):
     }
     CHILDREN_PROPS = ['children']
 
+    def __init__(self, context):
+        super().__init__(context)
+        # component instances by type, shared with all the nested structural components
+        self.components = {}
+
     def load_component(self, component_type):
-        component = getattr(
-            sys.modules[__name__],
-            self.COMPONENTS[component_type]
-        )
-        return component(self.context)
+        component = self.components.get(component_type)
+        if not component:
+            component = COMPONENT_CLASSES[component_type](self.context)
+            if isinstance(component, StructuralComponent):
+                component.components = self.components
+            self.components[component_type] = component
+        return component
 
     def transform_components(self, data, **kwargs):
-        transformed_data = []
-        for comp_data in data:
-            component = self.load_component(comp_data['type'])
-            transformed_data.append(
-                component.transform(comp_data, **kwargs)
-            )
-        return transformed_data
+        return [
+            self.load_component(comp_data['type']).transform(comp_data, **kwargs)
+            for comp_data in data
+        ]
 
     def transform(self, data, **kwargs):
-        transformed_data = copy.deepcopy(data)
+        """
+        Returns a new component with the children transformed recursively.
+        The other values are shared with `data` which is not changed.
+        """
         kwargs['parent'] = self
+        props = dict(data['props'])
         for child_prop in self.CHILDREN_PROPS:
-            transformed_data['props'][child_prop] = self.transform_components(
-                transformed_data['props'][child_prop],
-                **kwargs
-            )
+            props[child_prop] = self.transform_components(props[child_prop], **kwargs)
+
+        transformed_data = dict(data)
+        transformed_data['props'] = props
         return transformed_data
 
 
@@ -83,8 +117,8 @@ class TextComponent(Component):
         md_content = data['props']['value']
         md_filename = self.MD_FILENAME_FORMAT.format(count=(len(self.md_files) + 1))
 
-        return_data = copy.deepcopy(data)
-        return_data['props']['value'] = '!file=%s' % md_filename
+        return_data = dict(data)
+        return_data['props'] = dict(data['props'], value='!file=%s' % md_filename)
 
         self.md_files.append(
             (self.get_build_path(md_filename), md_content)
@@ -110,57 +144,106 @@ class ImageComponent(Component):
         return self.context['new_files']
 
     @property
-    def root_path(self):
-        return self.context['root_path']
+    def asset_paths(self):
+        """
+        List of the absolute paths of all the assets used by the page, including the ones
+        created by other pages.
+        """
+        if 'asset_paths' not in self.context:
+            self.context['asset_paths'] = []
+        return self.context['asset_paths']
+
+    @property
+    def assets(self):
+        if 'assets' not in self.context:
+            self.context['assets'] = AssetStore()
+        return self.context['assets']
 
     @property
-    def page(self):
-        return self.context['page']
+    def root_path(self):
+        return self.context['root_path']
 
     @property
     def images_path(self):
         return os.path.join(self.root_path, 'images')
 
-    def get_build_path(self, size, obj):
+    def get_build_path(self, size, slug):
         """
-        Returns a tuple of (relative path, absolute path) related to the object `obj`
-        with size `size`.
+        Returns a tuple of (relative path, absolute path) related to the image with slug `slug`
+        and size `size`.
+
+        The slug changes every time the image gets saved so the path identifies
+        the version of the image and it can be shared by all the pages.
         """
-        filename, file_extension = os.path.splitext(obj.slug)
-        built_name = '{}-{}{}'.format(filename, size, file_extension)
-        relative_path = os.path.join(self.page.slug, built_name)
+        filename, file_extension = os.path.splitext(slug)
+        relative_path = '{}-{}{}'.format(filename, size, file_extension)
         absolute_path = os.path.join(self.images_path, relative_path)
 
         return (relative_path, absolute_path)
 
+    def add_image_file(self, data, image, absolute_path, get_rendition):
+        """
+        Adds the rendition returned by `get_rendition(image)` to the files to create unless another page
+        of the export already did it. Returns the image, loaded if necessary.
+        """
+        self.asset_paths.append(absolute_path)
+        if self.assets.claim(absolute_path):
+            image = image or Image.objects.get(pk=data['props']['id'])
+            self.image_files.append(
+                (absolute_path, get_rendition(image))
+            )
+        return image
+
     def transform(self, data, **kwargs):
         """
-        Converts image components into srcsets with related image specs
+        Converts image components into srcsets (and WebP srcsets if enabled) with related image specs
         whilst populating the 'new_files' list with the image files to create.
+
+        Image files already created by other pages of the export are not generated again.
         """
-        image = Image.objects.get(pk=data['props']['id'])
+        image = None
+        slug = data['props'].get('slug')
+        if not slug:
+            image = Image.objects.get(pk=data['props']['id'])
+            slug = image.slug
+
         sizes = self.get_sizes(kwargs.get('parent'))
+        # GIFs might be animated so they are not converted
+        include_webp = is_webp_enabled() and not slug.lower().endswith('.gif')
 
         srcset = []
+        webp_srcset = []
         for size in sizes:
             spec = 'width-%s' % size
-            rendition = image.get_rendition(spec)
-            relative_path, absolute_path = self.get_build_path(spec, image)
+            relative_path, absolute_path = self.get_build_path(spec, slug)
             srcset.append(
                 '{}/{} {}w'.format(self.IMAGES_ROOT, relative_path, size)
             )
-
-            self.image_files.append(
-                (absolute_path, rendition)
+            image = self.add_image_file(
+                data, image, absolute_path,
+                lambda image: image.get_rendition(spec)
             )
 
+            if include_webp:
+                relative_path, absolute_path = self.get_build_path(spec, os.path.splitext(slug)[0] + '.webp')
+                webp_srcset.append(
+                    '{}/{} {}w'.format(self.IMAGES_ROOT, relative_path, size)
+                )
+                image = self.add_image_file(
+                    data, image, absolute_path,
+                    lambda image: get_webp_rendition(image, spec)
+                )
+
+        props = {
+            'alt': data['props']['alt'],
+            'caption': data['props']['caption'],
+            'srcset': srcset
+        }
+        if include_webp:
+            props['webpSrcset'] = webp_srcset
         return {
             'type': 'image',
-            'props': {
-                'alt': data['props']['alt'],
-                'caption': data['props']['caption'],
-                'srcset': srcset
-            }
+            'props': props
         }
 
 
@@ -194,3 +277,10 @@ class TabsComponent(StructuralComponent):
 
 class TabComponent(StructuralComponent):
     CHILDREN_PROPS = ['children']
+
+
+# dispatch table of {component type: component class}
+COMPONENT_CLASSES = {
+    component_type: globals()[class_name]
+    for component_type, class_name in StructuralComponent.COMPONENTS.items()
+}
@@ -20,3 +20,12 @@ class ExportForm(forms.Form):
             build_dir=build_dir,
             page_ids=self.cleaned_data['pages']
         )
+
+    def export_zip(self, root_dir):
+        """
+        Returns an iterator of the chunks of the zip file with the exported pages.
+        """
+        return actions.export_zip(
+            root_dir=root_dir,
+            page_ids=self.cleaned_data['pages']
+        )
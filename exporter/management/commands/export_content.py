@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from exporter.actions import ExportError, export
+from exporter.forms import get_live_pages
+
+
+class Command(BaseCommand):
+    help = 'Exports the live pages and their children to a folder.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('build_dir', help='Folder to export the pages to')
+        parser.add_argument(
+            '--page', dest='page_ids', action='append', type=int,
+            help='Id of the page to export, can be repeated. Defaults to all the exportable pages'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help='Number of threads used to export the pages. Defaults to settings.EXPORTER_WORKERS'
+        )
+        parser.add_argument(
+            '--incremental', action='store_true', default=False,
+            help='Only rebuild the pages that changed since the previous export to the same folder'
+        )
+
+    def handle(self, *args, **options):
+        page_ids = options['page_ids'] or [page_id for page_id, _ in get_live_pages()]
+
+        try:
+            export(
+                build_dir=options['build_dir'],
+                page_ids=page_ids,
+                workers=options['workers'],
+                incremental=options['incremental']
+            )
+        except ExportError as e:
+            raise CommandError(str(e))
@@ -0,0 +1,298 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from unittest import mock
+
+from django.http import Http404
+from django.test import TestCase, TransactionTestCase
+from rest_framework.utils.encoders import JSONEncoder
+
+from api.tests.pages.base import ContentAPIBaseTestCase
+from pages.factories import ConditionPageFactory, ConditionsPageFactory
+
+from ..actions import (
+    BakeryPageView, ExportError, IncrementalBakeryPageView, export_zip
+)
+from ..assets import AssetStore
+
+
+class BakeryPageViewTestCase(TestCase):
+    def setUp(self):
+        """
+        Creates:
+
+        root
+            homepage
+                conditions (live)
+                    level1-a (live)
+                        level2-a (draft)
+                            level3-a (live)
+                    level1-b (live)
+                        level2-b (live)
+        """
+        super().setUp()
+
+        self.conditions = ConditionsPageFactory()
+
+        self.level1a = ConditionPageFactory(title='level1-a', slug='level1-a')
+        self.level2a = ConditionPageFactory(
+            title='level2-a', slug='level2-a', live=False,
+            depth=self.level1a.depth + 1,
+            path='{}0001'.format(self.level1a.path)
+        )
+        ConditionPageFactory(
+            title='level3-a', slug='level3-a',
+            depth=self.level2a.depth + 1,
+            path='{}0001'.format(self.level2a.path)
+        )
+        self.level1b = ConditionPageFactory(title='level1-b', slug='level1-b')
+        self.level2b = ConditionPageFactory(
+            title='level2-b', slug='level2-b',
+            depth=self.level1b.depth + 1,
+            path='{}0001'.format(self.level1b.path)
+        )
+
+        self.view = BakeryPageView('build')
+
+    def test_pages_to_build(self):
+        """
+        Tests that the pages to build are the live ones reachable through live pages, in tree order.
+        """
+        pages = self.view.get_pages_to_build(
+            [self.level1b.pk, self.level1a.pk], include_children=True
+        )
+        self.assertEqual(
+            [page.title for page in pages],
+            ['level1-a', 'level1-b', 'level2-b']
+        )
+
+    def test_pages_to_build_without_children(self):
+        pages = self.view.get_pages_to_build([self.conditions.pk], include_children=False)
+        self.assertEqual(pages, [self.conditions.specific])
+
+    def test_errors_aggregated(self):
+        """
+        Tests that if some pages fail, the other ones are still built and all the errors are raised.
+        """
+        def build_page(page):
+            if page.title != 'level1-b':
+                raise ValueError(page.title)
+
+        with mock.patch.object(self.view, 'build_page', side_effect=build_page) as mocked_build_page:
+            with self.assertRaises(ExportError) as cm:
+                self.view.build_objects([self.conditions.pk], include_children=True, workers=1)
+
+        self.assertEqual(mocked_build_page.call_count, 4)
+        self.assertEqual(
+            [(page.title, str(error)) for page, error in cm.exception.errors],
+            [('Conditions', 'Conditions'), ('level1-a', 'level1-a'), ('level2-b', 'level2-b')]
+        )
+
+
+class MultiThreadedBuildTestCase(TransactionTestCase):
+    """
+    Tests related to building the pages with a pool of worker threads, each one with its own db connection.
+    """
+    serialized_rollback = True
+
+    def setUp(self):
+        super().setUp()
+        self.conditions = ConditionsPageFactory()
+        self.pages = [
+            ConditionPageFactory(title='page{}'.format(index), slug='page{}'.format(index))
+            for index in range(6)
+        ]
+        self.view = BakeryPageView('build')
+
+    def test_map_pages_in_order(self):
+        """
+        Tests that the results are yielded in the order of the pages even if they complete in a different one.
+        """
+        threads = set()
+
+        def func(page):
+            threads.add(threading.get_ident())
+            # the first pages take longer
+            time.sleep(0.01 * (len(self.pages) - self.pages.index(page)))
+            return page.title
+
+        results = list(self.view.map_pages(func, self.pages, workers=3))
+
+        self.assertEqual(results, [(page, page.title) for page in self.pages])
+        self.assertGreater(len(threads), 1)
+        self.assertNotIn(threading.get_ident(), threads)
+
+    def test_errors_aggregated(self):
+        """
+        Tests that the errors raised in the worker threads are collected and raised in export order.
+        """
+        def build_page(page):
+            if page.title in ('page1', 'page4'):
+                raise ValueError(page.title)
+
+        with mock.patch.object(self.view, 'build_page', side_effect=build_page) as mocked_build_page:
+            with self.assertRaises(ExportError) as cm:
+                self.view.build_objects([self.conditions.pk], include_children=True, workers=3)
+
+        self.assertEqual(mocked_build_page.call_count, len(self.pages) + 1)
+        self.assertEqual(
+            [(page.title, str(error)) for page, error in cm.exception.errors],
+            [('page1', 'page1'), ('page4', 'page4')]
+        )
+
+
+class ExportZipTestCase(TestCase):
+    def test_zip(self):
+        """
+        Tests that the zip data can be streamed in chunks and read back.
+        """
+        page = ConditionPageFactory(title='page', slug='page')
+
+        def get_page_files(view, obj):
+            return [
+                (os.path.join(view.build_path, 'page/manifest.json'), '{}'),
+                (os.path.join(view.build_path, 'page/content-1.md'), 'lorem ipsum'),
+            ]
+
+        build_dir = tempfile.mkdtemp()
+        with mock.patch.object(BakeryPageView, 'get_page_files', autospec=True, side_effect=get_page_files), \
+                mock.patch('exporter.actions.tempfile.mkdtemp', return_value=build_dir):
+            chunks = list(export_zip('content', [page.pk]))
+
+        self.assertTrue(len(chunks) > 1)
+        with zipfile.ZipFile(io.BytesIO(b''.join(chunks))) as zf:
+            self.assertEqual(zf.namelist(), ['content/page/content-1.md', 'content/page/manifest.json'])
+            self.assertEqual(zf.read('content/page/content-1.md'), b'lorem ipsum')
+        self.assertFalse(os.path.exists(build_dir))
+
+    def test_failing_page(self):
+        """
+        Tests that if a page fails, the ExportError is raised before any zip data is returned.
+        """
+        page = ConditionPageFactory(title='page', slug='page')
+        other_page = ConditionPageFactory(title='other-page', slug='other-page')
+
+        def get_page_files(view, obj):
+            if obj.pk == other_page.pk:
+                raise ValueError('invalid page')
+            return [(os.path.join(view.build_path, 'page/manifest.json'), '{}')]
+
+        build_dir = tempfile.mkdtemp()
+        with mock.patch.object(BakeryPageView, 'get_page_files', autospec=True, side_effect=get_page_files), \
+                mock.patch('exporter.actions.tempfile.mkdtemp', return_value=build_dir):
+            with self.assertRaises(ExportError) as cm:
+                export_zip('content', [page.pk, other_page.pk])
+        self.assertFalse(os.path.exists(build_dir))
+
+        self.assertEqual(
+            [(obj.pk, str(error)) for obj, error in cm.exception.errors],
+            [(other_page.pk, 'invalid page')]
+        )
+
+
+class IncrementalExportTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.page1 = ConditionPageFactory(title='page1', slug='page1')
+        self.page2 = ConditionPageFactory(title='page2', slug='page2')
+        self.payloads = {
+            self.page1.pk: {'title': 'page1'},
+            self.page2.pk: {'title': 'page2'},
+        }
+
+        self.build_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.build_dir)
+
+    def export(self, page_ids):
+        """
+        Exports the pages incrementally and returns the list of pages rebuilt.
+        """
+        view = IncrementalBakeryPageView(self.build_dir)
+        with mock.patch.object(
+            view, 'get_page_data', side_effect=lambda page: dict(self.payloads[page.pk])
+        ), mock.patch.object(view, 'transform_data', wraps=view.transform_data) as transform:
+            view.build_objects(page_ids, include_children=True, workers=1)
+        return [call[0][0] for call in transform.call_args_list]
+
+    def get_manifest_path(self, page):
+        return os.path.join(self.build_dir, page.url[1:], 'manifest.json')
+
+    def test_unchanged_pages_skipped(self):
+        self.assertEqual(
+            self.export([self.page1.pk, self.page2.pk]),
+            [self.page1, self.page2]
+        )
+        self.assertTrue(os.path.exists(self.get_manifest_path(self.page1)))
+
+        self.assertEqual(self.export([self.page1.pk, self.page2.pk]), [])
+
+        self.payloads[self.page2.pk] = {'title': 'new title'}
+        self.assertEqual(self.export([self.page1.pk, self.page2.pk]), [self.page2])
+        with open(self.get_manifest_path(self.page2)) as f:
+            self.assertEqual(json.load(f)['title'], 'new title')
+
+    def test_transform_config_changed(self):
+        """
+        Tests that pages are rebuilt if the configuration changing the output does, e.g. WebP toggled.
+        """
+        with mock.patch('exporter.components.is_webp_enabled', return_value=False):
+            self.export([self.page1.pk])
+            self.assertEqual(self.export([self.page1.pk]), [])
+
+        with mock.patch('exporter.components.is_webp_enabled', return_value=True):
+            self.assertEqual(self.export([self.page1.pk]), [self.page1])
+
+    def test_missing_files_rebuilt(self):
+        self.export([self.page1.pk])
+        os.remove(self.get_manifest_path(self.page1))
+
+        self.assertEqual(self.export([self.page1.pk]), [self.page1])
+        self.assertTrue(os.path.exists(self.get_manifest_path(self.page1)))
+
+    def test_removed_pages_deleted(self):
+        self.export([self.page1.pk, self.page2.pk])
+
+        self.export([self.page1.pk])
+        self.assertTrue(os.path.exists(self.get_manifest_path(self.page1)))
+        self.assertFalse(os.path.exists(self.get_manifest_path(self.page2)))
+        self.assertFalse(os.path.exists(os.path.dirname(self.get_manifest_path(self.page2))))
+
+
+class PageDataTestCase(ContentAPIBaseTestCase):
+    def test_same_as_api(self):
+        """
+        Tests that the data serialized in-process is the same as the one returned by the API.
+        """
+        page = ConditionPageFactory(title='page', slug='page')
+
+        view = BakeryPageView('build')
+        data = view.get_page_data(page.specific)
+
+        response = self.get_content_api_response(page_id=page.pk)
+        self.assertEqual(
+            json.loads(json.dumps(data, cls=JSONEncoder)),
+            response.json()
+        )
+
+    def test_not_available(self):
+        """
+        Tests that pages not available through the API can't be exported.
+        """
+        page = ConditionPageFactory(title='page', slug='page', live=False)
+
+        with self.assertRaises(Http404):
+            BakeryPageView('build').get_page_data(page.specific)
+
+
+class AssetStoreTestCase(TestCase):
+    def test_claim(self):
+        store = AssetStore(['existing'])
+
+        self.assertFalse(store.claim('existing'))
+        self.assertTrue(store.claim('new'))
+        self.assertFalse(store.claim('new'))
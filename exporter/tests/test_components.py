@@ -102,8 +102,8 @@ class ImageComponentTestCase(TestCase):
         self.assertCountEqual(
             transformed_data['props']['srcset'],
             [
-                'assets/images/page/test-image-%s-width-300.png 300w' % slug_postfix,
-                'assets/images/page/test-image-%s-width-600.png 600w' % slug_postfix
+                'assets/images/test-image-%s-width-300.png 300w' % slug_postfix,
+                'assets/images/test-image-%s-width-600.png 600w' % slug_postfix
             ]
         )
 
@@ -126,10 +126,10 @@ class ImageComponentTestCase(TestCase):
         self.assertCountEqual(
             transformed_data['props']['srcset'],
             [
-                'assets/images/page/test-image-%s-width-400.png 400w' % slug_postfix,
-                'assets/images/page/test-image-%s-width-640.png 640w' % slug_postfix,
-                'assets/images/page/test-image-%s-width-800.png 800w' % slug_postfix,
-                'assets/images/page/test-image-%s-width-1280.png 1280w' % slug_postfix
+                'assets/images/test-image-%s-width-400.png 400w' % slug_postfix,
+                'assets/images/test-image-%s-width-640.png 640w' % slug_postfix,
+                'assets/images/test-image-%s-width-800.png 800w' % slug_postfix,
+                'assets/images/test-image-%s-width-1280.png 1280w' % slug_postfix
             ]
         )
 
@@ -164,6 +164,41 @@ class StructuralComponentTestCase(object):
             )
 
 
+class NestedComponentsTestCase(TestCase):
+    def test_data_not_changed(self):
+        """
+        Tests that transforming nested components returns new data without changing the original one
+        and that the component instances are reused.
+        """
+        data = [{
+            'type': 'panel',
+            'props': {
+                'header': [copy.deepcopy(DEFAULT_MD_COMPONENT_DATA)],
+                'body': [{
+                    'type': 'reveal',
+                    'props': {
+                        'children': [copy.deepcopy(DEFAULT_MD_COMPONENT_DATA)]
+                    }
+                }],
+                'footer': [],
+            }
+        }]
+        original_data = copy.deepcopy(data)
+
+        component = components.StructuralComponent({'item_base_path': '/item/path'})
+        transformed_data = component.transform_components(data)
+
+        self.assertEqual(data, original_data)
+        self.assertEqual(
+            transformed_data[0]['props']['body'][0]['props']['children'][0]['props']['value'],
+            '!file=content-2.md'
+        )
+        self.assertIs(
+            component.load_component('text'),
+            component.load_component('panel').load_component('text')
+        )
+
+
 class SplitContentComponentTestCase(StructuralComponentTestCase, TestCase):
     COMPONENT_TYPE = 'splitContent'
     COMPONENT_CLASS = components.SplitContentComponent
@@ -82,3 +82,20 @@ class ExportFormTestCase(TestCase):
         mocked_actions.export.assert_called_with(
             build_dir=build_dir, page_ids=[str(page_id)]
         )
+
+    @mock.patch('exporter.forms.actions')
+    def test_export_zip(self, mocked_actions):
+        """
+        Tests that export_zip returns the zip data generated by the export_zip action.
+        """
+        page_id = EditorialPage.objects.get(slug='level1-c').pk
+        form = ExportForm(data={
+            'pages': [page_id]
+        })
+
+        self.assertTrue(form.is_valid())
+        zip_data = form.export_zip(root_dir='content')
+        mocked_actions.export_zip.assert_called_with(
+            root_dir='content', page_ids=[str(page_id)]
+        )
+        self.assertEqual(zip_data, mocked_actions.export_zip.return_value)
@@ -1,16 +1,20 @@
+import io
 import json
 import tempfile
 import zipfile
+from unittest import mock
 
 from django.core.urlresolvers import reverse
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from wagtail.tests.utils import WagtailTestUtils
 
+from exporter.actions import BakeryPageView, ExportError
 from images.factories import ImageFactory
 from pages.factories import ConditionPageFactory
 from pages.models import EditorialPage
 
 
+@override_settings(IMAGE_WEBP_ENABLED=False)
 class ExportContentTestCase(TestCase, WagtailTestUtils):
     def setUp(self):
         # set up images
@@ -49,7 +53,7 @@ class ExportContentTestCase(TestCase, WagtailTestUtils):
         })
 
         with tempfile.NamedTemporaryFile() as tf:
-            tf.write(response.content)
+            tf.write(b''.join(response.streaming_content))
             tf.flush()
 
             with zipfile.ZipFile(tf.name) as zf:
@@ -62,7 +66,7 @@ class ExportContentTestCase(TestCase, WagtailTestUtils):
                     root = 'assets' if in_srcset else 'content'
                     postfix = ' %sw' % size if in_srcset else ''
 
-                    return '{root}/images/condition-1/test-image-{slug_postfix}-width-{size}.png{postfix}'.format(
+                    return '{root}/images/test-image-{slug_postfix}-width-{size}.png{postfix}'.format(
                         root=root,
                         slug_postfix=slug_postfix,
                         size=size,
@@ -102,6 +106,71 @@ class ExportContentTestCase(TestCase, WagtailTestUtils):
                     ]
                 )
 
+    def test_failing_page(self):
+        """
+        Tests that if a page can't be exported, the error is raised before the response starts
+        instead of streaming a truncated zip.
+        """
+        with mock.patch.object(BakeryPageView, 'get_page_files', side_effect=ValueError('invalid page')):
+            self.assertRaises(
+                ExportError, self.client.post, self.url, data={'pages': [self.page.id]}
+            )
+
+    def test_shared_images(self):
+        """
+        Tests that images used by multiple pages are only included once.
+        """
+        other_page = ConditionPageFactory(
+            title='condition-2', slug='condition-2',
+            main=self.page.main
+        )
+
+        response = self.client.post(self.url, data={
+            'pages': [self.page.id, other_page.id]
+        })
+
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as zf:
+            manifests = [
+                json.loads(zf.read('content/home/conditions/{}/manifest.json'.format(slug)).decode())
+                for slug in ['condition-1', 'condition-2']
+            ]
+            self.assertEqual(
+                manifests[0]['content']['main'][1]['props']['srcset'],
+                manifests[1]['content']['main'][1]['props']['srcset']
+            )
+
+            image_paths = [path for path in zf.namelist() if path.startswith('content/images/')]
+            self.assertEqual(len(image_paths), 4)
+            self.assertEqual(len(set(image_paths)), 4)
+
+    @mock.patch('exporter.components.is_webp_enabled', return_value=True)
+    @mock.patch('exporter.components.get_webp_rendition', side_effect=lambda image, spec: image.get_rendition(spec))
+    def test_webp(self, mocked_get_webp_rendition, mocked_is_webp_enabled):
+        """
+        Tests that if WebP is enabled, the WebP renditions are exported and included in a separate srcset.
+        """
+        response = self.client.post(self.url, data={
+            'pages': [self.page.id]
+        })
+
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as zf:
+            manifest = json.loads(zf.read('content/home/conditions/condition-1/manifest.json').decode())
+            props = manifest['content']['main'][1]['props']
+
+            slug_postfix = self.image._random_slug_postfix
+            self.assertEqual(
+                props['webpSrcset'],
+                [
+                    'assets/images/test-image-{}-width-{}.webp {}w'.format(slug_postfix, size, size)
+                    for size in [400, 640, 800, 1280]
+                ]
+            )
+            self.assertEqual(len(props['srcset']), 4)
+
+            image_paths = [path for path in zf.namelist() if path.startswith('content/images/')]
+            self.assertEqual(len([path for path in image_paths if path.endswith('.webp')]), 4)
+            self.assertEqual(len(image_paths), 8)
+
     def test_redirects_to_login_if_not_logged_in(self):
         self.client.logout()
 
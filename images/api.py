@@ -0,0 +1,10 @@
+from wagtail.wagtailimages.api.v2.endpoints import \
+    ImagesAPIEndpoint as WagtailImagesAPIEndpoint
+
+from api.serializers import CachedSerializerClassMixin
+
+
+class ImagesAPIEndpoint(CachedSerializerClassMixin, WagtailImagesAPIEndpoint):
+    """
+    Same as the Wagtail ImagesAPIEndpoint but reusing the generated serializer classes.
+    """
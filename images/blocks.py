@@ -1,20 +1,73 @@
+import threading
+from contextlib import contextmanager
+
+from wagtail.wagtailimages import get_image_model
 from wagtail.wagtailimages.blocks import \
     ImageChooserBlock as WagtailImageChooserBlock
 
+_prefetched = threading.local()
+
+
+def get_prefetched_images():
+    """
+    Returns the dict of {image id: image or None} prefetched by `prefetched_images`
+    in the current thread or an empty dict.
+    """
+    return getattr(_prefetched, 'images', {})
+
+
+@contextmanager
+def prefetched_images(image_ids):
+    """
+    Loads the images with the given ids (and their tags) in one go and makes
+    ImageChooserBlock use them instead of querying the db for each block.
+
+    Ids not matching any image are mapped to None, like ImageChooserBlock.to_python does.
+    """
+    previous = get_prefetched_images()
+
+    images = dict(previous)
+    image_ids = set(image_ids) - set(previous)
+    if image_ids:
+        found = get_image_model().objects.prefetch_related('tags').in_bulk(image_ids)
+        images.update(
+            (image_id, found.get(image_id)) for image_id in image_ids
+        )
+
+    _prefetched.images = images
+    try:
+        yield images
+    finally:
+        _prefetched.images = previous
+
 
 class ImageChooserBlock(WagtailImageChooserBlock):
     """
     Same as the Wagtail ImageChooserBlock but denormalising
     the image data in the json response so that we don't have to make an extra call.
+
+    It uses the images prefetched with `prefetched_images` if available.
     """
+    def to_python(self, value):
+        images = get_prefetched_images()
+        if value in images:
+            return images[value]
+        return super().to_python(value)
+
+    def bulk_to_python(self, values):
+        images = get_prefetched_images()
+        values = list(values)
+        if all(value in images for value in values):
+            return [images[value] for value in values]
+        return super().bulk_to_python(values)
+
     def get_api_representation(self, value, context=None):
-        from wagtail.wagtailimages.api.v2.endpoints import ImagesAPIEndpoint
+        from .api import ImagesAPIEndpoint
 
         if value is None or not context:
             return None
 
-        endpoint = ImagesAPIEndpoint()
-        serializer_class = endpoint._get_serializer_class(
+        serializer_class = ImagesAPIEndpoint._get_serializer_class(
             context['router'], value.__class__, [], show_details=True
         )
         return serializer_class(value, context=context).data
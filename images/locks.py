@@ -0,0 +1,203 @@
+import hashlib
+import logging
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+
+from api.cache import LOCAL_CACHE_BACKENDS
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 0.05
+
+METRICS = ('acquired', 'contended', 'timed_out', 'cache_errors', 'wait_ms')
+
+# {key: [lock, number of users]}, entries are removed when not used so that it doesn't grow forever
+_local_locks = {}
+_local_locks_guard = threading.Lock()
+
+
+def get_metrics_cache():
+    return caches[settings.IMAGE_RENDITION_LOCK_CACHE_ALIAS]
+
+
+def get_cache():
+    """
+    Returns the cache storing the leases or None if it's not shared between processes,
+    in which case Postgres advisory locks are used instead.
+    """
+    cache = caches[settings.IMAGE_RENDITION_LOCK_CACHE_ALIAS]
+    if isinstance(cache, LOCAL_CACHE_BACKENDS):
+        return None
+    return cache
+
+
+def get_advisory_lock_id(key):
+    """
+    Returns the signed 64-bit integer identifying the Postgres advisory lock for `key`.
+    """
+    return int.from_bytes(hashlib.sha1(key.encode('utf-8')).digest()[:8], 'big', signed=True)
+
+
+def checkout_local_lock(key):
+    """
+    Returns the process-local lock for `key`, it has to be returned with `checkin_local_lock`.
+    """
+    with _local_locks_guard:
+        entry = _local_locks.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+        return entry[0]
+
+
+def checkin_local_lock(key):
+    with _local_locks_guard:
+        entry = _local_locks[key]
+        entry[1] -= 1
+        if not entry[1]:
+            del _local_locks[key]
+
+
+def get_metric_key(name):
+    return 'images:rendition-lock:metrics:{}'.format(name)
+
+
+def record_metric(name, value=1):
+    """
+    Increments the counter `name` by `value`.
+    """
+    cache = get_metrics_cache()
+    key = get_metric_key(name)
+    try:
+        if not cache.add(key, value, timeout=None):
+            cache.incr(key, value)
+    except Exception:  # metrics must never break serving images
+        logger.exception('Could not record the rendition lock metric %s', name)
+
+
+def get_metrics():
+    """
+    Returns a dict of {metric name: value} with the counters stored in settings.IMAGE_RENDITION_LOCK_CACHE_ALIAS,
+    which are the ones of all the processes only if that cache is shared between them:
+        - acquired: number of times a lock was acquired
+        - contended: number of times a lock was already held by another worker
+        - timed_out: number of times the lock could not be acquired in time
+        - cache_errors: number of times the shared lock was not available and only the local lock was used
+        - wait_ms: total milliseconds spent waiting for locks held by other workers
+    """
+    values = get_metrics_cache().get_many([get_metric_key(name) for name in METRICS])
+    return {name: values.get(get_metric_key(name), 0) for name in METRICS}
+
+
+def reset_metrics():
+    get_metrics_cache().delete_many([get_metric_key(name) for name in METRICS])
+
+
+class GenerationLock(object):
+    """
+    Lock shared by all the workers so that only one of them generates a resource at a time.
+
+    It's a lease stored in the cache that expires after `lease_timeout` seconds in case
+    the worker holding it dies. If the cache is not shared between processes (e.g. the default LocMemCache),
+    a Postgres advisory lock, released by the db if the worker dies, is used instead.
+    Threads of the same process are serialised by a local lock first so that they don't poll
+    the cache or the db, and if neither is available only the local lock is used.
+
+    Usage:
+        lock = GenerationLock(key)
+        if lock.acquire(timeout=3):
+            try:
+                ...
+            finally:
+                lock.release()
+    """
+    def __init__(self, key, lease_timeout=None):
+        self.key = 'images:rendition-lock:{}'.format(key)
+        self.lease_timeout = lease_timeout or settings.IMAGE_RENDITION_LOCK_TIMEOUT
+        self.token = uuid.uuid4().hex
+        self.local_lock = None
+        self.has_lease = False
+        self.has_advisory_lock = False
+        self.contended = False
+
+    def acquire(self, timeout):
+        """
+        Waits up to `timeout` seconds for the lock and returns True if acquired, False otherwise.
+        """
+        start = time.monotonic()
+        deadline = start + timeout
+        self.local_lock = checkout_local_lock(self.key)
+
+        acquired = self.local_lock.acquire(blocking=False)
+        if not acquired:
+            self.contended = True
+            acquired = self.local_lock.acquire(timeout=max(timeout, 0))
+
+        if acquired:
+            acquired = self._acquire_lease(deadline)
+            if not acquired:
+                self.local_lock.release()
+        if not acquired:
+            checkin_local_lock(self.key)
+            self.local_lock = None
+
+        if self.contended:
+            record_metric('contended')
+            record_metric('wait_ms', int((time.monotonic() - start) * 1000))
+        record_metric('acquired' if acquired else 'timed_out')
+        if not acquired:
+            logger.info('Timed out waiting for the lock %s', self.key)
+        return acquired
+
+    def _try_acquire_shared(self, cache):
+        """
+        Returns True if the lease or, if `cache` is None, the advisory lock was acquired, False otherwise.
+        """
+        if cache is None:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_try_advisory_lock(%s)', [get_advisory_lock_id(self.key)])
+                self.has_advisory_lock = cursor.fetchone()[0]
+            return self.has_advisory_lock
+
+        self.has_lease = cache.add(self.key, self.token, timeout=self.lease_timeout)
+        return self.has_lease
+
+    def _acquire_lease(self, deadline):
+        cache = get_cache()
+        while True:
+            try:
+                if self._try_acquire_shared(cache):
+                    return True
+            except Exception:
+                logger.exception('Could not acquire the lock %s, only using the local lock', self.key)
+                record_metric('cache_errors')
+                return True
+
+            self.contended = True
+            if time.monotonic() + POLL_INTERVAL > deadline:
+                return False
+            time.sleep(POLL_INTERVAL)
+
+    def release(self):
+        if self.has_lease:
+            cache = get_cache()
+            try:
+                # the lease might have expired and been acquired by another worker
+                if cache.get(self.key) == self.token:
+                    cache.delete(self.key)
+            except Exception:
+                logger.exception('Could not release the lock %s', self.key)
+            self.has_lease = False
+        if self.has_advisory_lock:
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT pg_advisory_unlock(%s)', [get_advisory_lock_id(self.key)])
+            except Exception:
+                logger.exception('Could not release the lock %s', self.key)
+            self.has_advisory_lock = False
+        self.local_lock.release()
+        checkin_local_lock(self.key)
+        self.local_lock = None
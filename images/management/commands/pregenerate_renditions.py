@@ -0,0 +1,70 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from wagtail.wagtailimages import get_image_model
+
+from images.renditions import (
+    generate_queued_renditions, generate_renditions_in_pool
+)
+
+
+class Command(BaseCommand):
+    help = 'Generates the missing renditions of the images for the configured filter specs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--image', dest='image_ids', action='append', type=int,
+            help='Id of the image to generate the renditions for, can be repeated. Defaults to all the images'
+        )
+        parser.add_argument(
+            '--spec', dest='filter_specs', action='append',
+            help='Filter spec to generate, can be repeated. Defaults to settings.IMAGE_PREGENERATED_FILTER_SPECS'
+        )
+        parser.add_argument(
+            '--processes', type=int, default=None,
+            help='Number of processes used. Defaults to settings.IMAGE_PREGENERATION_PROCESSES'
+        )
+        parser.add_argument(
+            '--queue', action='store_true', default=False,
+            help=(
+                'Keep running and generate the renditions of the images queued when uploaded or changed, '
+                'checking the queue every settings.IMAGE_PREGENERATION_QUEUE_INTERVAL seconds'
+            )
+        )
+
+    def process_queue(self, processes, verbosity):
+        """
+        Generates the renditions of the queued images until the queue is empty.
+        """
+        while True:
+            results = list(generate_queued_renditions(processes=processes))
+            if not results:
+                return
+
+            for image_id, created in results:
+                if verbosity > 1:
+                    self.stdout.write('Image {}: {} renditions created'.format(image_id, created))
+
+    def handle(self, *args, **options):
+        if options['queue']:
+            while True:
+                self.process_queue(options['processes'], options['verbosity'])
+                connection.close()
+                time.sleep(settings.IMAGE_PREGENERATION_QUEUE_INTERVAL)
+
+        image_ids = options['image_ids'] or list(
+            get_image_model().objects.order_by('pk').values_list('pk', flat=True)
+        )
+        filter_specs = options['filter_specs'] or settings.IMAGE_PREGENERATED_FILTER_SPECS
+
+        total = 0
+        for image_id, created in generate_renditions_in_pool(
+            image_ids, filter_specs=filter_specs, processes=options['processes']
+        ):
+            total += created
+            if options['verbosity'] > 1:
+                self.stdout.write('Image {}: {} renditions created'.format(image_id, created))
+
+        self.stdout.write('{} renditions created for {} images'.format(total, len(image_ids)))
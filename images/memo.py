@@ -0,0 +1,232 @@
+"""
+Memo of the renditions resolved by the image serve view.
+
+It maps the values in the url of a rendition to the name of its file so that hot urls
+can be served without verifying the signature again or querying the db.
+
+Entries are kept in a small in-process LRU and, if settings.IMAGE_SERVE_MEMO_CACHE_ALIAS is set,
+in a cache shared by all the processes.
+Changing or deleting an image invalidates its entries straightaway in the current process and in the
+shared cache, entries in the LRUs of other processes expire after settings.IMAGE_SERVE_MEMO_LOCAL_TIMEOUT seconds.
+"""
+import hashlib
+import random
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models.fields.files import FieldFile
+from wagtail.wagtailimages import get_image_model
+
+_random = random.SystemRandom()
+
+
+class LRU(object):
+    """
+    Thread-safe dict keeping at most `maxsize` items, the least recently used ones are discarded first.
+    """
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self.lock:
+            try:
+                self.items.move_to_end(key)
+            except KeyError:
+                return default
+            return self.items[key]
+
+    def set(self, key, value):
+        with self.lock:
+            self._set(key, value)
+
+    def setdefault(self, key, default):
+        """
+        Returns the value of `key`, setting it to `default` first if it doesn't exist.
+        """
+        with self.lock:
+            try:
+                self.items.move_to_end(key)
+            except KeyError:
+                self._set(key, default)
+            return self.items[key]
+
+    def _set(self, key, value):
+        self.items[key] = value
+        self.items.move_to_end(key)
+        while len(self.items) > self.maxsize:
+            self.items.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+
+class MemoizedRendition(object):
+    """
+    Stand-in for a rendition only knowing its file.
+    """
+    def __init__(self, file_name):
+        field = get_image_model().get_rendition_model()._meta.get_field('file')
+        self.file = FieldFile(None, field, file_name)
+
+    @property
+    def url(self):
+        return self.file.url
+
+
+_local_memo = None
+# {image id: generation}, changed when an image changes to invalidate its entries in the local memo
+_local_generations = None
+_local_lock = threading.Lock()
+
+
+def get_local_lrus():
+    """
+    Returns the tuple (memo, generations) of the LRUs of the current process,
+    created with settings.IMAGE_SERVE_MEMO_SIZE items the first time or when the setting changes.
+    """
+    global _local_memo, _local_generations
+    with _local_lock:
+        if not _local_memo or _local_memo.maxsize != settings.IMAGE_SERVE_MEMO_SIZE:
+            _local_memo = LRU(settings.IMAGE_SERVE_MEMO_SIZE)
+            _local_generations = LRU(settings.IMAGE_SERVE_MEMO_SIZE)
+        return (_local_memo, _local_generations)
+
+
+def get_shared_cache():
+    alias = settings.IMAGE_SERVE_MEMO_CACHE_ALIAS
+    return caches[alias] if alias else None
+
+
+def get_memo_key(signature, image_id, filter_spec, slug, image_format=''):
+    return 'images:serve:{}'.format(
+        hashlib.sha1(
+            '{}|{}|{}|{}|{}'.format(signature, image_id, filter_spec, slug, image_format).encode('utf-8')
+        ).hexdigest()
+    )
+
+
+def get_generation_key(image_id):
+    return 'images:serve:generation:{}'.format(image_id)
+
+
+def get_local_generation(image_id):
+    """
+    Returns the generation of the entries of the image in the local memo.
+
+    Generations of images not used recently get discarded, a new random one is created in that case
+    so that the entries built with the discarded one can't be valid by mistake.
+    """
+    _, generations = get_local_lrus()
+    return generations.setdefault(str(image_id), _random.randint(1, 2 ** 31))
+
+
+def get_shared_generation(cache, image_id):
+    """
+    Returns the generation of the entries of the image in the shared cache, creating a random
+    one if it doesn't exist so that entries built with an evicted one can't be valid by mistake.
+    """
+    key = get_generation_key(image_id)
+    cache.add(key, _random.randint(1, 2 ** 31), timeout=None)
+    return cache.get(key)
+
+
+class RenditionMemo(object):
+    """
+    Memo entry of the rendition identified by the values in its url.
+
+    Usage:
+        memo = RenditionMemo(signature, image_id, filter_spec, slug)
+        rendition = memo.get()
+        if not rendition:
+            # verify the signature and resolve the rendition
+            ...
+            memo.set(rendition)
+    """
+    def __init__(self, signature, image_id, filter_spec, slug, image_format=''):
+        self.key = get_memo_key(signature, image_id, filter_spec, slug, image_format)
+        self.image_id = image_id
+        self.cache = get_shared_cache()
+        self.local_generation = None
+        self.shared_generation = None
+
+    def get(self):
+        """
+        Returns a MemoizedRendition if the rendition was resolved before and its image didn't change since,
+        None otherwise.
+
+        The generations are read before resolving the rendition so that changes happening
+        in the meantime invalidate the entry stored by `set`.
+        """
+        self.local_generation = get_local_generation(self.image_id)
+        memo, _ = get_local_lrus()
+        entry = memo.get(self.key)
+        if entry:
+            file_name, local_generation, expires_at = entry
+            if local_generation == self.local_generation and expires_at > time.monotonic():
+                return MemoizedRendition(file_name)
+
+        if not self.cache:
+            return None
+
+        values = self.cache.get_many([self.key, get_generation_key(self.image_id)])
+        entry = values.get(self.key)
+        self.shared_generation = values.get(get_generation_key(self.image_id))
+        if self.shared_generation is None:
+            self.shared_generation = get_shared_generation(self.cache, self.image_id)
+
+        if not entry or entry['generation'] != self.shared_generation:
+            return None
+
+        self.set_local(entry['file_name'])
+        return MemoizedRendition(entry['file_name'])
+
+    def set_local(self, file_name):
+        memo, _ = get_local_lrus()
+        memo.set(
+            self.key,
+            (file_name, self.local_generation, time.monotonic() + settings.IMAGE_SERVE_MEMO_LOCAL_TIMEOUT)
+        )
+
+    def set(self, rendition):
+        """
+        Stores the file name of `rendition`.
+
+        This has to be called after `get` and only after verifying the signature.
+        """
+        file_name = rendition.file.name
+        self.set_local(file_name)
+
+        if self.cache:
+            self.cache.set(
+                self.key,
+                {'file_name': file_name, 'generation': self.shared_generation},
+                timeout=settings.IMAGE_SERVE_MEMO_TIMEOUT
+            )
+
+
+def invalidate_image(image_id):
+    """
+    Invalidates the entries of the image with id `image_id`.
+    """
+    _, generations = get_local_lrus()
+    generations.set(str(image_id), _random.randint(1, 2 ** 31))
+
+    cache = get_shared_cache()
+    if cache:
+        try:
+            cache.incr(get_generation_key(image_id))
+        except ValueError:  # no generation, no entries
+            pass
+
+
+def clear_local_memo():
+    global _local_memo, _local_generations
+    with _local_lock:
+        _local_memo = None
+        _local_generations = None
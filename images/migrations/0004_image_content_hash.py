@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import hashlib
+import logging
+
+from django.db import migrations, models
+
+logger = logging.getLogger(__name__)
+
+
+def forwards_func(apps, schema_editor):
+    Image = apps.get_model('images', 'Image')
+
+    for image in Image.objects.filter(content_hash='').iterator():
+        content_hash = hashlib.sha1()
+        try:
+            image.file.open('rb')
+            for chunk in image.file.chunks():
+                content_hash.update(chunk)
+        except (IOError, OSError):
+            logger.warning('Could not read the file of the image %s', image.pk)
+            continue
+        finally:
+            image.file.close()
+
+        Image.objects.filter(pk=image.pk).update(content_hash=content_hash.hexdigest())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('images', '0003_remove_image_alt'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='image',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=40),
+        ),
+        migrations.RunPython(forwards_func, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('images', '0004_image_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueuedImage',
+            fields=[
+                ('image', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='images.Image')),
+                ('queued_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -1,3 +1,4 @@
+import hashlib
 import imghdr
 
 from django.db import models
@@ -6,6 +7,32 @@ from django.utils.text import slugify
 from wagtail.wagtailimages.models import Image as WagtailImage
 
 
+def get_content_hash(content):
+    """
+    Returns the hash of the image `content` (bytes).
+    """
+    return hashlib.sha1(content).hexdigest()
+
+
+def get_file_hash(f):
+    """
+    Returns the hash of the content of the file `f`, same as get_content_hash.
+    """
+    content_hash = hashlib.sha1()
+    for chunk in f.chunks():
+        content_hash.update(chunk)
+    f.seek(0)
+    return content_hash.hexdigest()
+
+
+def get_image_by_hash(content_hash, **filters):
+    """
+    Returns the oldest image with content hash == `content_hash` and matching `filters`
+    or None if it doesn't exist.
+    """
+    return Image.objects.filter(content_hash=content_hash, **filters).order_by('pk').first()
+
+
 class Image(WagtailImage):
     caption = models.CharField(
         max_length=255, blank=True,
@@ -16,6 +43,8 @@ class Image(WagtailImage):
         max_length=255
     )
     version = models.IntegerField(default=1)
+    # hash of the content of the original file, used to find duplicate images
+    content_hash = models.CharField(max_length=40, blank=True, db_index=True, editable=False)
 
     @property
     def alt(self):
@@ -47,8 +76,27 @@ class Image(WagtailImage):
             (imghdr.what(self.file) or 'jpg')
         )
 
+        # only computed once for each uploaded file
+        if not self.content_hash or not self.file._committed:
+            self.content_hash = get_file_hash(self.file)
+
         # increase version number
         if self.id:
             self.version = self.version + 1
 
         return super().save(*args, **kwargs)
+
+
+class QueuedImage(models.Model):
+    """
+    Image whose renditions have to be pre-generated by the `pregenerate_renditions --queue` worker,
+    out of the web processes.
+    """
+    image = models.OneToOneField(
+        Image, on_delete=models.CASCADE,
+        primary_key=True, related_name='+'
+    )
+    queued_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return str(self.image_id)
@@ -0,0 +1,250 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files import File
+from django.db import connections
+from PIL import Image as PILImage
+from wagtail.wagtailimages import get_image_model
+from wagtail.wagtailimages.exceptions import InvalidFilterSpecError
+from wagtail.wagtailimages.models import Filter, SourceImageIOError
+
+from .locks import GenerationLock
+from .models import QueuedImage
+
+logger = logging.getLogger(__name__)
+
+
+WEBP_FILTER_SPEC_SUFFIX = '|format-webp'
+
+
+@lru_cache()
+def is_webp_supported():
+    """
+    Returns True if Pillow was built with WebP support.
+    """
+    PILImage.init()
+    return 'WEBP' in PILImage.SAVE
+
+
+def is_webp_enabled():
+    return settings.IMAGE_WEBP_ENABLED and is_webp_supported()
+
+
+def get_existing_rendition(image, filter_spec, focal_point_key):
+    return image.renditions.filter(
+        filter_spec=filter_spec,
+        focal_point_key=focal_point_key
+    ).first()
+
+
+def get_or_generate(image, filter_spec, focal_point_key, generate, wait=None):
+    """
+    Returns the rendition of `image` with `filter_spec` and `focal_point_key`, calling `generate`
+    to create it if it doesn't exist.
+
+    Only one worker at a time generates a given rendition, the others wait up to `wait` seconds
+    (defaults to settings.IMAGE_RENDITION_LOCK_WAIT) for it and return None if it's still
+    not ready so that the caller can fall back to the original image.
+    """
+    rendition = get_existing_rendition(image, filter_spec, focal_point_key)
+    if rendition:
+        return rendition
+
+    if wait is None:
+        wait = settings.IMAGE_RENDITION_LOCK_WAIT
+
+    lock = GenerationLock('{}:{}:{}'.format(image.pk, filter_spec, focal_point_key))
+    if not lock.acquire(timeout=wait):
+        return None
+    try:
+        # it might have been generated by the worker holding the lock before
+        return get_existing_rendition(image, filter_spec, focal_point_key) or generate()
+    finally:
+        lock.release()
+
+
+def get_or_generate_rendition(image, filter_spec, wait=None):
+    """
+    Returns the rendition of `image` for `filter_spec`, generating it if it doesn't exist
+    or None if another worker is generating it (see `get_or_generate`).
+
+    Raises InvalidFilterSpecError or SourceImageIOError like Image.get_rendition.
+    """
+    image_filter = Filter(spec=filter_spec)
+    return get_or_generate(
+        image, image_filter.spec, image_filter.get_cache_key(image),
+        lambda: image.get_rendition(image_filter),
+        wait=wait
+    )
+
+
+def generate_webp_rendition(image, rendition):
+    """
+    Converts `rendition` to WebP and stores it as another rendition of `image`.
+
+    Wagtail can't output WebP so the conversion is done with Pillow.
+    """
+    rendition.file.open('rb')
+    try:
+        with PILImage.open(rendition.file) as pil_image:
+            if pil_image.mode not in ('RGB', 'RGBA'):
+                has_alpha = pil_image.mode in ('LA', 'PA') or 'transparency' in pil_image.info
+                pil_image = pil_image.convert('RGBA' if has_alpha else 'RGB')
+
+            output = BytesIO()
+            pil_image.save(output, 'WEBP', quality=settings.IMAGE_WEBP_QUALITY)
+    finally:
+        rendition.file.close()
+
+    file_name = os.path.splitext(os.path.basename(rendition.file.name))[0] + '.webp'
+    webp_rendition, _ = image.renditions.get_or_create(
+        filter_spec=rendition.filter_spec + WEBP_FILTER_SPEC_SUFFIX,
+        focal_point_key=rendition.focal_point_key,
+        defaults={'file': File(output, name=file_name)}
+    )
+    return webp_rendition
+
+
+def get_or_generate_webp_rendition(image, filter_spec, wait=None):
+    """
+    Returns the WebP version of the rendition of `image` for `filter_spec`, generating
+    the renditions needed if they don't exist or None if another worker is generating them.
+
+    GIF renditions are returned as they are as they might be animated.
+    """
+    rendition = get_or_generate_rendition(image, filter_spec, wait=wait)
+    if not rendition or rendition.file.name.lower().endswith('.gif'):
+        return rendition
+
+    return get_or_generate(
+        image, rendition.filter_spec + WEBP_FILTER_SPEC_SUFFIX, rendition.focal_point_key,
+        lambda: generate_webp_rendition(image, rendition),
+        wait=wait
+    )
+
+
+def get_missing_filter_specs(image, filter_specs):
+    """
+    Returns the list of `filter_specs` without a rendition of `image` yet.
+
+    Invalid filter specs are logged and skipped.
+    """
+    filters = []
+    for filter_spec in filter_specs:
+        image_filter = Filter(spec=filter_spec)
+        try:
+            filters.append((image_filter.spec, image_filter.get_cache_key(image)))
+        except InvalidFilterSpecError:
+            logger.error('Invalid filter spec %s', filter_spec)
+
+    existing = set(
+        image.renditions.filter(
+            filter_spec__in=[spec for spec, _ in filters]
+        ).values_list('filter_spec', 'focal_point_key')
+    )
+    return [spec for spec, cache_key in filters if (spec, cache_key) not in existing]
+
+
+def generate_renditions(image, filter_specs=None):
+    """
+    Generates the renditions of `image` for the `filter_specs` that don't exist yet
+    and returns the number of renditions created.
+
+    Renditions being generated by other workers are skipped.
+
+    `filter_specs` defaults to settings.IMAGE_PREGENERATED_FILTER_SPECS.
+    """
+    if filter_specs is None:
+        filter_specs = settings.IMAGE_PREGENERATED_FILTER_SPECS
+
+    created = 0
+    for filter_spec in get_missing_filter_specs(image, filter_specs):
+        try:
+            rendition = get_or_generate_rendition(image, filter_spec)
+        except SourceImageIOError:
+            logger.warning('Source file of image %s not found', image.pk)
+            break
+        if rendition:
+            created += 1
+    return created
+
+
+def generate_image_renditions(image_id, filter_specs=None):
+    """
+    Generates the missing renditions of the image with id `image_id`.
+
+    Returns the number of renditions created, 0 if the image doesn't exist (any more).
+    """
+    image = get_image_model().objects.filter(pk=image_id).first()
+    if not image:
+        return 0
+    return generate_renditions(image, filter_specs)
+
+
+def _generate_image_renditions_in_process(image_id, filter_specs):
+    try:
+        return generate_image_renditions(image_id, filter_specs)
+    except Exception:
+        logger.exception('Could not generate the renditions of image %s', image_id)
+        return 0
+
+
+def generate_renditions_in_pool(image_ids, filter_specs=None, processes=None):
+    """
+    Generates the missing renditions of the images with ids `image_ids` using a pool of
+    `processes` processes (defaults to settings.IMAGE_PREGENERATION_PROCESSES).
+
+    Yields (image id, number of renditions created) as the images get processed.
+    """
+    if filter_specs is None:
+        filter_specs = settings.IMAGE_PREGENERATED_FILTER_SPECS
+    processes = processes or settings.IMAGE_PREGENERATION_PROCESSES
+    image_ids = list(image_ids)
+
+    if processes <= 1:
+        for image_id in image_ids:
+            yield image_id, _generate_image_renditions_in_process(image_id, filter_specs)
+        return
+
+    # forked processes must not share the db connections of the parent
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        results = executor.map(
+            _generate_image_renditions_in_process,
+            image_ids, [filter_specs] * len(image_ids),
+            chunksize=10
+        )
+        yield from zip(image_ids, results)
+
+
+def queue_image_renditions(image_id):
+    """
+    Queues the generation of the missing renditions of the image with id `image_id`, done out of
+    the web processes by the `pregenerate_renditions --queue` worker so that the request uploading
+    the image doesn't have to wait for them or compete with other requests for the CPU.
+    """
+    if settings.IMAGE_PREGENERATED_FILTER_SPECS:
+        QueuedImage.objects.update_or_create(image_id=image_id)
+
+
+def generate_queued_renditions(processes=None, limit=100):
+    """
+    Generates the missing renditions of up to `limit` queued images, removing them from the queue,
+    using a pool of `processes` processes (see generate_renditions_in_pool).
+
+    Yields (image id, number of renditions created) as the images get processed.
+    """
+    queued = list(QueuedImage.objects.order_by('queued_at').values_list('image_id', 'queued_at')[:limit])
+    if not queued:
+        return
+
+    # images queued again in the meantime stay in the queue, their file might have changed
+    image_ids = [image_id for image_id, _ in queued]
+    QueuedImage.objects.filter(
+        image_id__in=image_ids, queued_at__lte=max(queued_at for _, queued_at in queued)
+    ).delete()
+    yield from generate_renditions_in_pool(image_ids, processes=processes)
@@ -0,0 +1,21 @@
+from django.db.models.signals import post_delete, post_save
+
+from .memo import invalidate_image
+from .models import Image
+from .renditions import queue_image_renditions
+
+
+def image_saved_signal_handler(instance, **kwargs):
+    # the file might have changed, the renditions that already exist are skipped anyway
+    queue_image_renditions(instance.pk)
+
+
+def image_changed_signal_handler(instance, **kwargs):
+    invalidate_image(instance.pk)
+
+
+def register_signal_handlers():
+    post_save.connect(image_saved_signal_handler, sender=Image)
+
+    post_save.connect(image_changed_signal_handler, sender=Image)
+    post_delete.connect(image_changed_signal_handler, sender=Image)
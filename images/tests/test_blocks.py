@@ -5,7 +5,7 @@ from wagtail.wagtailcore.models import Collection
 from wagtail.wagtailimages import get_image_model
 from wagtail.wagtailimages.tests.utils import get_test_image_file
 
-from images.blocks import ImageChooserBlock
+from images.blocks import ImageChooserBlock, prefetched_images
 
 
 class ImageChooserBlockTestCase(TestCase):
@@ -70,3 +70,20 @@ class ImageChooserBlockTestCase(TestCase):
 
         for key, value in expected_data.items():
             self.assertEqual(representation[key], value)
+
+    def test_prefetched_images(self):
+        """
+        Tests that prefetched images are returned without hitting the db again.
+        """
+        block = ImageChooserBlock()
+
+        with prefetched_images([self.image.id, 9999]):
+            with self.assertNumQueries(0):
+                self.assertEqual(block.to_python(self.image.id), self.image)
+                self.assertEqual(block.to_python(9999), None)
+                self.assertEqual(
+                    block.bulk_to_python([9999, self.image.id]), [None, self.image]
+                )
+
+        with self.assertNumQueries(1):
+            self.assertEqual(block.to_python(self.image.id), self.image)
@@ -0,0 +1,234 @@
+import os
+import tempfile
+import threading
+from unittest import mock
+
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from images.factories import ImageFactory
+from images.locks import (
+    GenerationLock, _local_locks, get_advisory_lock_id, get_metrics,
+    reset_metrics
+)
+from images.renditions import get_or_generate_rendition
+
+SHARED_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(tempfile.gettempdir(), 'nhsuk-rendition-lock-tests'),
+    }
+}
+
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'rendition-lock-tests',
+    }
+}
+
+
+@override_settings(CACHES=SHARED_CACHES)
+class GenerationLockTestCase(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+
+    def tearDown(self):
+        caches['default'].clear()
+
+    def test_acquire_and_release(self):
+        lock = GenerationLock('key')
+        self.assertTrue(lock.acquire(timeout=0))
+        lock.release()
+
+        other_lock = GenerationLock('key')
+        self.assertTrue(other_lock.acquire(timeout=0))
+        other_lock.release()
+
+        self.assertEqual(_local_locks, {})
+        self.assertEqual(get_metrics()['acquired'], 2)
+        self.assertEqual(get_metrics()['contended'], 0)
+
+    def test_held_by_another_process(self):
+        """
+        Tests that if the lease is held by another process, it times out.
+        """
+        caches['default'].add('images:rendition-lock:key', 'other-token')
+
+        lock = GenerationLock('key')
+        self.assertFalse(lock.acquire(timeout=0.1))
+
+        metrics = get_metrics()
+        self.assertEqual(metrics['timed_out'], 1)
+        self.assertEqual(metrics['contended'], 1)
+        self.assertGreater(metrics['wait_ms'], 0)
+        self.assertEqual(_local_locks, {})
+
+    def test_held_by_another_thread(self):
+        lock = GenerationLock('key')
+        self.assertTrue(lock.acquire(timeout=0))
+
+        results = []
+        thread = threading.Thread(target=lambda: results.append(GenerationLock('key').acquire(timeout=0.1)))
+        thread.start()
+        thread.join()
+
+        self.assertEqual(results, [False])
+        lock.release()
+
+    def test_released_while_waiting(self):
+        lock = GenerationLock('key')
+        self.assertTrue(lock.acquire(timeout=0))
+
+        timer = threading.Timer(0.1, lock.release)
+        timer.start()
+
+        other_lock = GenerationLock('key')
+        self.assertTrue(other_lock.acquire(timeout=5))
+        other_lock.release()
+        timer.join()
+
+        self.assertEqual(get_metrics()['contended'], 1)
+
+    def test_expired_lease_not_released_by_previous_owner(self):
+        lock = GenerationLock('key')
+        self.assertTrue(lock.acquire(timeout=0))
+
+        # the lease expires and gets acquired by another process
+        caches['default'].set('images:rendition-lock:key', 'other-token')
+        lock.release()
+
+        self.assertEqual(caches['default'].get('images:rendition-lock:key'), 'other-token')
+
+    def test_cache_not_available(self):
+        """
+        Tests that if the cache is not available, the local lock is used.
+        """
+        with mock.patch('django.core.cache.backends.filebased.FileBasedCache.add', side_effect=Exception):
+            lock = GenerationLock('key')
+            self.assertTrue(lock.acquire(timeout=0))
+            lock.release()
+
+    def test_reset_metrics(self):
+        lock = GenerationLock('key')
+        lock.acquire(timeout=0)
+        lock.release()
+
+        reset_metrics()
+        self.assertEqual(get_metrics()['acquired'], 0)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class AdvisoryLockTestCase(TransactionTestCase):
+    """
+    Tests that with a cache not shared between processes, Postgres advisory locks are used.
+    """
+    serialized_rollback = True
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def hold_in_other_connection(self, key):
+        """
+        Acquires the advisory lock for `key` from another db connection, as another process would,
+        until the returned event is set.
+        """
+        acquired, release = threading.Event(), threading.Event()
+
+        def hold():
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT pg_advisory_lock(%s)', [get_advisory_lock_id(key)])
+                    acquired.set()
+                    release.wait()
+                    cursor.execute('SELECT pg_advisory_unlock(%s)', [get_advisory_lock_id(key)])
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=hold)
+        thread.start()
+        acquired.wait()
+        self.addCleanup(thread.join)
+        self.addCleanup(release.set)
+        return release
+
+    def test_acquire_and_release(self):
+        lock = GenerationLock('key')
+        self.assertTrue(lock.acquire(timeout=0))
+        self.assertFalse(lock.has_lease)
+        self.assertTrue(lock.has_advisory_lock)
+        lock.release()
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT count(*) FROM pg_locks WHERE locktype = %s AND pid = pg_backend_pid()', ['advisory']
+            )
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+    def test_held_by_another_process(self):
+        self.hold_in_other_connection('images:rendition-lock:key')
+
+        lock = GenerationLock('key')
+        self.assertFalse(lock.acquire(timeout=0.1))
+        self.assertEqual(_local_locks, {})
+
+    def test_released_while_waiting(self):
+        release = self.hold_in_other_connection('images:rendition-lock:key')
+        timer = threading.Timer(0.1, release.set)
+        timer.start()
+
+        lock = GenerationLock('key')
+        self.assertTrue(lock.acquire(timeout=5))
+        lock.release()
+        timer.join()
+
+
+@override_settings(CACHES=SHARED_CACHES)
+class GetOrGenerateRenditionTestCase(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.image = ImageFactory(title='Test image')
+
+    def tearDown(self):
+        caches['default'].clear()
+
+    def get_lock_key(self, filter_spec):
+        return 'images:rendition-lock:{}:{}:'.format(self.image.pk, filter_spec)
+
+    def test_generates(self):
+        rendition = get_or_generate_rendition(self.image, 'width-100')
+        self.assertEqual(rendition.filter_spec, 'width-100')
+        self.assertEqual(get_metrics()['acquired'], 1)
+
+    def test_existing_does_not_lock(self):
+        self.image.get_rendition('width-100')
+        caches['default'].add(self.get_lock_key('width-100'), 'other-token')
+
+        rendition = get_or_generate_rendition(self.image, 'width-100', wait=0)
+        self.assertEqual(rendition.filter_spec, 'width-100')
+        self.assertEqual(get_metrics()['acquired'], 0)
+
+    def test_being_generated_by_another_worker(self):
+        caches['default'].add(self.get_lock_key('width-100'), 'other-token')
+
+        self.assertIsNone(get_or_generate_rendition(self.image, 'width-100', wait=0.1))
+        self.assertFalse(self.image.renditions.exists())
+
+    def test_generated_by_another_worker_while_waiting(self):
+        """
+        Tests that if the rendition gets generated while waiting for the lock, it's not generated again.
+        """
+        rendition = self.image.get_rendition('width-100')
+        caches['default'].add(self.get_lock_key('width-100'), 'other-token')
+        timer = threading.Timer(0.1, caches['default'].delete, args=(self.get_lock_key('width-100'),))
+
+        # missing before waiting, then generated by the other worker
+        with mock.patch('images.renditions.get_existing_rendition', side_effect=[None, rendition]), \
+                mock.patch.object(self.image, 'get_rendition') as mocked_get_rendition:
+            timer.start()
+            self.assertEqual(get_or_generate_rendition(self.image, 'width-100', wait=5), rendition)
+            timer.join()
+
+        self.assertFalse(mocked_get_rendition.called)
+        self.assertEqual(get_metrics()['contended'], 1)
@@ -0,0 +1,174 @@
+from django.core.cache import caches
+from django.core.urlresolvers import resolve, reverse
+from django.test import RequestFactory, TestCase, override_settings
+from wagtail.wagtailimages.views.serve import generate_signature
+
+from images.factories import ImageFactory
+from images.memo import (
+    LRU, RenditionMemo, clear_local_memo, get_local_generation, get_local_lrus,
+    invalidate_image
+)
+from images.views import ServeView
+
+SHARED_MEMO_SETTINGS = {
+    'CACHES': {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+        },
+        'memo': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'serve-memo-tests',
+        }
+    },
+    'IMAGE_SERVE_MEMO_CACHE_ALIAS': 'memo',
+}
+
+
+class LRUTestCase(TestCase):
+    def test_discards_least_recently_used(self):
+        lru = LRU(2)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+
+        self.assertEqual(lru.get('a'), 1)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual(lru.get('c'), 3)
+
+    def test_setdefault(self):
+        lru = LRU(2)
+        self.assertEqual(lru.setdefault('a', 1), 1)
+        self.assertEqual(lru.setdefault('a', 2), 1)
+
+
+class RenditionMemoTestCase(TestCase):
+    def setUp(self):
+        clear_local_memo()
+        self.image = ImageFactory(title='Test image')
+        self.rendition = self.image.get_rendition('width-100')
+
+    def tearDown(self):
+        clear_local_memo()
+
+    def get_memo(self, signature='signature'):
+        return RenditionMemo(signature, str(self.image.id), 'width-100', self.image.slug)
+
+    def test_get_and_set(self):
+        memo = self.get_memo()
+        self.assertIsNone(memo.get())
+        memo.set(self.rendition)
+
+        memoized = self.get_memo().get()
+        self.assertEqual(memoized.file.name, self.rendition.file.name)
+        self.assertEqual(memoized.url, self.rendition.url)
+
+        self.assertIsNone(self.get_memo(signature='other').get())
+
+    @override_settings(IMAGE_SERVE_MEMO_SIZE=1)
+    def test_size_from_settings(self):
+        memo, generations = get_local_lrus()
+        self.assertEqual(memo.maxsize, 1)
+        self.assertEqual(generations.maxsize, 1)
+
+    @override_settings(IMAGE_SERVE_MEMO_SIZE=1)
+    def test_generation_discarded(self):
+        """
+        Tests that when the generation of an image is discarded, its entries are not valid any more.
+        """
+        memo = self.get_memo()
+        memo.get()
+        memo.set(self.rendition)
+        self.assertIsNotNone(self.get_memo().get())
+
+        get_local_generation('other-image')
+
+        self.assertIsNone(self.get_memo().get())
+
+    def test_invalidated_when_the_image_changes(self):
+        memo = self.get_memo()
+        memo.get()
+        memo.set(self.rendition)
+
+        self.image.save()
+        self.assertIsNone(self.get_memo().get())
+
+    def test_changes_while_resolving(self):
+        """
+        Tests that if the image changes between `get` and `set`, the entry is not valid.
+        """
+        memo = self.get_memo()
+        memo.get()
+        invalidate_image(self.image.id)
+        memo.set(self.rendition)
+
+        self.assertIsNone(self.get_memo().get())
+
+    @override_settings(IMAGE_SERVE_MEMO_LOCAL_TIMEOUT=0)
+    def test_local_entries_expire(self):
+        memo = self.get_memo()
+        memo.get()
+        memo.set(self.rendition)
+
+        self.assertIsNone(self.get_memo().get())
+
+    @override_settings(**SHARED_MEMO_SETTINGS)
+    def test_shared(self):
+        caches['memo'].clear()
+        memo = self.get_memo()
+        memo.get()
+        memo.set(self.rendition)
+
+        # as if it was another process
+        clear_local_memo()
+        self.assertEqual(self.get_memo().get().file.name, self.rendition.file.name)
+
+        clear_local_memo()
+        invalidate_image(self.image.id)
+        self.assertIsNone(self.get_memo().get())
+
+
+class ServeViewMemoTestCase(TestCase):
+    def setUp(self):
+        clear_local_memo()
+        self.image = ImageFactory(title='Test image')
+
+    def tearDown(self):
+        clear_local_memo()
+
+    def get_url(self, filter_spec='fill-800x600', signature=None):
+        return reverse(
+            'images_serve',
+            args=(
+                signature or generate_signature(self.image.id, filter_spec, key=ServeView.key),
+                self.image.id, filter_spec, self.image.version, self.image.slug
+            )
+        )
+
+    def get_response(self, url):
+        # calling the view directly as the middleware query the db
+        return ServeView.as_view()(RequestFactory().get(url), **resolve(url).kwargs)
+
+    def test_served_without_queries(self):
+        url = self.get_url()
+        response = self.get_response(url)
+        self.assertEqual(response.status_code, 200)
+
+        with self.assertNumQueries(0):
+            response = self.get_response(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertTrue(b''.join(response.streaming_content))
+
+    def test_wrong_signature_not_memoized(self):
+        url = self.get_url(signature=generate_signature(self.image.id, 'fill-800x700', key=ServeView.key))
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+    def test_image_changed(self):
+        url = self.get_url()
+        self.assertEqual(self.get_response(url).status_code, 200)
+
+        self.image.save()
+
+        self.assertEqual(self.client.get(url).status_code, 404)
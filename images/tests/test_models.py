@@ -1,8 +1,12 @@
+from unittest import mock
+
 from django.test import TestCase
 from wagtail.wagtailcore.models import Collection
 from wagtail.wagtailimages import get_image_model
 from wagtail.wagtailimages.tests.utils import get_test_image_file
 
+from ..models import get_content_hash, get_file_hash, get_image_by_hash
+
 
 class BaseImageTestCase(TestCase):
     def setUp(self):
@@ -74,3 +78,50 @@ class ImageVersionTestCase(BaseImageTestCase):
 
         image.save()
         self.assertEqual(image.version, 3)
+
+
+class ImageContentHashTestCase(BaseImageTestCase):
+    def test_create(self):
+        image = get_image_model().objects.create(
+            title="Test image",
+            file=get_test_image_file()
+        )
+
+        image.file.open()
+        self.assertEqual(image.content_hash, get_content_hash(image.file.read()))
+        image.file.close()
+
+    def test_same_file(self):
+        image = get_image_model().objects.create(
+            title="Test image",
+            file=get_test_image_file()
+        )
+        other_image = get_image_model().objects.create(
+            title="Other image",
+            file=get_test_image_file()
+        )
+
+        self.assertEqual(image.content_hash, other_image.content_hash)
+        self.assertEqual(get_image_by_hash(image.content_hash), image)
+
+    def test_new_file(self):
+        image = get_image_model().objects.create(
+            title="Test image",
+            file=get_test_image_file()
+        )
+        content_hash = image.content_hash
+
+        image.file = get_test_image_file(size=(100, 50))
+        image.save()
+        self.assertNotEqual(image.content_hash, content_hash)
+
+    @mock.patch('images.models.get_file_hash', wraps=get_file_hash)
+    def test_computed_once(self, mocked_get_file_hash):
+        image = get_image_model().objects.create(
+            title="Test image",
+            file=get_test_image_file()
+        )
+        image.title = 'Something else'
+        image.save()
+
+        self.assertEqual(mocked_get_file_hash.call_count, 1)
@@ -0,0 +1,153 @@
+from io import StringIO
+from unittest import mock, skipUnless
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from images.factories import ImageFactory
+from images.models import QueuedImage
+from images.renditions import (
+    generate_image_renditions, generate_queued_renditions, generate_renditions,
+    generate_renditions_in_pool, get_missing_filter_specs,
+    get_or_generate_webp_rendition, is_webp_supported, queue_image_renditions
+)
+
+
+class GenerateRenditionsTestCase(TestCase):
+    def setUp(self):
+        self.image = ImageFactory(title='Test image')
+
+    def test_missing_filter_specs(self):
+        self.image.get_rendition('width-100')
+
+        self.assertEqual(
+            get_missing_filter_specs(self.image, ['width-100', 'width-200']),
+            ['width-200']
+        )
+
+    def test_missing_filter_specs_with_focal_point(self):
+        """
+        Tests that renditions created before changing the focal point are not considered.
+        """
+        self.image.get_rendition('fill-100x100')
+        self.image.focal_point_x = 10
+        self.image.focal_point_y = 10
+        self.image.focal_point_width = 10
+        self.image.focal_point_height = 10
+
+        self.assertEqual(
+            get_missing_filter_specs(self.image, ['fill-100x100']),
+            ['fill-100x100']
+        )
+
+    def test_generate_skips_existing(self):
+        self.image.get_rendition('width-100')
+
+        created = generate_renditions(self.image, ['width-100', 'width-200'])
+        self.assertEqual(created, 1)
+        self.assertEqual(
+            sorted(self.image.renditions.values_list('filter_spec', flat=True)),
+            ['width-100', 'width-200']
+        )
+
+        self.assertEqual(generate_renditions(self.image, ['width-100', 'width-200']), 0)
+
+    @override_settings(IMAGE_PREGENERATED_FILTER_SPECS=['width-50'])
+    def test_generate_defaults_to_settings(self):
+        self.assertEqual(generate_renditions(self.image), 1)
+        self.assertEqual(self.image.renditions.get().filter_spec, 'width-50')
+
+    def test_generate_invalid_filter_spec(self):
+        self.assertEqual(generate_renditions(self.image, ['fill-800', 'width-100']), 1)
+
+    def test_generate_missing_image(self):
+        self.assertEqual(generate_image_renditions(1111111111, ['width-100']), 0)
+
+    def test_generate_in_pool_sequentially(self):
+        other_image = ImageFactory(title='Other image')
+
+        results = list(generate_renditions_in_pool(
+            [self.image.pk, other_image.pk], filter_specs=['width-100', 'width-200'], processes=1
+        ))
+        self.assertEqual(results, [(self.image.pk, 2), (other_image.pk, 2)])
+
+    @override_settings(IMAGE_PREGENERATED_FILTER_SPECS=['width-100'])
+    def test_management_command(self):
+        other_image = ImageFactory(title='Other image')
+        self.image.get_rendition('width-100')
+
+        out = StringIO()
+        call_command('pregenerate_renditions', processes=1, stdout=out)
+
+        self.assertIn('1 renditions created for 2 images', out.getvalue())
+        self.assertTrue(other_image.renditions.filter(filter_spec='width-100').exists())
+
+
+@skipUnless(is_webp_supported(), 'Pillow was built without WebP support')
+class WebPRenditionTestCase(TestCase):
+    def setUp(self):
+        self.image = ImageFactory(title='Test image')
+
+    def test_generate(self):
+        rendition = get_or_generate_webp_rendition(self.image, 'width-100')
+
+        self.assertEqual(rendition.filter_spec, 'width-100|format-webp')
+        self.assertTrue(rendition.file.name.endswith('.webp'))
+        self.assertEqual(rendition.width, 100)
+        self.assertCountEqual(
+            self.image.renditions.values_list('filter_spec', flat=True),
+            ['width-100', 'width-100|format-webp']
+        )
+
+    def test_existing(self):
+        rendition = get_or_generate_webp_rendition(self.image, 'width-100')
+        self.assertEqual(get_or_generate_webp_rendition(self.image, 'width-100'), rendition)
+        self.assertEqual(self.image.renditions.count(), 2)
+
+    def test_not_counted_as_original_format(self):
+        get_or_generate_webp_rendition(self.image, 'width-100')
+        self.assertEqual(get_missing_filter_specs(self.image, ['width-100', 'width-200']), ['width-200'])
+
+
+class QueuedGenerationTestCase(TestCase):
+    """
+    Tests related to generating the renditions of the images queued when saved.
+    """
+    def setUp(self):
+        self.image = ImageFactory(title='Test image')
+
+    def test_queued_when_saved(self):
+        self.assertTrue(QueuedImage.objects.filter(image=self.image).exists())
+
+        self.image.save()
+        self.assertEqual(QueuedImage.objects.count(), 1)
+
+    @override_settings(IMAGE_PREGENERATED_FILTER_SPECS=[])
+    def test_nothing_to_generate(self):
+        QueuedImage.objects.all().delete()
+        ImageFactory(title='Other image')
+        self.assertFalse(QueuedImage.objects.exists())
+
+    @override_settings(IMAGE_PREGENERATED_FILTER_SPECS=['width-100'])
+    def test_generate_queued(self):
+        other_image = ImageFactory(title='Other image')
+
+        results = list(generate_queued_renditions(processes=1))
+
+        self.assertCountEqual(results, [(self.image.pk, 1), (other_image.pk, 1)])
+        self.assertFalse(QueuedImage.objects.exists())
+        self.assertTrue(other_image.renditions.filter(filter_spec='width-100').exists())
+        self.assertEqual(list(generate_queued_renditions(processes=1)), [])
+
+    @override_settings(IMAGE_PREGENERATED_FILTER_SPECS=['width-100'])
+    def test_queued_again_while_generating(self):
+        """
+        Tests that an image saved again while its renditions are being generated stays in the queue.
+        """
+        def generate(image_ids, processes=None):
+            queue_image_renditions(self.image.pk)
+            return [(image_id, 0) for image_id in image_ids]
+
+        with mock.patch('images.renditions.generate_renditions_in_pool', side_effect=generate):
+            self.assertEqual(list(generate_queued_renditions(processes=1)), [(self.image.pk, 0)])
+        self.assertTrue(QueuedImage.objects.filter(image=self.image).exists())
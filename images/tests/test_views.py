@@ -1,19 +1,25 @@
-from django.core.urlresolvers import reverse
-from django.test import TestCase
+from unittest import mock, skipUnless
+
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.urlresolvers import resolve, reverse
+from django.test import RequestFactory, TestCase, override_settings
+from wagtail.wagtailimages.models import Filter
 from wagtail.wagtailimages.views.serve import generate_signature
 
 from images.factories import ImageFactory
-from images.views import ServeView
+from images.renditions import is_webp_supported
+from images.views import ServeView, accepts_webp, get_content_type
 
 
 class ServeViewTestCase(TestCase):
     def setUp(self):
         self.image = ImageFactory(title="Test image")
 
-    def _get_url(self, signature, image_id, filter_spec, slug, key=ServeView.key):
+    def _get_url(self, signature, image_id, filter_spec, slug, key=ServeView.key, version=1):
         return reverse(
             'images_serve',
-            args=(signature, image_id, filter_spec, slug)
+            args=(signature, image_id, filter_spec, version, slug)
         )
 
     def test_success(self):
@@ -28,6 +34,47 @@ class ServeViewTestCase(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertTrue(response.streaming)
         self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertTrue(response['ETag'])
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('max-age=31536000', response['Cache-Control'])
+
+    def test_if_none_match(self):
+        """
+        Tests that if the client already has the rendition, it returns 304 without any db query.
+        """
+        signature = generate_signature(self.image.id, 'fill-800x600', key=ServeView.key)
+        url = self._get_url(signature, self.image.id, 'fill-800x600', self.image.slug)
+        etag = self.client.get(url)['ETag']
+
+        # calling the view directly as the middleware query the db
+        request = RequestFactory().get(url, HTTP_IF_NONE_MATCH=etag)
+        with self.assertNumQueries(0):
+            response = ServeView.as_view()(request, **resolve(url).kwargs)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_etag_changes_with_the_image(self):
+        signature = generate_signature(self.image.id, 'fill-800x600', key=ServeView.key)
+        etag = self.client.get(
+            self._get_url(signature, self.image.id, 'fill-800x600', self.image.slug)
+        )['ETag']
+
+        self.image.save()
+        response = self.client.get(
+            self._get_url(signature, self.image.id, 'fill-800x600', self.image.slug, version=self.image.version),
+            HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_if_none_match_with_wrong_signature(self):
+        signature = generate_signature(self.image.id, 'fill-800x700', key=ServeView.key)
+        url = self._get_url(signature, self.image.id, 'fill-800x600', self.image.slug)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, 403)
 
     def test_wrong_signature(self):
         # generate wrong signature (different filter spec)
@@ -75,3 +122,174 @@ class ServeViewTestCase(TestCase):
 
         # check response
         self.assertEqual(response.status_code, 404)
+
+    @override_settings(CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'serve-view-tests',
+        }
+    }, IMAGE_RENDITION_LOCK_WAIT=0)
+    def test_rendition_being_generated(self):
+        """
+        Tests that if another worker is generating the rendition, the original image is returned
+        and is not cached.
+        """
+        signature = generate_signature(self.image.id, 'fill-800x600', key=ServeView.key)
+        lock_key = 'images:rendition-lock:{}:fill-800x600:{}'.format(
+            self.image.id, Filter(spec='fill-800x600').get_cache_key(self.image)
+        )
+        caches['default'].add(lock_key, 'other-token')
+
+        url = self._get_url(signature, self.image.id, 'fill-800x600', self.image.slug)
+        try:
+            response = self.client.get(url)
+        finally:
+            caches['default'].clear()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertIn('max-age=0', response['Cache-Control'])
+        self.assertNotIn('ETag', response)
+        self.assertFalse(self.image.renditions.exists())
+
+    @mock.patch('images.views.is_webp_enabled', return_value=True)
+    @mock.patch('images.views.get_or_generate_webp_rendition')
+    def test_webp_negotiation(self, mocked_get_webp_rendition, mocked_is_webp_enabled):
+        """
+        Tests that clients accepting WebP get the WebP rendition with a different ETag.
+        """
+        mocked_get_webp_rendition.side_effect = lambda image, filter_spec: image.get_rendition(filter_spec)
+        signature = generate_signature(self.image.id, 'fill-800x600', key=ServeView.key)
+        url = self._get_url(signature, self.image.id, 'fill-800x600', self.image.slug)
+
+        response = self.client.get(url, HTTP_ACCEPT='image/webp,image/*,*/*;q=0.8')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Accept', response['Vary'])
+        self.assertTrue(mocked_get_webp_rendition.called)
+
+        other_response = self.client.get(url, HTTP_ACCEPT='image/*', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(other_response.status_code, 200)
+        self.assertNotEqual(other_response['ETag'], response['ETag'])
+        self.assertIn('Accept', other_response['Vary'])
+        self.assertEqual(mocked_get_webp_rendition.call_count, 1)
+
+    @skipUnless(is_webp_supported(), 'Pillow was built without WebP support')
+    @override_settings(IMAGE_WEBP_ENABLED=True)
+    def test_webp_content_type(self):
+        """
+        Tests that WebP renditions are served with the WebP content type.
+        """
+        signature = generate_signature(self.image.id, 'fill-800x600', key=ServeView.key)
+        url = self._get_url(signature, self.image.id, 'fill-800x600', self.image.slug)
+
+        response = self.client.get(url, HTTP_ACCEPT='image/webp,image/*,*/*;q=0.8')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertTrue(self.image.renditions.filter(file__endswith='.webp').exists())
+
+    @mock.patch('images.views.is_webp_enabled', return_value=False)
+    def test_webp_disabled(self, mocked_is_webp_enabled):
+        signature = generate_signature(self.image.id, 'fill-800x600', key=ServeView.key)
+        url = self._get_url(signature, self.image.id, 'fill-800x600', self.image.slug)
+
+        response = self.client.get(url, HTTP_ACCEPT='image/webp')
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertNotIn('Accept', response.get('Vary', ''))
+
+    @mock.patch('images.views.is_webp_enabled', return_value=True)
+    @mock.patch('images.views.get_or_generate_webp_rendition')
+    def test_webp_not_acceptable(self, mocked_get_webp_rendition, mocked_is_webp_enabled):
+        """
+        Tests that clients sending image/webp with q=0 get the original format.
+        """
+        signature = generate_signature(self.image.id, 'fill-800x600', key=ServeView.key)
+        url = self._get_url(signature, self.image.id, 'fill-800x600', self.image.slug)
+
+        response = self.client.get(url, HTTP_ACCEPT='image/webp;q=0,image/*')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertIn('Accept', response['Vary'])
+        self.assertFalse(mocked_get_webp_rendition.called)
+
+
+class AcceptsWebpTestCase(TestCase):
+    def accepts_webp(self, accept):
+        return accepts_webp(RequestFactory().get('/', HTTP_ACCEPT=accept))
+
+    def test_accepted(self):
+        self.assertTrue(self.accepts_webp('image/webp'))
+        self.assertTrue(self.accepts_webp('image/webp,image/*,*/*;q=0.8'))
+        self.assertTrue(self.accepts_webp('image/png, image/webp ; q=0.5'))
+
+    def test_not_accepted(self):
+        self.assertFalse(self.accepts_webp(''))
+        self.assertFalse(self.accepts_webp('image/*,*/*;q=0.8'))
+        self.assertFalse(self.accepts_webp('image/webp;q=0,image/*'))
+        self.assertFalse(self.accepts_webp('image/webp;q=0.0'))
+        self.assertFalse(self.accepts_webp('image/webp;q=invalid'))
+        self.assertFalse(self.accepts_webp('image/webpx'))
+
+
+class GetContentTypeTestCase(TestCase):
+    def test_webp(self):
+        self.assertEqual(get_content_type('images/test.2e16d0ba.fill-800x600.webp'), 'image/webp')
+
+    def test_other_formats(self):
+        self.assertEqual(get_content_type('images/test.2e16d0ba.fill-800x600.png'), 'image/png')
+        self.assertEqual(get_content_type('images/test.2e16d0ba.fill-800x600.JPG'), 'image/jpeg')
+        self.assertEqual(get_content_type('original_images/test.gif'), 'image/gif')
+
+    def test_unknown(self):
+        self.assertEqual(get_content_type('original_images/test'), 'application/octet-stream')
+
+
+class ServeViewSendfileTestCase(TestCase):
+    def setUp(self):
+        self.image = ImageFactory(title="Test image")
+        self.view = ServeView.as_view(action='sendfile')
+
+    def get_response(self, filter_spec='fill-800x600'):
+        request = RequestFactory().get('/')
+        return self.view(
+            request,
+            signature=generate_signature(self.image.id, filter_spec, key=ServeView.key),
+            image_id=str(self.image.id),
+            filter_spec=filter_spec,
+            version=str(self.image.version),
+            slug=self.image.slug
+        )
+
+    def test_x_accel_redirect(self):
+        response = self.get_response()
+
+        rendition = self.image.renditions.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/' + rendition.file.name)
+        self.assertIn('immutable', response['Cache-Control'])
+
+    @override_settings(IMAGE_SENDFILE_HEADER='X-Sendfile')
+    def test_x_sendfile(self):
+        response = self.get_response()
+
+        rendition = self.image.renditions.get()
+        self.assertEqual(response['X-Sendfile'], rendition.file.path)
+        self.assertFalse(response.has_header('X-Accel-Redirect'))
+
+    def test_remote_storage(self):
+        """
+        Tests that if the file is not stored locally, it redirects temporarily to its url.
+        """
+        rendition = self.image.get_rendition('fill-800x600')
+        with mock.patch('django.core.files.storage.FileSystemStorage.path', side_effect=NotImplementedError):
+            response = self.get_response()
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response['Location'], rendition.url)
+        self.assertEqual(response['Cache-Control'], 'max-age=300')
+        self.assertNotIn('ETag', response)
+
+    def test_invalid_action(self):
+        with self.assertRaises(ImproperlyConfigured):
+            ServeView.as_view(action='invalid')
@@ -1,56 +1,209 @@
-import imghdr
+import hashlib
+import mimetypes
+import os
+from urllib.parse import quote, urljoin
 from wsgiref.util import FileWrapper
 
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured, PermissionDenied
 from django.http import (
-    HttpResponse, HttpResponsePermanentRedirect, StreamingHttpResponse
+    HttpResponse, HttpResponsePermanentRedirect, HttpResponseRedirect,
+    StreamingHttpResponse
 )
 from django.shortcuts import get_object_or_404
+from django.utils.cache import (
+    add_never_cache_headers, get_conditional_response, patch_cache_control,
+    patch_vary_headers
+)
 from django.utils.decorators import classonlymethod
+from django.utils.http import quote_etag
 from django.views.generic import View
 from wagtail.wagtailimages import get_image_model
 from wagtail.wagtailimages.exceptions import InvalidFilterSpecError
 from wagtail.wagtailimages.models import SourceImageIOError
 from wagtail.wagtailimages.views.serve import verify_signature
 
+from .memo import RenditionMemo
+from .renditions import (
+    get_or_generate_rendition, get_or_generate_webp_rendition, is_webp_enabled
+)
+
+
+def get_rendition_etag(image_id, filter_spec, version, slug, image_format=''):
+    """
+    Returns a strong ETag for the rendition identified by the values in the url
+    and by the negotiated `image_format` ('' for the original one).
+
+    The slug of an image changes every time the image is saved so these values identify
+    the content of the rendition without having to look anything up.
+    """
+    return hashlib.sha1(
+        '{}|{}|{}|{}|{}'.format(image_id, version, filter_spec, slug, image_format).encode('utf-8')
+    ).hexdigest()
+
+
+# content types of the formats renditions can be generated in, not left to the mimetypes
+# table of the host which doesn't always know about WebP
+IMAGE_CONTENT_TYPES = {
+    '.gif': 'image/gif',
+    '.jpeg': 'image/jpeg',
+    '.jpg': 'image/jpeg',
+    '.png': 'image/png',
+    '.webp': 'image/webp',
+}
+
+
+def get_accept_quality(params):
+    """
+    Returns the quality value in the list of `params` of a media range in an Accept header,
+    1 if not specified and 0 if not valid.
+    """
+    for param in params:
+        name, _, value = param.partition('=')
+        if name.strip().lower() == 'q':
+            try:
+                return float(value.strip())
+            except ValueError:
+                return 0
+    return 1
+
+
+def accepts_webp(request):
+    """
+    Returns True if the client explicitly accepts WebP images, that is if the Accept header
+    of `request` lists image/webp with a quality value > 0.
+    """
+    for media_range in request.META.get('HTTP_ACCEPT', '').split(','):
+        media_type, *params = media_range.split(';')
+        if media_type.strip().lower() == 'image/webp':
+            return get_accept_quality(params) > 0
+    return False
+
+
+def get_content_type(file_name):
+    """
+    Returns the content type of an image file from its extension.
+
+    The names of the renditions always end with the extension of the format generated
+    so the file itself doesn't need to be read.
+    """
+    extension = os.path.splitext(file_name)[1].lower()
+    if extension in IMAGE_CONTENT_TYPES:
+        return IMAGE_CONTENT_TYPES[extension]
+    return mimetypes.guess_type(file_name)[0] or 'application/octet-stream'
+
 
 class ServeView(View):
     model = get_image_model()
     action = 'serve'
     key = settings.IMAGE_SIGNATURE_KEY
+    # seconds the temporary redirects of the 'sendfile' action to remote storages can be cached for
+    redirect_max_age = 300
 
     @classonlymethod
     def as_view(cls, **initkwargs):  # noqa
         if 'action' in initkwargs:
-            if initkwargs['action'] not in ['serve', 'redirect']:
-                raise ImproperlyConfigured("ServeView action must be either 'serve' or 'redirect'")
+            if initkwargs['action'] not in ['serve', 'redirect', 'sendfile']:
+                raise ImproperlyConfigured("ServeView action must be either 'serve', 'redirect' or 'sendfile'")
 
         return super().as_view(**initkwargs)
 
-    def get(self, request, signature, image_id, filter_spec, slug):
-        if not verify_signature(signature.encode(), image_id, filter_spec, key=self.key):
+    def get(self, request, signature, image_id, filter_spec, version, slug):
+        negotiate_format = is_webp_enabled()
+        image_format = 'webp' if negotiate_format and accepts_webp(request) else ''
+
+        # hot urls were already verified and resolved
+        memo = RenditionMemo(signature, image_id, filter_spec, slug, image_format)
+        rendition = memo.get()
+
+        if not rendition and not verify_signature(signature.encode(), image_id, filter_spec, key=self.key):
             raise PermissionDenied
 
-        image = get_object_or_404(self.model, id=image_id, slug=slug)
+        # the client already has this rendition, no need to touch the db or the storage
+        etag = get_rendition_etag(image_id, filter_spec, version, slug, image_format)
+        response = get_conditional_response(request, etag=etag)
+        if response:
+            return self.set_cache_headers(response, etag, negotiate_format)
 
-        # Get/generate the rendition
-        try:
-            rendition = image.get_rendition(filter_spec)
-        except SourceImageIOError:
-            return HttpResponse("Source image file not found", content_type='text/plain', status=410)
-        except InvalidFilterSpecError:
-            return HttpResponse("Invalid filter spec: " + filter_spec, content_type='text/plain', status=400)
+        if not rendition:
+            image = get_object_or_404(self.model, id=image_id, slug=slug)
+
+            # Get/generate the rendition
+            try:
+                rendition = self.get_rendition(image, filter_spec, image_format)
+            except SourceImageIOError:
+                return HttpResponse("Source image file not found", content_type='text/plain', status=410)
+            except InvalidFilterSpecError:
+                return HttpResponse("Invalid filter spec: " + filter_spec, content_type='text/plain', status=400)
+
+            if not rendition:  # another worker is still generating it
+                return self.serve_original(image)
+            memo.set(rendition)
 
-        return getattr(self, self.action)(rendition)
+        response = getattr(self, self.action)(rendition)
+        if isinstance(response, HttpResponseRedirect):
+            # temporary redirects only keep the short max-age set by the action
+            if negotiate_format:
+                patch_vary_headers(response, ['Accept'])
+            return response
+        return self.set_cache_headers(response, etag, negotiate_format)
+
+    def get_rendition(self, image, filter_spec, image_format=''):
+        if image_format == 'webp':
+            return get_or_generate_webp_rendition(image, filter_spec)
+        return get_or_generate_rendition(image, filter_spec)
+
+    def set_cache_headers(self, response, etag, negotiate_format=False):
+        """
+        Renditions never change for a given url so they can be cached forever,
+        as long as caches take into account the format negotiated if `negotiate_format` == True.
+        """
+        response['ETag'] = quote_etag(etag)
+        patch_cache_control(response, public=True, max_age=settings.IMAGE_SERVE_MAX_AGE, immutable=True)
+        if negotiate_format:
+            patch_vary_headers(response, ['Accept'])
+        return response
+
+    def serve_original(self, image):
+        """
+        Returns the original image in place of the rendition, making sure that it doesn't get cached.
+        """
+        if self.action == 'redirect':
+            response = HttpResponseRedirect(image.file.url)
+        else:
+            response = self.serve(image)
+        add_never_cache_headers(response)
+        return response
 
     def serve(self, rendition):
         # Open and serve the file
         rendition.file.open('rb')
-        image_format = imghdr.what(rendition.file)
         return StreamingHttpResponse(FileWrapper(rendition.file),
-                                     content_type='image/' + image_format)
+                                     content_type=get_content_type(rendition.file.name))
 
     def redirect(self, rendition):
         # Redirect to the file's public location
         return HttpResponsePermanentRedirect(rendition.url)
+
+    def sendfile(self, rendition):
+        """
+        Delegates the transfer of the file to the front proxy if the file is stored locally
+        (X-Accel-Redirect for nginx or X-Sendfile, see settings.IMAGE_SENDFILE_HEADER)
+        or redirects to the file's location in the remote storage otherwise.
+        """
+        name = rendition.file.name
+        try:
+            path = rendition.file.storage.path(name)
+        except NotImplementedError:
+            # the url might be signed and expire so the redirect is temporary and only cached briefly
+            response = HttpResponseRedirect(rendition.url)
+            patch_cache_control(response, max_age=self.redirect_max_age)
+            return response
+
+        response = HttpResponse(content_type=get_content_type(name))
+        header = settings.IMAGE_SENDFILE_HEADER
+        if header == 'X-Accel-Redirect':
+            response[header] = urljoin(settings.IMAGE_SENDFILE_URL_PREFIX, quote(name))
+        else:
+            response[header] = path
+        return response
@@ -1,3 +1,4 @@
+import hashlib
 import json
 import logging
 
@@ -5,17 +6,33 @@ from django.core.exceptions import ObjectDoesNotExist
 
 from pages.models import EditorialPage, FolderPage
 
-from .components import StructuralComponent
-from .utils import get_data_from_remote, get_list_of_children_from_remote
+from .components import StructuralComponent, get_included_files
+from .fetcher import RemoteFetcher
+from .models import ImportedPage
+from .sources import get_default_source
 
 logger = logging.getLogger(__name__)
 
 
 class Importer(object):
-    def __init__(self, fail_silently=True):
+    def __init__(self, fail_silently=True, workers=None, source=None, force=False):
         self.page_meta = EditorialPage._meta
         self.fail_silently = fail_silently
+        # if True, the pages are imported even if their content didn't change
+        self.force = force
+        self.workers = workers
+        # the default source is created here so it has to be closed by `close`
+        self.owns_source = source is None
+        self.source = source or get_default_source()
         self.items_in_error = []
+        self.fetcher = None
+
+    def close(self):
+        """
+        Releases the resources of the content source if it was created by the importer.
+        """
+        if self.owns_source:
+            self.source.close()
 
     def get_item_children(self, item_data, item_base_url):
         # if it has a children prop, use that
@@ -25,7 +42,117 @@ class Importer(object):
             ]
 
         # otherwise, see if there are subfolders
-        return get_list_of_children_from_remote(item_base_url)
+        return self.fetcher.get_children(item_base_url)
+
+    def get_source_functions(self):
+        """
+        Returns the functions used to fetch (content of a file, subfolders of a folder)
+        from the content source, by default the GitHub contents API.
+        """
+        self.source.prepare()
+        return (self.source.get_data, self.source.get_children)
+
+    def get_manifest_url(self, item_base_url):
+        return '%s/manifest.json' % item_base_url
+
+    def prefetch_item(self, item_data, item_base_url):
+        """
+        Starts fetching the files included in the content of the item and the manifests
+        of its children (or its subfolders) in the background.
+        """
+        if not isinstance(item_data, dict) or 'layout' not in item_data:
+            return  # invalid data, the import will fail anyway
+
+        for url_part, is_file in self.get_item_files(item_data, item_base_url):
+            self.fetcher.prefetch_data(url_part, is_file=is_file)
+
+        if 'children' in item_data.get('meta', {}):
+            for child in item_data['meta']['children']:
+                self.fetcher.prefetch_data(
+                    self.get_manifest_url('%s/%s' % (item_base_url, child['slug'])), is_json=True
+                )
+        else:
+            self.fetcher.prefetch_children(item_base_url)
+
+    def get_item_files(self, item_data, item_base_url):
+        """
+        Returns the list of (url part, is_file) of the files included in the content of the item.
+        """
+        context = {
+            'item_base_url': item_base_url,
+            'assets_base_url': '',
+        }
+        content = item_data.get('content') or {}
+        return get_included_files(content.get('header', []) + content.get('main', []), context)
+
+    def get_fingerprint(self, item_data, files):
+        """
+        Returns the hash of the manifest of the item and of the content of the
+        files it includes (`files` is a dict of {url part: data}).
+        """
+        fingerprint = hashlib.sha1(
+            json.dumps(item_data, sort_keys=True).encode('utf-8')
+        )
+        for url_part in sorted(files):
+            data = files[url_part]
+            if not isinstance(data, bytes):
+                data = data.encode('utf-8')
+            fingerprint.update('|{}|{}|'.format(url_part, len(data)).encode('utf-8'))
+            fingerprint.update(data)
+        return fingerprint.hexdigest()
+
+    def is_unchanged(self, page, fingerprint):
+        """
+        Returns True if `page` was imported from the content with the same `fingerprint`
+        and it didn't get edited since.
+        """
+        if self.force or not page.pk or not page.live:
+            return False
+
+        record = ImportedPage.objects.filter(page_id=page.pk).first()
+        if not record or record.fingerprint != fingerprint:
+            return False
+
+        latest_revision = page.get_latest_revision()
+        return bool(latest_revision) and latest_revision.pk == record.revision_id
+
+    def populate_page(self, page, item_slug, item_data, item_base_url, files):
+        """
+        Sets the fields of `page` from the data of the item, `files` is the dict of
+        {url part: data} of the files included in its content.
+        """
+        page.slug = item_slug
+        page.title = item_data['title']
+        page.search_description = item_data.get('description', '')
+        page.live = True
+
+        if isinstance(page, FolderPage):
+            page.guide = True
+            return
+
+        page.non_emergency_callout = item_data.get('nonEmergencyCallout', False)
+        page.choices_origin = item_data.get('choicesOrigin')
+
+        # populate content fields
+        content = item_data['content']
+        context = {
+            'item_base_url': item_base_url,
+            'assets_base_url': '',
+            'page': page,
+            'fetcher': self.fetcher,
+            'files': files,
+        }
+        component_importer = StructuralComponent(context)
+
+        transformed_header = component_importer.transform_components(content.get('header', []))
+        page.header = self.page_meta.get_field('header').to_python(
+            json.dumps(transformed_header)
+        )
+
+        transformed_main = component_importer.transform_components(content['main'])
+        page.main = self.page_meta.get_field('main').to_python(
+            json.dumps(transformed_main)
+        )
 
     def import_item(self, item_slug, item_data, parent_page, item_base_url):
         try:
@@ -38,44 +165,29 @@ class Importer(object):
             except ObjectDoesNotExist:
                 page = PageClass()
 
-            # populate basic props
-            page.slug = item_slug
-            page.title = item_data['title']
-            page.search_description = item_data.get('description', '')
-            page.live = True
+            files = {
+                url_part: self.fetcher.get_data(url_part, is_file=is_file)
+                for url_part, is_file in self.get_item_files(item_data, item_base_url)
+            }
+            fingerprint = self.get_fingerprint(item_data, files)
 
-            if is_folder_page:
-                page.guide = True
+            if self.is_unchanged(page, fingerprint):
+                logger.debug('%s unchanged since the last import' % item_slug)
             else:
-                page.non_emergency_callout = item_data.get('nonEmergencyCallout', False)
-                page.choices_origin = item_data.get('choicesOrigin')
-
-                # populate content fields
-                content = item_data['content']
-                context = {
-                    'item_base_url': item_base_url,
-                    'assets_base_url': '',
-                    'page': page
-                }
-                component_importer = StructuralComponent(context)
-
-                transformed_header = component_importer.transform_components(content.get('header', []))
-                page.header = self.page_meta.get_field('header').to_python(
-                    json.dumps(transformed_header)
-                )
-
-                transformed_main = component_importer.transform_components(content['main'])
-                page.main = self.page_meta.get_field('main').to_python(
-                    json.dumps(transformed_main)
+                self.populate_page(page, item_slug, item_data, item_base_url, files)
+
+                # save
+                if page.pk:
+                    page.save()
+                else:
+                    parent_page.add_child(instance=page)
+                revision = page.save_revision()
+
+                ImportedPage.objects.update_or_create(
+                    page_id=page.pk,
+                    defaults={'fingerprint': fingerprint, 'revision': revision}
                 )
 
-            # save
-            if page.pk:
-                page.save()
-            else:
-                parent_page.add_child(instance=page)
-            page.save_revision()
-
             # do the same with children
             children = self.get_item_children(item_data, item_base_url)
             if children:
@@ -88,15 +200,34 @@ class Importer(object):
                 raise e
 
     def _import_items(self, items, parent_page, content_base_url):
-        for item_slug in items:
+        items = [
+            (item_slug, '%s/%s' % (content_base_url, item_slug))
+            for item_slug in items
+        ]
+        for _, item_base_url in items:
+            self.fetcher.prefetch_data(self.get_manifest_url(item_base_url), is_json=True)
+
+        for item_slug, item_base_url in items:
             logger.debug('importing %s' % item_slug)
 
-            item_base_url = '%s/%s' % (content_base_url, item_slug)
-            data = get_data_from_remote('%s/manifest.json' % item_base_url, is_json=True)
+            data = self.fetcher.get_data(self.get_manifest_url(item_base_url), is_json=True)
 
+            # the pages are saved one at a time but their remote data is fetched in parallel
+            self.prefetch_item(data, item_base_url)
             self.import_item(item_slug, data, parent_page, item_base_url)
 
     def import_items(self, item_type, items):
+        """
+        Imports the `items` of type `item_type` (conditions, symptoms) and their children
+        fetching the remote data with a pool of `self.workers` threads.
+        """
         parent_page = FolderPage.objects.get(slug=item_type)
         content_base_url = '/content/%s' % item_type
-        self._import_items(items, parent_page, content_base_url)
+
+        get_data, get_children = self.get_source_functions()
+        with RemoteFetcher(get_data, get_children, self.workers) as fetcher:
+            self.fetcher = fetcher
+            try:
+                self._import_items(items, parent_page, content_base_url)
+            finally:
+                self.fetcher = None
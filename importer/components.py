@@ -5,15 +5,48 @@ import sys
 from django.core.files import File
 from django.core.files.temp import NamedTemporaryFile
 
-from images.models import Image
-
-from .utils import get_data_from_remote
+from images.models import Image, get_content_hash, get_image_by_hash
+
+
+def get_included_files(data, context):
+    """
+    Returns the list of (url part, is_file) of the files included by the components in `data`
+    and by their children so that they can be fetched in advance.
+    """
+    files = []
+    for comp_data in data:
+        if not isinstance(comp_data, dict):
+            continue
+
+        props = comp_data.get('props', {})
+        if comp_data.get('type') == 'text':
+            value = props.get('value', '')
+            if value.startswith('!file='):
+                files.append((TextComponent(context).get_file_url(value.split('!file=')[1]), False))
+        elif comp_data.get('type') == 'image' and props.get('srcset'):
+            component = ImageComponent(context)
+            files.append((component.get_image_url(component.find_biggest_image(props['srcset'])), True))
+
+        for prop_value in props.values():
+            if isinstance(prop_value, list):
+                files.extend(get_included_files(prop_value, context))
+    return files
 
 
 class Component(object):
     def __init__(self, context):
         self.context = context
 
+    def get_data_from_remote(self, url_part, **kwargs):
+        """
+        Returns the data related to `url_part` from the files already fetched
+        or using the fetcher in the context.
+        """
+        files = self.context.get('files') or {}
+        if url_part in files:
+            return files[url_part]
+        return self.context['fetcher'].get_data(url_part, **kwargs)
+
     def transform(self, data):
         raise NotImplementedError()
 
@@ -56,8 +89,11 @@ class TextComponent(Component):
     def item_base_url(self):
         return self.context['item_base_url']
 
+    def get_file_url(self, include_file):
+        return '%s/%s' % (self.item_base_url, include_file)
+
     def get_value_from_file(self, include_file):
-        return get_data_from_remote('%s/%s' % (self.item_base_url, include_file))
+        return self.get_data_from_remote(self.get_file_url(include_file))
 
     def get_value(self, val):
         if val.startswith('!file='):
@@ -92,21 +128,35 @@ class ImageComponent(Component):
     def page(self):
         return self.context['page']
 
+    def get_image_url(self, include_file):
+        return '%s/%s' % (self.assets_base_url, include_file)
+
     def get_image_data_from_file(self, include_file):
-        return get_data_from_remote('%s/%s' % (self.assets_base_url, include_file), is_file=True)
+        return self.get_data_from_remote(self.get_image_url(include_file), is_file=True)
 
     def transform(self, data):
         path = self.find_biggest_image(data['props']['srcset'])
         name = os.path.basename(path)
+        content = self.get_image_data_from_file(path)
 
         image = Image(
             caption=data['props'].get('caption', ''),
             title=data['props']['alt'] or self.page.title
         )
 
+        # reuse the image if already imported
+        existing_image = get_image_by_hash(
+            get_content_hash(content), caption=image.caption, title=image.title
+        )
+        if existing_image:
+            return {
+                'type': 'image',
+                'value': existing_image.id
+            }
+
         # save temp file
         img_temp = NamedTemporaryFile()
-        img_temp.write(self.get_image_data_from_file(path))
+        img_temp.write(content)
         img_temp.flush()
 
         # save file and image
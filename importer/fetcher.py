@@ -0,0 +1,80 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+
+class RemoteFetcher(object):
+    """
+    Fetches remote data in parallel using a pool of `workers` threads
+    (defaults to settings.IMPORTER_WORKERS).
+
+    Data is requested in advance with the `prefetch_*` methods and then collected with the
+    `get_*` ones, which fetch it straightaway if it wasn't prefetched.
+    Each prefetched result is given out only once so that it doesn't have to be kept in memory
+    for the whole import.
+
+    `get_data` and `get_children` are the functions used to fetch the content of a file
+    and the subfolders of a folder, see importer.sources.ContentSource.
+
+    Usage:
+        with RemoteFetcher(source.get_data, source.get_children) as fetcher:
+            fetcher.prefetch_data('/content/conditions/a/manifest.json', is_json=True)
+            fetcher.prefetch_data('/content/conditions/b/manifest.json', is_json=True)
+
+            data = fetcher.get_data('/content/conditions/a/manifest.json', is_json=True)
+    """
+    def __init__(self, get_data, get_children, workers=None):
+        self._get_data = get_data
+        self._get_children = get_children
+        self.workers = workers or settings.IMPORTER_WORKERS
+        self.executor = None
+        self.futures = {}
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        self.executor = ThreadPoolExecutor(max_workers=self.workers)
+        return self
+
+    def __exit__(self, *args):
+        with self.lock:
+            for future in self.futures.values():
+                future.cancel()
+            self.futures = {}
+        self.executor.shutdown(wait=True)
+        self.executor = None
+
+    def _prefetch(self, key, func, *args, **kwargs):
+        with self.lock:
+            if key not in self.futures:
+                self.futures[key] = self.executor.submit(func, *args, **kwargs)
+
+    def _get(self, key, func, *args, **kwargs):
+        self._prefetch(key, func, *args, **kwargs)
+        with self.lock:
+            future = self.futures.pop(key)
+        return future.result()
+
+    def prefetch_data(self, url_part, is_json=False, is_file=False):
+        self._prefetch(
+            ('data', url_part, is_json, is_file),
+            self._get_data, url_part, is_json=is_json, is_file=is_file
+        )
+
+    def get_data(self, url_part, is_json=False, is_file=False):
+        """
+        Returns the data related to `url_part` like importer.sources.ContentSource.get_data.
+        """
+        return self._get(
+            ('data', url_part, is_json, is_file),
+            self._get_data, url_part, is_json=is_json, is_file=is_file
+        )
+
+    def prefetch_children(self, url_part):
+        self._prefetch(('children', url_part), self._get_children, url_part)
+
+    def get_children(self, url_part):
+        """
+        Returns the subfolders of `url_part` like importer.sources.ContentSource.get_children.
+        """
+        return self._get(('children', url_part), self._get_children, url_part)
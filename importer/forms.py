@@ -2,7 +2,15 @@ from django import forms
 from wagtail.wagtailcore.models import Page
 
 from .actions import Importer
-from .utils import get_list_of_children_from_remote
+from .sources import get_default_source
+
+
+def get_importable_items(item_type):
+    """
+    Returns the list of slugs of the items of type `item_type` (conditions, symptoms) in the content source.
+    """
+    with get_default_source() as source:
+        return source.get_children(item_type)
 
 
 def get_existing_items(item_type):
@@ -22,6 +30,10 @@ class ImportForm(forms.Form):
         choices=[], required=False,
         widget=forms.CheckboxSelectMultiple
     )
+    force = forms.BooleanField(
+        required=False,
+        help_text="Import the pages again even if their content didn't change since the last import"
+    )
 
     @classmethod
     def prepare_field(cls, field_name, fields):
@@ -30,7 +42,7 @@ class ImportForm(forms.Form):
         pre-select the ones not existing in the db already.
         """
         field = fields[field_name]
-        importable_items = get_list_of_children_from_remote(field_name)
+        importable_items = get_importable_items(field_name)
         existing_items = get_existing_items(field_name)
         field.choices = [
             (item, item) for item in importable_items
@@ -47,13 +59,16 @@ class ImportForm(forms.Form):
         """
         Imports the selected items and returns the list of items that errored.
         """
-        importer = Importer(fail_silently=True)
-
-        importer.import_items(
-            'conditions', self.cleaned_data['conditions']
-        )
-        importer.import_items(
-            'symptoms', self.cleaned_data['symptoms']
-        )
+        importer = Importer(fail_silently=True, force=self.cleaned_data['force'])
+
+        try:
+            importer.import_items(
+                'conditions', self.cleaned_data['conditions']
+            )
+            importer.import_items(
+                'symptoms', self.cleaned_data['symptoms']
+            )
+        finally:
+            importer.close()
 
         return importer.items_in_error
@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from importer.actions import Importer
+from importer.sources import ITEM_TYPES, get_source
+
+
+class Command(BaseCommand):
+    help = (
+        'Imports the content from a local folder or zip/tar archive, '
+        'e.g. a checkout of the content repo or the zip file created by the exporter.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Folder or zip/tar archive with the content')
+        parser.add_argument(
+            '--export-layout', action='store_true', default=False,
+            help='The content is in the layout written by the exporter instead of the one of the content repo'
+        )
+        parser.add_argument(
+            '--type', dest='item_types', action='append', choices=ITEM_TYPES,
+            help='Type of the items to import, can be repeated. Defaults to all the types found'
+        )
+        parser.add_argument(
+            '--item', dest='items', action='append',
+            help='Slug of the item to import, can be repeated. Defaults to all the items found'
+        )
+        parser.add_argument(
+            '--force', action='store_true', default=False,
+            help="Import the pages again even if their content didn't change since the last import"
+        )
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help='Number of threads reading the content. Defaults to settings.IMPORTER_WORKERS'
+        )
+
+    def get_items(self, source, item_type, items):
+        try:
+            found_items = source.get_children(item_type)
+        except FileNotFoundError:
+            return []
+
+        if not items:
+            return found_items
+        return [item for item in found_items if item in items]
+
+    def handle(self, *args, **options):
+        source = get_source(options['path'], export_layout=options['export_layout'])
+        try:
+            source.prepare()
+        except (OSError, ValueError) as e:
+            raise CommandError('Could not read {}: {}'.format(options['path'], e))
+
+        importer = Importer(
+            fail_silently=True, workers=options['workers'], source=source, force=options['force']
+        )
+        try:
+            for item_type in options['item_types'] or ITEM_TYPES:
+                items = self.get_items(source, item_type, options['items'])
+                if not items:
+                    continue
+
+                importer.import_items(item_type, items)
+                self.stdout.write('{} {} imported'.format(len(items), item_type))
+        finally:
+            source.close()
+
+        for item in importer.items_in_error:
+            self.stderr.write('Could not import {}'.format(item))
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('wagtailcore', '0032_add_bulk_delete_page_permission'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportedPage',
+            fields=[
+                ('page', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='import_record', serialize=False, to='wagtailcore.Page')),
+                ('fingerprint', models.CharField(max_length=40)),
+                ('imported_at', models.DateTimeField(auto_now=True)),
+                ('revision', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='wagtailcore.PageRevision')),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+from django.db import models
+
+
+class ImportedPage(models.Model):
+    """
+    Fingerprint of the content a page was last imported from.
+
+    It's used to skip the pages whose content didn't change since the previous import,
+    unless the page got edited in the meantime (its latest revision is not the imported one).
+    """
+    page = models.OneToOneField(
+        'wagtailcore.Page', on_delete=models.CASCADE,
+        primary_key=True, related_name='import_record'
+    )
+    fingerprint = models.CharField(max_length=40)
+    revision = models.ForeignKey(
+        'wagtailcore.PageRevision', on_delete=models.SET_NULL,
+        null=True, blank=True, related_name='+'
+    )
+    imported_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return str(self.page)
@@ -0,0 +1,431 @@
+import base64
+import json
+import logging
+import os
+import shutil
+import tarfile
+import tempfile
+import threading
+import zipfile
+
+import requests
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from .utils import make_request
+
+logger = logging.getLogger(__name__)
+
+
+# types of the items that can be imported, see importer.forms.ImportForm
+ITEM_TYPES = ('conditions', 'symptoms')
+
+
+class RepoLayout(object):
+    """
+    Layout of the content repo: pages in /content/<item type>/<slug>/ and assets in /assets/.
+    """
+    def prepare(self, source):
+        pass
+
+    def get_path(self, url_part):
+        """
+        Returns the path relative to the root of the source of the file or folder at `url_part`
+        in the content repo.
+        """
+        return url_part.strip('/')
+
+    def transform_manifest(self, data):
+        return data
+
+
+class ExportLayout(RepoLayout):
+    """
+    Layout of the folders and archives written by the exporter: pages in <root>/[<home>/]<item type>/<slug>/,
+    images in <root>/images/ and manifests with the data of the Content API.
+
+    The folders containing the pages and the images are found when preparing the source.
+    """
+    def __init__(self):
+        self.pages_root = None
+        self.images_root = None
+
+    def find_pages_root(self, source):
+        path = ''
+        for _ in range(3):
+            folders = source.list_folders(path)
+            if any(item_type in folders for item_type in ITEM_TYPES):
+                return path
+
+            folders = [folder for folder in folders if folder != 'images']
+            if len(folders) != 1:
+                break
+            path = os.path.join(path, folders[0])
+        raise ValueError('Could not find the exported pages')
+
+    def find_images_root(self, source):
+        path = self.pages_root
+        while True:
+            if 'images' in source.list_folders(path):
+                return os.path.join(path, 'images')
+            if not path:
+                return 'images'
+            path = os.path.dirname(path)
+
+    def prepare(self, source):
+        self.pages_root = self.find_pages_root(source)
+        self.images_root = self.find_images_root(source)
+
+    def get_path(self, url_part):
+        path = url_part.strip('/')
+        if path == 'content' or path.startswith('content/'):
+            return os.path.join(self.pages_root, path[len('content/'):])
+        if path.startswith('assets/images/'):
+            return os.path.join(self.images_root, path[len('assets/images/'):])
+        return path
+
+    def transform_manifest(self, data):
+        """
+        Converts the data of the Content API into the format of the manifests in the content repo.
+        """
+        if 'layout' in data:
+            return data
+
+        data = dict(data)
+        data['layout'] = 'guide' if data.get('guide') else 'content-simple'
+        data.setdefault('content', {})
+        data['content'] = dict({'header': [], 'main': []}, **(data['content'] or {}))
+
+        # the children are the subfolders of the page
+        data.pop('meta', None)
+        return data
+
+
+class ContentSource(object):
+    """
+    Source the content gets imported from.
+
+    Paths are the ones in the content repo, e.g. '/content/conditions/hernia/manifest.json',
+    and `layout` maps them to the files in the source.
+
+    Subclasses have to implement `read` and `list_folders`.
+
+    It can be used as a context manager which prepares the source and closes it at the end.
+    """
+    def __init__(self, layout=None):
+        self.layout = layout or RepoLayout()
+
+    def __enter__(self):
+        self.prepare()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def prepare(self):
+        """
+        Called before importing, it can be used to download the content.
+        """
+        self.layout.prepare(self)
+
+    def close(self):
+        """
+        Releases the resources used by the source.
+        """
+        pass
+
+    def read(self, path):
+        """
+        Returns the bytes of the file at `path`, relative to the root of the source.
+        """
+        raise NotImplementedError()
+
+    def list_folders(self, path):
+        """
+        Returns the sorted names of the folders in `path`, relative to the root of the source.
+        """
+        raise NotImplementedError()
+
+    def get_data(self, url_part, is_json=False, is_file=False):
+        """
+        Returns the content of the file at `url_part`.
+        If `is_json` == True, it returns the json representation.
+        If `is_file` == True it does not attempt to decode the content.
+        """
+        data = self.read(self.layout.get_path(url_part))
+        if not is_file:
+            data = data.decode('utf-8')
+
+        if is_json:
+            data = self.layout.transform_manifest(json.loads(data))
+        return data
+
+    def get_children(self, url_part):
+        """
+        Returns the subfolders of an item (e.g. conditions, symptoms).
+        url_part can be either a string e.g. 'conditions' relative to
+        the content folder or it can be an absolute url_part starting
+        from /content e.g. /content/conditions/hernia.
+        """
+        if not url_part.startswith('/content'):
+            url_part = '/content/%s' % url_part
+        return self.list_folders(self.layout.get_path(url_part))
+
+
+class DirectorySource(ContentSource):
+    """
+    Content in a local folder, e.g. a checkout of the content repo or an export.
+    """
+    def __init__(self, root, layout=None):
+        super().__init__(layout=layout)
+        self.root = root
+
+    def get_path(self, path):
+        root = os.path.realpath(self.root)
+        full_path = os.path.realpath(os.path.join(root, path))
+        if os.path.commonpath([root, full_path]) != root:
+            raise ValueError('%s is outside of the content folder' % path)
+        return full_path
+
+    def read(self, path):
+        with open(self.get_path(path), 'rb') as f:
+            return f.read()
+
+    def list_folders(self, path):
+        full_path = self.get_path(path)
+        return sorted(
+            name for name in os.listdir(full_path)
+            if os.path.isdir(os.path.join(full_path, name))
+        )
+
+
+def normalize_path(path):
+    """
+    Returns `path` relative to the root of an archive, e.g. './content/' => 'content', '.' => ''.
+    """
+    path = os.path.normpath(path or '.')
+    while path.startswith('/'):
+        path = path[1:]
+    return '' if path == '.' else path
+
+
+class ArchiveSource(ContentSource):
+    """
+    Content in a zip or tar archive, e.g. the zip file created by the exporter.
+
+    Files are read from the archive without extracting it.
+    """
+    def __init__(self, path, layout=None):
+        super().__init__(layout=layout)
+        self.path = path
+        self.archive = None
+        self.files = {}
+        self.folders = {}
+        # archives can't be read by multiple threads at the same time
+        self.lock = threading.Lock()
+
+    def open(self):
+        if zipfile.is_zipfile(self.path):
+            self.archive = zipfile.ZipFile(self.path)
+            members = [
+                (info.filename.rstrip('/'), info, info.filename.endswith('/'))
+                for info in self.archive.infolist()
+            ]
+        elif tarfile.is_tarfile(self.path):
+            self.archive = tarfile.open(self.path, mode='r:*')
+            members = [
+                (info.name.rstrip('/'), info, info.isdir())
+                for info in get_safe_members(self.archive)
+            ]
+        else:
+            raise ValueError('%s is not a zip or tar archive' % self.path)
+
+        self.files = {}
+        self.folders = {'': set()}
+        for name, info, is_dir in members:
+            name = normalize_path(name)
+            if not is_dir:
+                self.files[name] = info
+
+            # register all the parent folders as some archives don't include them
+            path = name if is_dir else os.path.dirname(name)
+            while path:
+                parent = os.path.dirname(path)
+                self.folders.setdefault(path, set())
+                self.folders.setdefault(parent, set()).add(os.path.basename(path))
+                path = parent
+
+    def close(self):
+        if self.archive:
+            self.archive.close()
+            self.archive = None
+
+    def prepare(self):
+        if not self.archive:
+            self.open()
+        super().prepare()
+
+    def read(self, path):
+        path = normalize_path(path)
+        if path not in self.files:
+            raise FileNotFoundError('%s not found in %s' % (path, self.path))
+
+        with self.lock:
+            if isinstance(self.archive, zipfile.ZipFile):
+                return self.archive.read(self.files[path])
+            return self.archive.extractfile(self.files[path]).read()
+
+    def list_folders(self, path):
+        path = normalize_path(path)
+        if path not in self.folders:
+            raise FileNotFoundError('%s not found in %s' % (path, self.path))
+        return sorted(self.folders[path])
+
+
+class GitHubAPISource(ContentSource):
+    """
+    Content read from the GitHub contents API, one request per file or folder (see importer.utils.make_request).
+    """
+    def read(self, path):
+        return base64.b64decode(make_request('/' + path)['content'])
+
+    def list_folders(self, path):
+        return sorted(item['name'] for item in make_request('/' + path) if item['type'] == 'dir')
+
+
+class GitHubTarballSource(DirectorySource):
+    """
+    Content downloaded from GitHub as a single tarball of the whole repo.
+
+    The tarball of each commit is extracted once into `cache_dir` (defaults to settings.IMPORTER_CACHE_DIR)
+    and later imports of the same commit read it from there.
+    Only the `keep_commits` most recently used commits are kept, the others are removed
+    after downloading a new one.
+    """
+    keep_commits = 2
+    tmp_prefix = '.download-'
+
+    def __init__(self, ref=None, cache_dir=None):
+        super().__init__(root=None)
+        self.ref = ref or settings.IMPORT_REF
+        self.cache_dir = cache_dir or settings.IMPORTER_CACHE_DIR
+
+    def get_headers(self, **headers):
+        if not settings.GITHUB_OAUTH_TOKEN:
+            raise ImproperlyConfigured(
+                'Please set GITHUB_OAUTH_TOKEN in your settings'
+            )
+
+        headers['Authorization'] = 'token %s' % settings.GITHUB_OAUTH_TOKEN
+        return headers
+
+    def get_commit_sha(self):
+        """
+        Returns the sha of the commit `self.ref` currently points to.
+        """
+        response = requests.get(
+            settings.IMPORT_COMMIT_URL_FORMAT.format(ref=self.ref),
+            headers=self.get_headers(Accept='application/vnd.github.sha')
+        )
+        assert response.ok, response.content
+        return response.content.decode('utf-8').strip()
+
+    def download(self, sha, path):
+        """
+        Downloads the tarball of the commit `sha` and extracts it into the folder `path`.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = tempfile.mkdtemp(prefix=self.tmp_prefix, dir=self.cache_dir)
+        try:
+            with tempfile.TemporaryFile() as tarball:
+                response = requests.get(
+                    settings.IMPORT_TARBALL_URL_FORMAT.format(ref=sha),
+                    headers=self.get_headers(), stream=True
+                )
+                assert response.ok, response.content
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    tarball.write(chunk)
+                tarball.seek(0)
+
+                with tarfile.open(fileobj=tarball, mode='r:*') as tar:
+                    tar.extractall(tmp_path, members=get_safe_members(tar))
+
+            # the tarball contains one folder named after the repo and the commit
+            folders = os.listdir(tmp_path)
+            assert len(folders) == 1, 'Unexpected content of the tarball: %s' % folders
+
+            try:
+                os.rename(os.path.join(tmp_path, folders[0]), path)
+            except OSError:
+                if not os.path.isdir(path):  # not extracted by another import at the same time
+                    raise
+        finally:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+    def remove_old_commits(self):
+        """
+        Removes the folders of the commits in `cache_dir` apart from the `keep_commits` most recently used.
+        The previous commit is kept as well by default as imports started before might still be reading it.
+        """
+        paths = [
+            os.path.join(self.cache_dir, name)
+            for name in os.listdir(self.cache_dir)
+            if not name.startswith(self.tmp_prefix)
+        ]
+        paths = sorted(filter(os.path.isdir, paths), key=os.path.getmtime, reverse=True)
+        for path in paths[self.keep_commits:]:
+            logger.info('Removing the content at %s', os.path.basename(path))
+            shutil.rmtree(path, ignore_errors=True)
+
+    def prepare(self):
+        if self.root:
+            return
+
+        sha = self.get_commit_sha()
+        path = os.path.join(self.cache_dir, sha)
+        if os.path.isdir(path):
+            os.utime(path)  # marks it as recently used
+        else:
+            logger.info('Downloading the content at %s', sha)
+            self.download(sha, path)
+            self.remove_old_commits()
+        self.root = path
+        super().prepare()
+
+
+def get_safe_members(tar):
+    """
+    Returns the regular files and folders in `tar` that would be extracted inside the destination folder.
+    """
+    for member in tar.getmembers():
+        if not (member.isfile() or member.isdir()):
+            continue
+        if os.path.isabs(member.name) or '..' in member.name.split('/'):
+            continue
+        yield member
+
+
+def get_source(path, export_layout=False):
+    """
+    Returns the ContentSource reading the content from the local folder or archive at `path`.
+    If `export_layout` == True, the content is expected to be in the layout written by the exporter.
+    """
+    layout = ExportLayout() if export_layout else None
+    if os.path.isdir(path):
+        return DirectorySource(path, layout=layout)
+    return ArchiveSource(path, layout=layout)
+
+
+def get_default_source():
+    """
+    Returns the ContentSource defined by settings.IMPORT_SOURCE.
+    """
+    if settings.IMPORT_SOURCE == 'api':
+        return GitHubAPISource()
+    if settings.IMPORT_SOURCE == 'tarball':
+        return GitHubTarballSource()
+    if settings.IMPORT_SOURCE == 'local':
+        if not settings.IMPORT_PATH:
+            raise ImproperlyConfigured('Please set IMPORT_PATH in your settings')
+        return get_source(settings.IMPORT_PATH, export_layout=settings.IMPORT_EXPORT_LAYOUT)
+    raise ImproperlyConfigured('IMPORT_SOURCE must be either "api", "tarball" or "local"')
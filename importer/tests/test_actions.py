@@ -1,15 +1,22 @@
+import json
 import logging
+import os
+import tempfile
 from unittest import mock
 
 from django.test import TestCase
-from wagtail.wagtailcore.models import Page
+from wagtail.wagtailcore.models import Page, PageRevision
+from wagtail.wagtailimages.tests.utils import get_test_image_file
 
+from images.factories import ImageFactory
+from images.models import Image
 from pages.factories import (
     ConditionPageFactory, ConditionsPageFactory, SymptomsPageFactory
 )
 from pages.models import EditorialPage, FolderPage
 
 from ..actions import Importer
+from ..sources import DirectorySource
 
 
 class ImporterTestCase(TestCase):
@@ -20,8 +27,8 @@ class ImporterTestCase(TestCase):
         ConditionsPageFactory()
         SymptomsPageFactory()
 
-    @mock.patch('importer.actions.get_list_of_children_from_remote')
-    @mock.patch('importer.actions.get_data_from_remote')
+    @mock.patch('importer.sources.GitHubAPISource.get_children')
+    @mock.patch('importer.sources.GitHubAPISource.get_data')
     def test_import_new_page(self, mocked_get_data_from_remote, mocked_get_list_of_children_from_remote):
         tot_pages = Page.objects.count()
 
@@ -53,8 +60,8 @@ class ImporterTestCase(TestCase):
         self.assertEqual(page.non_emergency_callout, True)
         self.assertTrue(page.live)
 
-    @mock.patch('importer.actions.get_list_of_children_from_remote')
-    @mock.patch('importer.actions.get_data_from_remote')
+    @mock.patch('importer.sources.GitHubAPISource.get_children')
+    @mock.patch('importer.sources.GitHubAPISource.get_data')
     def test_import_existing_page(self, mocked_get_data_from_remote, mocked_get_list_of_children_from_remote):
         title = 'test'
         description = 'description'
@@ -88,8 +95,8 @@ class ImporterTestCase(TestCase):
         self.assertEqual(page.non_emergency_callout, True)
         self.assertTrue(page.live)
 
-    @mock.patch('importer.actions.get_list_of_children_from_remote')
-    @mock.patch('importer.actions.get_data_from_remote')
+    @mock.patch('importer.sources.GitHubAPISource.get_children')
+    @mock.patch('importer.sources.GitHubAPISource.get_data')
     def test_import_new_guide(self, mocked_get_data_from_remote, mocked_get_list_of_children_from_remote):
         tot_pages = Page.objects.count()
 
@@ -147,8 +154,8 @@ class ImporterTestCase(TestCase):
         self.assertEqual(child_page.non_emergency_callout, True)
         self.assertTrue(child_page.live)
 
-    @mock.patch('importer.actions.get_list_of_children_from_remote')
-    @mock.patch('importer.actions.get_data_from_remote')
+    @mock.patch('importer.sources.GitHubAPISource.get_children')
+    @mock.patch('importer.sources.GitHubAPISource.get_data')
     def test_import_new_folder(self, mocked_get_data_from_remote, mocked_get_list_of_children_from_remote):
         tot_pages = Page.objects.count()
 
@@ -202,7 +209,7 @@ class ImporterTestCase(TestCase):
         self.assertEqual(child_page.non_emergency_callout, True)
         self.assertTrue(child_page.live)
 
-    @mock.patch('importer.actions.get_data_from_remote')
+    @mock.patch('importer.sources.GitHubAPISource.get_data')
     def test_failing_silently(self, mocked_get_data_from_remote):
         mocked_get_data_from_remote.return_value = {}
         importer = Importer(fail_silently=True)
@@ -214,7 +221,7 @@ class ImporterTestCase(TestCase):
 
         logging.disable(logging.NOTSET)
 
-    @mock.patch('importer.actions.get_data_from_remote')
+    @mock.patch('importer.sources.GitHubAPISource.get_data')
     def test_without_failing_silently(self, mocked_get_data_from_remote):
         mocked_get_data_from_remote.return_value = {}
         importer = Importer(fail_silently=False)
@@ -222,3 +229,208 @@ class ImporterTestCase(TestCase):
         self.assertRaises(
             KeyError, importer.import_items, 'conditions', ['test']
         )
+
+    @mock.patch('importer.sources.GitHubAPISource.get_children')
+    @mock.patch('importer.sources.GitHubAPISource.get_data')
+    def test_import_included_files(self, mocked_get_data_from_remote, mocked_get_list_of_children_from_remote):
+        """
+        Tests that the files included in the content are fetched as well.
+        """
+        mocked_get_list_of_children_from_remote.return_value = []
+
+        def mocked_get_data(url_part, *args, **kwargs):
+            if url_part.endswith('manifest.json'):
+                return {
+                    'layout': 'content-simple',
+                    'title': 'test',
+                    'content': {
+                        'header': [],
+                        'main': [{
+                            'type': 'text',
+                            'props': {
+                                'variant': 'markdown',
+                                'value': '!file=content-1.md'
+                            }
+                        }]
+                    }
+                }
+            return 'content of %s' % url_part
+
+        mocked_get_data_from_remote.side_effect = mocked_get_data
+        importer = Importer(workers=2)
+
+        importer.import_items('conditions', ['test'])
+        self.assertEqual(importer.items_in_error, [])
+
+        page = EditorialPage.objects.get(slug='test')
+        self.assertEqual(page.main[0].value['value'], 'content of /content/conditions/test/content-1.md')
+        self.assertEqual(mocked_get_data_from_remote.call_count, 2)
+
+    def test_import_from_directory(self):
+        """
+        Tests that the content can be imported from a local folder.
+        """
+        with tempfile.TemporaryDirectory() as root:
+            item_path = os.path.join(root, 'content', 'conditions', 'test')
+            os.makedirs(item_path)
+            with open(os.path.join(item_path, 'manifest.json'), 'w') as f:
+                json.dump({
+                    'layout': 'content-simple',
+                    'title': 'test',
+                    'content': {
+                        'header': [],
+                        'main': [{
+                            'type': 'text',
+                            'props': {
+                                'variant': 'markdown',
+                                'value': '!file=content-1.md'
+                            }
+                        }]
+                    }
+                }, f)
+            with open(os.path.join(item_path, 'content-1.md'), 'w') as f:
+                f.write('lorem ipsum')
+
+            importer = Importer(fail_silently=False, source=DirectorySource(root))
+            importer.import_items('conditions', ['test'])
+
+        page = EditorialPage.objects.get(slug='test')
+        self.assertEqual(page.main[0].value['value'], 'lorem ipsum')
+
+
+@mock.patch('importer.sources.GitHubAPISource.get_children', mock.MagicMock(return_value=[]))
+class UnchangedImportTestCase(TestCase):
+    """
+    Tests related to skipping the pages whose content didn't change since the previous import.
+    """
+    def setUp(self):
+        super().setUp()
+        ConditionsPageFactory()
+
+        self.files = {
+            '/content/conditions/test/manifest.json': {
+                'layout': 'content-simple',
+                'title': 'test',
+                'content': {
+                    'header': [],
+                    'main': [{
+                        'type': 'text',
+                        'props': {
+                            'variant': 'markdown',
+                            'value': '!file=content-1.md'
+                        }
+                    }]
+                }
+            },
+            '/content/conditions/test/content-1.md': 'lorem ipsum'
+        }
+
+        patcher = mock.patch(
+            'importer.sources.GitHubAPISource.get_data',
+            side_effect=lambda url_part, *args, **kwargs: self.files[url_part]
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def import_page(self, **kwargs):
+        importer = Importer(fail_silently=False, **kwargs)
+        importer.import_items('conditions', ['test'])
+        return EditorialPage.objects.get(slug='test')
+
+    def get_revision_count(self, page):
+        return PageRevision.objects.filter(page=page).count()
+
+    def test_unchanged(self):
+        page = self.import_page()
+        self.assertEqual(self.get_revision_count(page), 1)
+
+        with mock.patch.object(EditorialPage, 'save') as mocked_save:
+            page = self.import_page()
+        self.assertFalse(mocked_save.called)
+        self.assertEqual(self.get_revision_count(page), 1)
+
+    def test_manifest_changed(self):
+        self.import_page()
+
+        self.files['/content/conditions/test/manifest.json']['title'] = 'new title'
+        page = self.import_page()
+        self.assertEqual(page.title, 'new title')
+        self.assertEqual(self.get_revision_count(page), 2)
+
+    def test_included_file_changed(self):
+        self.import_page()
+
+        self.files['/content/conditions/test/content-1.md'] = 'new text'
+        page = self.import_page()
+        self.assertEqual(page.main[0].value['value'], 'new text')
+        self.assertEqual(self.get_revision_count(page), 2)
+
+    def test_edited_since_the_import(self):
+        """
+        Tests that pages edited since the previous import are imported again.
+        """
+        page = self.import_page()
+        page.title = 'edited'
+        page.save_revision()
+
+        page = self.import_page()
+        self.assertEqual(page.title, 'test')
+        self.assertEqual(self.get_revision_count(page), 3)
+
+    def test_force(self):
+        self.import_page()
+
+        page = self.import_page(force=True)
+        self.assertEqual(self.get_revision_count(page), 2)
+
+
+@mock.patch('importer.sources.GitHubAPISource.get_children', mock.MagicMock(return_value=[]))
+class ImageImportTestCase(TestCase):
+    """
+    Tests related to reusing the images already imported.
+    """
+    def setUp(self):
+        super().setUp()
+        ConditionsPageFactory()
+        ImageFactory.create_collection_if_necessary()
+
+        self.image_content = get_test_image_file().file.getvalue()
+
+    def get_manifest(self, alt):
+        return {
+            'layout': 'content-simple',
+            'title': 'test',
+            'content': {
+                'header': [],
+                'main': [{
+                    'type': 'image',
+                    'props': {
+                        'alt': alt,
+                        'caption': 'caption',
+                        'srcset': ['assets/images/image-300.png 300w']
+                    }
+                }]
+            }
+        }
+
+    @mock.patch('importer.sources.GitHubAPISource.get_data')
+    def test_same_image(self, mocked_get_data_from_remote):
+        manifests = {
+            '/content/conditions/page-1/manifest.json': self.get_manifest('alt'),
+            '/content/conditions/page-2/manifest.json': self.get_manifest('alt'),
+            '/content/conditions/page-3/manifest.json': self.get_manifest('other alt'),
+        }
+        mocked_get_data_from_remote.side_effect = (
+            lambda url_part, *args, **kwargs: manifests.get(url_part, self.image_content)
+        )
+
+        importer = Importer(fail_silently=False)
+        importer.import_items('conditions', ['page-1', 'page-2', 'page-3'])
+
+        image_ids = [
+            EditorialPage.objects.get(slug=slug).main[0].value.id
+            for slug in ['page-1', 'page-2', 'page-3']
+        ]
+        self.assertEqual(image_ids[0], image_ids[1])
+        self.assertNotEqual(image_ids[0], image_ids[2])
+        self.assertEqual(Image.objects.count(), 2)
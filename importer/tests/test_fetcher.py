@@ -0,0 +1,70 @@
+import threading
+from unittest import TestCase, mock
+
+from ..fetcher import RemoteFetcher
+
+
+class RemoteFetcherTestCase(TestCase):
+    def test_get_data(self):
+        get_data = mock.MagicMock(side_effect=lambda url_part, **kwargs: (url_part, kwargs))
+
+        with RemoteFetcher(get_data, mock.MagicMock(), workers=2) as fetcher:
+            self.assertEqual(
+                fetcher.get_data('/content/a', is_json=True),
+                ('/content/a', {'is_json': True, 'is_file': False})
+            )
+
+    def test_prefetched_only_once(self):
+        get_data = mock.MagicMock(return_value='data')
+
+        with RemoteFetcher(get_data, mock.MagicMock(), workers=2) as fetcher:
+            fetcher.prefetch_data('/content/a')
+            fetcher.prefetch_data('/content/a')
+            self.assertEqual(fetcher.get_data('/content/a'), 'data')
+
+        self.assertEqual(get_data.call_count, 1)
+
+    def test_results_given_out_once(self):
+        get_data = mock.MagicMock(return_value='data')
+
+        with RemoteFetcher(get_data, mock.MagicMock(), workers=2) as fetcher:
+            fetcher.get_data('/content/a')
+            fetcher.get_data('/content/a')
+            self.assertEqual(fetcher.futures, {})
+
+        self.assertEqual(get_data.call_count, 2)
+
+    def test_parallel(self):
+        """
+        Tests that prefetched data is fetched by different threads at the same time.
+        """
+        barrier = threading.Barrier(3, timeout=5)
+
+        def get_data(url_part, **kwargs):
+            barrier.wait()
+            return url_part
+
+        with RemoteFetcher(get_data, mock.MagicMock(), workers=3) as fetcher:
+            for url_part in ['a', 'b', 'c']:
+                fetcher.prefetch_data(url_part)
+
+            self.assertEqual(
+                [fetcher.get_data(url_part) for url_part in ['a', 'b', 'c']],
+                ['a', 'b', 'c']
+            )
+
+    def test_errors_raised_when_collected(self):
+        get_data = mock.MagicMock(side_effect=KeyError)
+
+        with RemoteFetcher(get_data, mock.MagicMock(), workers=2) as fetcher:
+            fetcher.prefetch_data('/content/a')
+            self.assertRaises(KeyError, fetcher.get_data, '/content/a')
+
+    def test_get_children(self):
+        get_children = mock.MagicMock(return_value=['child'])
+
+        with RemoteFetcher(mock.MagicMock(), get_children, workers=2) as fetcher:
+            fetcher.prefetch_children('/content/a')
+            self.assertEqual(fetcher.get_children('/content/a'), ['child'])
+
+        get_children.assert_called_once_with('/content/a')
@@ -29,7 +29,7 @@ class ImportFormTestCase(TestCase):
             return self.mocked_symptoms
         return get_list_of_children
 
-    @mock.patch('importer.forms.get_list_of_children_from_remote')
+    @mock.patch('importer.sources.GitHubAPISource.get_children')
     def test_choices_populated_dynamically(self, mocked_get_list_of_children_from_remote):
         mocked_get_list_of_children_from_remote.side_effect = self.get_mocked_list_of_children()
 
@@ -43,7 +43,7 @@ class ImportFormTestCase(TestCase):
             [(symptom, symptom) for symptom in self.mocked_symptoms]
         )
 
-    @mock.patch('importer.forms.get_list_of_children_from_remote')
+    @mock.patch('importer.sources.GitHubAPISource.get_children')
     def test_existing_pages_unselected(self, mocked_get_list_of_children_from_remote):
         mocked_get_list_of_children_from_remote.side_effect = self.get_mocked_list_of_children()
 
@@ -63,7 +63,7 @@ class ImportFormTestCase(TestCase):
             ['symptom-1', 'symptom-2']
         )
 
-    @mock.patch('importer.forms.get_list_of_children_from_remote')
+    @mock.patch('importer.sources.GitHubAPISource.get_children')
     @mock.patch('importer.forms.Importer')
     def test_save(self, MockedImporter, mocked_get_list_of_children_from_remote):  # NOQA
         mocked_get_list_of_children_from_remote.side_effect = self.get_mocked_list_of_children()
@@ -85,3 +85,21 @@ class ImportFormTestCase(TestCase):
         symptoms_call_args = mocked_importer.import_items.call_args_list[1][0]
         self.assertEqual(symptoms_call_args[0], 'symptoms')
         self.assertEqual(symptoms_call_args[1], ['symptom-3'])
+
+        self.assertTrue(mocked_importer.close.called)
+
+    @mock.patch('importer.forms.get_default_source')
+    def test_source_closed(self, mocked_get_default_source):
+        """
+        Tests that the content source used to list the importable items gets closed.
+        """
+        source = mocked_get_default_source.return_value
+        source.__enter__.return_value = source
+        source.get_children.return_value = self.mocked_conditions
+
+        form = ImportForm()
+        self.assertEqual(
+            form.fields['conditions'].choices,
+            [(condition, condition) for condition in self.mocked_conditions]
+        )
+        self.assertEqual(source.__exit__.call_count, 2)
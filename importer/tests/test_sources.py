@@ -0,0 +1,331 @@
+import base64
+import io
+import json
+import os
+import tarfile
+import tempfile
+import zipfile
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, override_settings
+
+from ..sources import (
+    ArchiveSource, DirectorySource, ExportLayout, GitHubAPISource,
+    GitHubTarballSource, get_default_source
+)
+
+
+def write_file(root, path, content):
+    path = os.path.join(root, path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(content)
+
+
+class DirectorySourceTestCase(TestCase):
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        write_file(self.root.name, 'content/conditions/hernia/manifest.json', b'{"title": "Hernia"}')
+        write_file(self.root.name, 'content/conditions/hernia/content-1.md', 'lorem ipsum –'.encode('utf-8'))
+        write_file(self.root.name, 'content/conditions/flu/manifest.json', b'{}')
+        write_file(self.root.name, 'assets/images/image.png', b'\x89PNG')
+        self.source = DirectorySource(self.root.name)
+
+    def tearDown(self):
+        self.root.cleanup()
+
+    def test_get_data(self):
+        self.assertEqual(
+            self.source.get_data('/content/conditions/hernia/manifest.json', is_json=True),
+            {'title': 'Hernia'}
+        )
+        self.assertEqual(
+            self.source.get_data('/content/conditions/hernia/content-1.md'),
+            'lorem ipsum –'
+        )
+        self.assertEqual(self.source.get_data('/assets/images/image.png', is_file=True), b'\x89PNG')
+
+    def test_get_children(self):
+        self.assertEqual(self.source.get_children('conditions'), ['flu', 'hernia'])
+        self.assertEqual(self.source.get_children('/content/conditions/hernia'), [])
+
+    def test_outside_of_the_root(self):
+        self.assertRaises(ValueError, self.source.get_data, '/../outside.json')
+
+    def test_missing_file(self):
+        self.assertRaises(FileNotFoundError, self.source.get_data, '/content/conditions/missing/manifest.json')
+
+
+def get_tarball(files):
+    output = io.BytesIO()
+    with tarfile.open(fileobj=output, mode='w:gz') as tar:
+        for name, content in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            tar.addfile(info, io.BytesIO(content))
+    return output.getvalue()
+
+
+class GitHubAPISourceTestCase(TestCase):
+    @mock.patch('importer.sources.make_request')
+    def test_get_data(self, mocked_make_request):
+        mocked_make_request.return_value = {'content': base64.b64encode(b'{"title": "Hernia"}').decode()}
+
+        source = GitHubAPISource()
+        self.assertEqual(
+            source.get_data('/content/conditions/hernia/manifest.json', is_json=True),
+            {'title': 'Hernia'}
+        )
+        mocked_make_request.assert_called_with('/content/conditions/hernia/manifest.json')
+
+    @mock.patch('importer.sources.make_request')
+    def test_get_children(self, mocked_make_request):
+        mocked_make_request.return_value = [
+            {'name': 'hernia', 'type': 'dir'},
+            {'name': 'manifest.json', 'type': 'file'},
+            {'name': 'flu', 'type': 'dir'},
+        ]
+
+        source = GitHubAPISource()
+        self.assertEqual(source.get_children('conditions'), ['flu', 'hernia'])
+        mocked_make_request.assert_called_with('/content/conditions')
+
+
+@override_settings(GITHUB_OAUTH_TOKEN='token')
+class GitHubTarballSourceTestCase(TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+
+        tarball = get_tarball({
+            'nhsuk-betahealth-abc123/content/conditions/hernia/manifest.json': json.dumps(
+                {'title': 'Hernia'}
+            ).encode(),
+            'nhsuk-betahealth-abc123/../outside.txt': b'outside',
+        })
+
+        def mocked_get(url, headers=None, stream=False):
+            if '/commits/' in url:
+                return mock.MagicMock(ok=True, content=b'abc123\n')
+            self.assertIn('/tarball/abc123', url)
+            return mock.MagicMock(ok=True, iter_content=mock.MagicMock(return_value=[tarball]))
+
+        patcher = mock.patch('importer.sources.requests.get', side_effect=mocked_get)
+        self.mocked_get = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.cache_dir.cleanup()
+
+    def test_prepare(self):
+        source = GitHubTarballSource(ref='master', cache_dir=self.cache_dir.name)
+        source.prepare()
+
+        self.assertEqual(source.root, os.path.join(self.cache_dir.name, 'abc123'))
+        self.assertEqual(
+            source.get_data('/content/conditions/hernia/manifest.json', is_json=True),
+            {'title': 'Hernia'}
+        )
+        self.assertEqual(source.get_children('conditions'), ['hernia'])
+        self.assertEqual(os.listdir(self.cache_dir.name), ['abc123'])
+
+    def test_commit_downloaded_only_once(self):
+        GitHubTarballSource(ref='master', cache_dir=self.cache_dir.name).prepare()
+        GitHubTarballSource(ref='master', cache_dir=self.cache_dir.name).prepare()
+
+        tarball_calls = [args for args, _ in self.mocked_get.call_args_list if '/tarball/' in args[0]]
+        self.assertEqual(len(tarball_calls), 1)
+
+    def test_old_commits_removed(self):
+        for index, sha in enumerate(['old', 'previous']):
+            path = os.path.join(self.cache_dir.name, sha)
+            os.makedirs(path)
+            os.utime(path, (index, index))
+        os.makedirs(os.path.join(self.cache_dir.name, '.download-in-progress'))
+
+        GitHubTarballSource(ref='master', cache_dir=self.cache_dir.name).prepare()
+
+        self.assertEqual(
+            sorted(os.listdir(self.cache_dir.name)),
+            ['.download-in-progress', 'abc123', 'previous']
+        )
+
+
+def get_zip(files):
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, 'w') as zf:
+        for name, content in files.items():
+            zf.writestr(name, content)
+    return output.getvalue()
+
+
+REPO_FILES = {
+    'content/conditions/hernia/manifest.json': b'{"title": "Hernia"}',
+    'content/conditions/hernia/content-1.md': 'lorem ipsum –'.encode('utf-8'),
+    'content/conditions/hernia/types/manifest.json': b'{}',
+    'content/conditions/flu/manifest.json': b'{}',
+    'assets/images/image.png': b'\x89PNG',
+}
+
+
+class ArchiveSourceTestCase(TestCase):
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.root.cleanup()
+
+    def get_source(self, name, content, **kwargs):
+        path = os.path.join(self.root.name, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+
+        source = ArchiveSource(path, **kwargs)
+        source.prepare()
+        self.addCleanup(source.close)
+        return source
+
+    def assertSourceContent(self, source):
+        self.assertEqual(
+            source.get_data('/content/conditions/hernia/manifest.json', is_json=True),
+            {'title': 'Hernia'}
+        )
+        self.assertEqual(
+            source.get_data('/content/conditions/hernia/content-1.md'),
+            'lorem ipsum –'
+        )
+        self.assertEqual(source.get_data('/assets/images/image.png', is_file=True), b'\x89PNG')
+
+        self.assertEqual(source.get_children('conditions'), ['flu', 'hernia'])
+        self.assertEqual(source.get_children('/content/conditions/hernia'), ['types'])
+        self.assertEqual(source.get_children('/content/conditions/flu'), [])
+
+    def test_zip(self):
+        self.assertSourceContent(
+            self.get_source('content.zip', get_zip(REPO_FILES))
+        )
+
+    def test_tarball(self):
+        self.assertSourceContent(
+            self.get_source('content.tar.gz', get_tarball(REPO_FILES))
+        )
+
+    def test_context_manager(self):
+        path = os.path.join(self.root.name, 'content.zip')
+        with open(path, 'wb') as f:
+            f.write(get_zip(REPO_FILES))
+
+        with ArchiveSource(path) as source:
+            self.assertSourceContent(source)
+        self.assertIsNone(source.archive)
+
+    def test_missing_file(self):
+        source = self.get_source('content.zip', get_zip(REPO_FILES))
+        self.assertRaises(FileNotFoundError, source.get_data, '/content/conditions/missing/manifest.json')
+        self.assertRaises(FileNotFoundError, source.get_children, 'symptoms')
+
+    def test_invalid_archive(self):
+        self.assertRaises(ValueError, self.get_source, 'content.txt', b'lorem ipsum')
+
+
+class ExportLayoutTestCase(TestCase):
+    """
+    Tests related to importing the content exported by the exporter.
+    """
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        self.files = {
+            'content/conditions/hernia/manifest.json': json.dumps({
+                'title': 'Hernia',
+                'guide': True,
+                'content': {
+                    'main': [{'type': 'text', 'props': {'variant': 'markdown', 'value': '!file=content-1.md'}}]
+                },
+                'meta': {'children': [{'slug': 'types'}]}
+            }).encode(),
+            'content/conditions/hernia/content-1.md': b'lorem ipsum',
+            'content/conditions/hernia/types/manifest.json': b'{"title": "Types", "content": {}}',
+            'content/images/image-width-400.png': b'\x89PNG',
+        }
+
+    def tearDown(self):
+        self.root.cleanup()
+
+    def assertSourceContent(self, source):
+        source.prepare()
+        self.assertEqual(
+            source.get_data('/content/conditions/hernia/manifest.json', is_json=True),
+            {
+                'title': 'Hernia',
+                'guide': True,
+                'layout': 'guide',
+                'content': {
+                    'header': [],
+                    'main': [{'type': 'text', 'props': {'variant': 'markdown', 'value': '!file=content-1.md'}}]
+                },
+            }
+        )
+        self.assertEqual(
+            source.get_data('/content/conditions/hernia/types/manifest.json', is_json=True),
+            {'title': 'Types', 'layout': 'content-simple', 'content': {'header': [], 'main': []}}
+        )
+        self.assertEqual(source.get_data('/content/conditions/hernia/content-1.md'), 'lorem ipsum')
+        self.assertEqual(
+            source.get_data('/assets/images/image-width-400.png', is_file=True), b'\x89PNG'
+        )
+        self.assertEqual(source.get_children('conditions'), ['hernia'])
+        self.assertEqual(source.get_children('/content/conditions/hernia'), ['types'])
+
+    def test_directory(self):
+        for path, content in self.files.items():
+            write_file(self.root.name, path, content)
+
+        self.assertSourceContent(
+            DirectorySource(os.path.join(self.root.name, 'content'), layout=ExportLayout())
+        )
+
+    def test_zip(self):
+        path = os.path.join(self.root.name, 'content.zip')
+        with open(path, 'wb') as f:
+            f.write(get_zip(self.files))
+
+        self.assertSourceContent(ArchiveSource(path, layout=ExportLayout()))
+
+    def test_pages_in_site_folder(self):
+        """
+        Tests that the pages are found when exported inside the folder of the root page of the site.
+        """
+        for path, content in self.files.items():
+            path = path.replace('content/conditions', 'content/home/conditions')
+            write_file(self.root.name, path, content)
+
+        self.assertSourceContent(
+            DirectorySource(self.root.name, layout=ExportLayout())
+        )
+
+    def test_pages_not_found(self):
+        write_file(self.root.name, 'content/other/manifest.json', b'{}')
+
+        source = DirectorySource(self.root.name, layout=ExportLayout())
+        self.assertRaises(ValueError, source.prepare)
+
+
+class GetDefaultSourceTestCase(TestCase):
+    @override_settings(IMPORT_SOURCE='api')
+    def test_api(self):
+        self.assertTrue(isinstance(get_default_source(), GitHubAPISource))
+
+    @override_settings(IMPORT_SOURCE='local', IMPORT_PATH='/content.zip', IMPORT_EXPORT_LAYOUT=True)
+    def test_local_archive(self):
+        source = get_default_source()
+        self.assertTrue(isinstance(source, ArchiveSource))
+        self.assertEqual(source.path, '/content.zip')
+        self.assertTrue(isinstance(source.layout, ExportLayout))
+
+    @override_settings(IMPORT_SOURCE='local', IMPORT_PATH='')
+    def test_local_without_path(self):
+        self.assertRaises(ImproperlyConfigured, get_default_source)
+
+    @override_settings(IMPORT_SOURCE='other')
+    def test_invalid(self):
+        self.assertRaises(ImproperlyConfigured, get_default_source)
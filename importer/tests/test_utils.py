@@ -0,0 +1,145 @@
+import tempfile
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from ..utils import ResponseCache, make_request
+
+
+def get_response(status_code, headers=None, content=b'{}'):
+    return mock.MagicMock(
+        status_code=status_code, ok=status_code < 400,
+        headers=headers or {}, content=content
+    )
+
+
+class MockedSessionMixin(object):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch('importer.utils.get_session')
+        self.mocked_get = patcher.start().return_value.get
+        self.addCleanup(patcher.stop)
+
+
+@override_settings(
+    GITHUB_OAUTH_TOKEN='token', IMPORTER_MAX_RETRIES=2, IMPORTER_MAX_BACKOFF=60,
+    IMPORTER_RESPONSE_CACHE_DIR=''
+)
+@mock.patch('importer.utils.time.sleep')
+class MakeRequestTestCase(MockedSessionMixin, TestCase):
+    def test_success(self, mocked_sleep):
+        self.mocked_get.return_value = get_response(200, content=b'{"name": "test"}')
+
+        self.assertEqual(make_request('/content'), {'name': 'test'})
+        self.assertFalse(mocked_sleep.called)
+
+    def test_retry_after(self, mocked_sleep):
+        self.mocked_get.side_effect = [
+            get_response(403, headers={'Retry-After': '5'}),
+            get_response(200),
+        ]
+
+        self.assertEqual(make_request('/content'), {})
+        mocked_sleep.assert_called_once_with(5)
+
+    @mock.patch('importer.utils.time.time', return_value=1000)
+    def test_rate_limit_reset(self, mocked_time, mocked_sleep):
+        self.mocked_get.side_effect = [
+            get_response(403, headers={'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': '1010'}),
+            get_response(200),
+        ]
+
+        self.assertEqual(make_request('/content'), {})
+        mocked_sleep.assert_called_once_with(10)
+
+    def test_backoff_capped(self, mocked_sleep):
+        self.mocked_get.side_effect = [
+            get_response(429, headers={'Retry-After': '3600'}),
+            get_response(200),
+        ]
+
+        make_request('/content')
+        mocked_sleep.assert_called_once_with(60)
+
+    def test_gives_up(self, mocked_sleep):
+        self.mocked_get.return_value = get_response(429)
+
+        self.assertRaises(AssertionError, make_request, '/content')
+        self.assertEqual(self.mocked_get.call_count, 3)
+        self.assertEqual([args[0] for args, _ in mocked_sleep.call_args_list], [1, 2])
+
+    def test_forbidden_not_retried(self, mocked_sleep):
+        self.mocked_get.return_value = get_response(403)
+
+        self.assertRaises(AssertionError, make_request, '/content')
+        self.assertEqual(self.mocked_get.call_count, 1)
+
+
+@override_settings(GITHUB_OAUTH_TOKEN='token', IMPORTER_MAX_RETRIES=0)
+class ConditionalRequestTestCase(MockedSessionMixin, TestCase):
+    """
+    Tests related to the responses cached with their ETag between imports.
+    """
+    def setUp(self):
+        super().setUp()
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+
+        patcher = override_settings(IMPORTER_RESPONSE_CACHE_DIR=self.cache_dir.name)
+        patcher.enable()
+        self.addCleanup(patcher.disable)
+
+    def get_sent_headers(self):
+        _, kwargs = self.mocked_get.call_args
+        return kwargs['headers']
+
+    def test_not_modified(self):
+        """
+        Tests that the second time, the request is conditional and the cached content is used.
+        """
+        self.mocked_get.return_value = get_response(200, headers={'ETag': '"abc"'}, content=b'{"name": "test"}')
+        self.assertEqual(make_request('/content'), {'name': 'test'})
+        self.assertNotIn('If-None-Match', self.get_sent_headers())
+
+        self.mocked_get.return_value = get_response(304, content=b'')
+        self.assertEqual(make_request('/content'), {'name': 'test'})
+        self.assertEqual(self.get_sent_headers()['If-None-Match'], '"abc"')
+
+    def test_modified(self):
+        """
+        Tests that if the content changed, the new content and ETag replace the cached ones.
+        """
+        self.mocked_get.return_value = get_response(200, headers={'ETag': '"abc"'}, content=b'{"name": "test"}')
+        make_request('/content')
+
+        self.mocked_get.return_value = get_response(200, headers={'ETag': '"def"'}, content=b'{"name": "new"}')
+        self.assertEqual(make_request('/content'), {'name': 'new'})
+        self.assertEqual(self.get_sent_headers()['If-None-Match'], '"abc"')
+
+        self.mocked_get.return_value = get_response(304, content=b'')
+        self.assertEqual(make_request('/content'), {'name': 'new'})
+        self.assertEqual(self.get_sent_headers()['If-None-Match'], '"def"')
+
+    def test_without_etag(self):
+        """
+        Tests that responses without ETag are not cached.
+        """
+        self.mocked_get.return_value = get_response(200, content=b'{"name": "test"}')
+        make_request('/content')
+        make_request('/content')
+
+        self.assertNotIn('If-None-Match', self.get_sent_headers())
+
+    def test_corrupted_cache(self):
+        """
+        Tests that unreadable cached responses are ignored.
+        """
+        self.mocked_get.return_value = get_response(200, headers={'ETag': '"abc"'}, content=b'{"name": "test"}')
+        make_request('/content')
+
+        cache = ResponseCache(self.cache_dir.name)
+        with open(cache.get_path(self.mocked_get.call_args[0][0]), 'w') as f:
+            f.write('{invalid')
+
+        make_request('/content')
+        self.assertNotIn('If-None-Match', self.get_sent_headers())
@@ -1,14 +1,118 @@
-import base64
+import hashlib
 import json
+import logging
+import os
+import tempfile
+import threading
+import time
 
 import requests
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Returns the requests session shared by all the requests to GitHub so that
+    the connections are kept alive and reused by the threads of the importer.
+    """
+    global _session
+    with _session_lock:
+        if not _session:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_maxsize=max(settings.IMPORTER_WORKERS, 1))
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session = session
+    return _session
+
+
+class ResponseCache(object):
+    """
+    On-disk cache of the GitHub responses with their ETag, one file per url in `directory`.
+
+    It's used to make conditional requests so that unchanged files are not downloaded again.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+
+    def get_path(self, url):
+        return os.path.join(self.directory, hashlib.sha1(url.encode('utf-8')).hexdigest())
+
+    def get(self, url):
+        """
+        Returns the cached dict of {'etag', 'content'} of `url` or None if not cached.
+        """
+        try:
+            with open(self.get_path(url), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return entry if entry.get('url') == url else None
+
+    def set(self, url, etag, content):
+        """
+        Caches the `content` of `url` with its `etag`, replacing the file atomically
+        as other threads or imports might be reading it.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'url': url, 'etag': etag, 'content': content}, f)
+            os.replace(tmp_path, self.get_path(url))
+        except OSError:
+            logger.exception('Could not cache the response of %s', url)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+def get_response_cache():
+    """
+    Returns the ResponseCache in settings.IMPORTER_RESPONSE_CACHE_DIR or None if disabled.
+    """
+    if not settings.IMPORTER_RESPONSE_CACHE_DIR:
+        return None
+    return ResponseCache(settings.IMPORTER_RESPONSE_CACHE_DIR)
+
+
+def get_rate_limit_delay(response, attempt):
+    """
+    Returns the number of seconds to wait before retrying the request if `response`
+    was rate limited by GitHub, None otherwise.
+
+    It honours the Retry-After and X-RateLimit-Reset headers and falls back to an exponential
+    backoff, capped at settings.IMPORTER_MAX_BACKOFF.
+    """
+    if response.status_code not in (403, 429):
+        return None
+
+    if 'Retry-After' in response.headers:
+        delay = int(response.headers['Retry-After'])
+    elif response.headers.get('X-RateLimit-Remaining') == '0':
+        delay = int(response.headers.get('X-RateLimit-Reset', 0)) - time.time()
+    elif response.status_code == 429:
+        delay = 2 ** attempt
+    else:
+        return None  # forbidden for other reasons
+    return min(max(delay, 1), settings.IMPORTER_MAX_BACKOFF)
 
 
 def make_request(url_part):
     """
     Makes a request to GitHub to get the live content.
+
+    If the response of a previous import is cached, the request is conditional and
+    the cached content is used if it didn't change (304 responses don't count against
+    the GitHub rate limit).
+
+    Rate limited requests are retried up to settings.IMPORTER_MAX_RETRIES times.
     """
     if not settings.GITHUB_OAUTH_TOKEN:
         raise ImproperlyConfigured(
@@ -16,40 +120,30 @@ def make_request(url_part):
         )
 
     url = settings.IMPORT_URL_FORMAT.format(url_part=url_part)
-    response = requests.get(url, headers={
+    headers = {
         'Authorization': 'token %s' % settings.GITHUB_OAUTH_TOKEN
-    })
-    assert response.ok, response.content
-
-    return json.loads(response.content.decode('utf-8'))
+    }
 
+    cache = get_response_cache()
+    cached = cache and cache.get(url)
+    if cached:
+        headers['If-None-Match'] = cached['etag']
 
-def get_data_from_remote(url_part, is_json=False, is_file=False):
-    """
-    Returns the data related to the url identified by `url_part`.
-    If `is_json` == True, it returns the json representation.
-    If `is_file` == True it does not attempt to decode the content.
-    """
-    response_content = make_request(url_part)
-    data = base64.b64decode(response_content['content'])
-
-    if not is_file:
-        data = data.decode('utf-8')
+    for attempt in range(settings.IMPORTER_MAX_RETRIES + 1):
+        response = get_session().get(url, headers=headers)
 
-    if is_json:
-        data = json.loads(data)
-    return data
+        delay = get_rate_limit_delay(response, attempt)
+        if delay is None or attempt == settings.IMPORTER_MAX_RETRIES:
+            break
 
+        logger.warning('Rate limited by GitHub, retrying %s in %s seconds', url_part, delay)
+        time.sleep(delay)
 
-def get_list_of_children_from_remote(url_part):
-    """
-    Returns the subfolders of an item (e.g. conditions, symptoms).
-    url_part can be either a string e.g. 'conditions' relative to
-    the content folder or it can be an absolute url_part starting
-    from /content e.g. /content/conditions/hernia.
-    """
-    if not url_part.startswith('/content'):
-        url_part = '/content/%s' % url_part
+    if cached and response.status_code == 304:
+        return json.loads(cached['content'])
+    assert response.ok, response.content
 
-    data = make_request(url_part)
-    return [item['name'] for item in data if item['type'] == 'dir']
+    content = response.content.decode('utf-8')
+    if cache and response.headers.get('ETag'):
+        cache.set(url, response.headers['ETag'], content)
+    return json.loads(content)
@@ -1,10 +1,15 @@
-from django.contrib.auth.models import Permission
+from django.contrib.auth.models import Group, Permission
 from django.contrib.contenttypes.models import ContentType
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.urlresolvers import reverse
 from django.test import TestCase
 from django.test.utils import override_settings
 from wagtail.tests.utils import WagtailTestUtils
+from wagtail.wagtailcore.models import Collection, GroupCollectionPermission
+from wagtail.wagtailimages.tests.utils import get_test_image_file
 
+from images.factories import ImageFactory
+from images.models import Image
 from nhs_wagtailadmin.exceptions import DeprecatedException
 from nhs_wagtailadmin.views import generate_preview_signature
 from pages.factories import ConditionPageFactory
@@ -251,3 +256,94 @@ class RevisionViewTestCase(BaseRevisionPreviewTestCase):
         url = self.get_url(page_id=self.page.id, revision_id=self.revision.id + 1)
         response = self.client.get(url)
         self.assertEqual(response.status_code, 404)
+
+
+class AddImageTestCase(TestCase, WagtailTestUtils):
+    """
+    Tests related to uploading images already existing in the image library.
+    """
+    def setUp(self):
+        self.user = self.login()
+        self.image = ImageFactory(title='Existing image', file=get_test_image_file())
+
+    def get_uploaded_file(self, **kwargs):
+        return SimpleUploadedFile('test.png', get_test_image_file(**kwargs).file.getvalue())
+
+    def test_duplicate(self):
+        response = self.client.post(reverse('wagtailimages:add'), {
+            'title': 'New image',
+            'file': self.get_uploaded_file(),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'wagtailimages/images/add.html')
+        self.assertIn('already exists', response.context['form'].errors['file'][0])
+        self.assertEqual(response.context['form']['title'].value(), 'New image')
+        self.assertNotContains(response, reverse('wagtailimages:delete', args=(self.image.id,)))
+        self.assertNotContains(response, reverse('wagtailimages:edit', args=(self.image.id,)))
+
+        self.assertEqual(Image.objects.count(), 1)
+        self.image.refresh_from_db()
+        self.assertEqual(self.image.title, 'Existing image')
+
+    def test_duplicate_in_other_collection(self):
+        """
+        Tests that the title of an existing image is not shown to a user without permissions
+        on its collection.
+        """
+        collection = Collection.get_first_root_node().add_child(name='Other collection')
+        group = Group.objects.create(name='Other editors')
+        group.permissions.add(
+            Permission.objects.get(content_type__app_label='wagtailadmin', codename='access_admin')
+        )
+        GroupCollectionPermission.objects.create(
+            group=group, collection=collection,
+            permission=Permission.objects.get(content_type__app_label='wagtailimages', codename='add_image')
+        )
+        self.user.is_superuser = False
+        self.user.save()
+        self.user.groups.add(group)
+
+        response = self.client.post(reverse('wagtailimages:add'), {
+            'title': 'New image',
+            'file': self.get_uploaded_file(),
+            'collection': collection.id,
+        })
+        self.assertEqual(response.status_code, 200)
+        error = response.context['form'].errors['file'][0]
+        self.assertIn('already exists', error)
+        self.assertNotIn('Existing image', error)
+        self.assertNotContains(response, 'Existing image')
+        self.assertEqual(Image.objects.count(), 1)
+
+    def test_new_image(self):
+        response = self.client.post(reverse('wagtailimages:add'), {
+            'title': 'New image',
+            'file': self.get_uploaded_file(size=(100, 50)),
+        })
+        self.assertRedirects(response, reverse('wagtailimages:index'))
+        self.assertEqual(Image.objects.count(), 2)
+
+    def test_multiple_duplicate(self):
+        response = self.client.post(
+            reverse('wagtailimages:add_multiple'), {'files[]': self.get_uploaded_file()},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest'
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertFalse(data['success'])
+        self.assertIn('already exists', data['error_message'])
+        self.assertNotIn('image_id', data)
+        self.assertNotIn('form', data)
+
+        self.assertEqual(Image.objects.count(), 1)
+        self.image.refresh_from_db()
+        self.assertEqual(self.image.title, 'Existing image')
+
+    def test_multiple_new_image(self):
+        response = self.client.post(
+            reverse('wagtailimages:add_multiple'), {'files[]': self.get_uploaded_file(size=(100, 50))},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.json()['image_id'], self.image.id)
+        self.assertEqual(Image.objects.count(), 2)
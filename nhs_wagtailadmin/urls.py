@@ -21,6 +21,9 @@ urlpatterns = [
     url(r'^pages/moderation/(\d+)/preview/$', views.preview_for_moderation, name='preview_for_moderation'),
 
     url(r'^pages/(\d+)/revisions/(\d+)/view/$', views.revisions_view, name='revisions_view'),
+
+    url(r'^images/add/$', views.add_image, name='add_image'),
+    url(r'^images/multiple/add/$', views.add_multiple_images, name='add_multiple_images'),
 ]
 
 # Add "wagtailadmin.access_admin" permission check
@@ -4,16 +4,28 @@ import hmac
 
 from django.conf import settings
 from django.core.exceptions import PermissionDenied
-from django.http import HttpResponse
-from django.shortcuts import get_object_or_404, redirect
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404, redirect, render
 from django.utils.six import text_type
 from django.utils.translation import ugettext as _
 from django.views.decorators.http import require_GET
+from django.views.decorators.vary import vary_on_headers
 from wagtail.wagtailadmin import messages
+from wagtail.wagtailadmin.utils import PermissionPolicyChecker
 from wagtail.wagtailcore.models import Page, PageRevision
+from wagtail.wagtailimages import get_image_model
+from wagtail.wagtailimages.forms import get_image_form
+from wagtail.wagtailimages.permissions import \
+    permission_policy as images_permission_policy
+from wagtail.wagtailimages.views import images as images_views
+from wagtail.wagtailimages.views import multiple as multiple_images_views
+
+from images.models import get_file_hash, get_image_by_hash
 
 from .exceptions import DeprecatedException
 
+images_permission_checker = PermissionPolicyChecker(images_permission_policy)
+
 
 def generate_preview_signature(page_id, revision_id, key=None):
     """
@@ -101,3 +113,68 @@ def preview_via_POST_deprecated(*args, **kwargs):
         'This view has been deprecated in NHS.UK. '
         'Please use nhs_wagtailadmin.views.revisions_view instead'
     )
+
+
+def get_duplicate_image(uploaded_file):
+    """
+    Returns the existing image with the same content as `uploaded_file`, None otherwise.
+    """
+    if not uploaded_file:
+        return None
+    return get_image_by_hash(get_file_hash(uploaded_file))
+
+
+def get_duplicate_image_message(request, image):
+    """
+    Returns the error for uploading a duplicate of `image`, the title is only included if
+    the user has permissions on the collection of `image` so that it doesn't leak across collections.
+    """
+    accessible_images = images_permission_policy.instances_user_has_any_permission_for(
+        request.user, ['change', 'delete']
+    )
+    if not accessible_images.filter(pk=image.pk).exists():
+        return _("This image already exists in the library, please use that one instead.")
+    return _("This image already exists in the library as '{0}', please use that one instead.").format(image.title)
+
+
+@images_permission_checker.require('add')
+def add_image(request):
+    """
+    Same as the Wagtail view but if the uploaded file is the same as the one of an existing image,
+    the form is shown again with an error instead of creating a duplicate.
+    """
+    if request.method == 'POST':
+        image = get_duplicate_image(request.FILES.get('file'))
+        if image:
+            ImageModel = get_image_model()
+            form = get_image_form(ImageModel)(
+                request.POST, request.FILES,
+                instance=ImageModel(uploaded_by_user=request.user), user=request.user
+            )
+            form.is_valid()
+            form.add_error('file', get_duplicate_image_message(request, image))
+
+            messages.error(request, _("The image could not be created due to errors."))
+            return render(request, 'wagtailimages/images/add.html', {
+                'form': form,
+            })
+
+    return images_views.add(request)
+
+
+@images_permission_checker.require('add')
+@vary_on_headers('X-Requested-With')
+def add_multiple_images(request):
+    """
+    Same as the Wagtail view but if an uploaded file is the same as the one of an existing image,
+    it returns an error instead of creating a duplicate.
+    """
+    if request.method == 'POST' and request.is_ajax():
+        image = get_duplicate_image(request.FILES.get('files[]'))
+        if image:
+            return JsonResponse({
+                'success': False,
+                'error_message': get_duplicate_image_message(request, image),
+            })
+
+    return multiple_images_views.add(request)
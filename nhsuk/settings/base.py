@@ -14,6 +14,7 @@ from __future__ import absolute_import, unicode_literals
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 import os
+import tempfile
 
 PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 BASE_DIR = os.path.dirname(PROJECT_DIR)
@@ -117,6 +118,18 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/1.10/topics/cache/
+# local-memory by default, use a shared backend (e.g. memcached) when running multiple processes
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/1.10/topics/i18n/
 
@@ -155,6 +168,14 @@ OAUTH2_PROVIDER = {
     'SCOPES': {'read': 'Read scope'}
 }
 
+# max number of pages that can be requested in one go using the bulk endpoint
+API_BULK_PAGES_LIMIT = int(os.environ.get('API_BULK_PAGES_LIMIT', 100))
+
+# cache used for the API responses and number of seconds they are kept for, disabled if empty.
+# It has to be shared between processes (e.g. memcached), local-memory caches are ignored
+API_CACHE_ALIAS = os.environ.get('API_CACHE_ALIAS', '')
+API_CACHE_TIMEOUT = int(os.environ.get('API_CACHE_TIMEOUT', 60 * 60 * 24))
+
 # Wagtail settings
 
 WAGTAIL_SITE_NAME = "NHS.UK"
@@ -199,3 +220,108 @@ IMPORT_URL_FORMAT = os.environ.get(
     'https://api.github.com/repos/nhsuk/betahealth/contents{url_part}'
 )
 GITHUB_OAUTH_TOKEN = os.environ.get('GITHUB_OAUTH_TOKEN', '')
+
+# number of threads used to export pages, 1 exports them sequentially
+EXPORTER_WORKERS = int(os.environ.get('EXPORTER_WORKERS', 1))
+
+# comma-separated list of the filter specs of the renditions generated by the `pregenerate_renditions --queue`
+# worker as soon as an image is uploaded or changed, they default to the sizes used by the frontend and the exporter
+IMAGE_PREGENERATED_FILTER_SPECS = [
+    filter_spec.strip()
+    for filter_spec in os.environ.get(
+        'IMAGE_PREGENERATED_FILTER_SPECS',
+        'width-300,width-400,width-600,width-640,width-800,width-1280'
+    ).split(',')
+    if filter_spec.strip()
+]
+
+# number of processes used by the pregenerate_renditions management command
+IMAGE_PREGENERATION_PROCESSES = int(os.environ.get('IMAGE_PREGENERATION_PROCESSES', 2))
+
+# seconds between checks of the queue of images uploaded or changed by the
+# `pregenerate_renditions --queue` worker
+IMAGE_PREGENERATION_QUEUE_INTERVAL = float(os.environ.get('IMAGE_PREGENERATION_QUEUE_INTERVAL', 5))
+
+# alias of the cache used to make sure that only one worker at a time generates a rendition,
+# Postgres advisory locks are used instead if it's not shared between processes
+IMAGE_RENDITION_LOCK_CACHE_ALIAS = os.environ.get('IMAGE_RENDITION_LOCK_CACHE_ALIAS', 'default')
+
+# seconds after which the lock of a rendition expires if the worker generating it dies
+IMAGE_RENDITION_LOCK_TIMEOUT = int(os.environ.get('IMAGE_RENDITION_LOCK_TIMEOUT', 30))
+
+# seconds a request waits for a rendition being generated by another worker
+# before falling back to the original image
+IMAGE_RENDITION_LOCK_WAIT = float(os.environ.get('IMAGE_RENDITION_LOCK_WAIT', 3))
+
+# seconds browsers and CDNs can cache the images served, their urls change when they do
+IMAGE_SERVE_MAX_AGE = int(os.environ.get('IMAGE_SERVE_MAX_AGE', 31536000))
+
+# serve WebP renditions to the clients accepting them, if Pillow supports it
+IMAGE_WEBP_ENABLED = os.environ.get('IMAGE_WEBP_ENABLED', 'true').lower() == 'true'
+
+# quality of the WebP renditions, from 1 to 100
+IMAGE_WEBP_QUALITY = int(os.environ.get('IMAGE_WEBP_QUALITY', 80))
+
+# how the image serve view returns images: 'serve' streams them, 'redirect' redirects to their storage
+# and 'sendfile' lets the front proxy stream them (see IMAGE_SENDFILE_HEADER)
+IMAGE_SERVE_ACTION = os.environ.get('IMAGE_SERVE_ACTION', 'serve')
+
+# 'X-Accel-Redirect' (nginx) or 'X-Sendfile' (apache, lighttpd, uwsgi), used by the 'sendfile' action
+IMAGE_SENDFILE_HEADER = os.environ.get('IMAGE_SENDFILE_HEADER', 'X-Accel-Redirect')
+
+# internal location of the media files in nginx, used with X-Accel-Redirect
+IMAGE_SENDFILE_URL_PREFIX = os.environ.get('IMAGE_SENDFILE_URL_PREFIX', '/protected-media/')
+
+# max number of resolved image urls memoized by each process
+IMAGE_SERVE_MEMO_SIZE = int(os.environ.get('IMAGE_SERVE_MEMO_SIZE', 1024))
+
+# seconds the resolved image urls are memoized for by each process
+IMAGE_SERVE_MEMO_LOCAL_TIMEOUT = int(os.environ.get('IMAGE_SERVE_MEMO_LOCAL_TIMEOUT', 60))
+
+# alias of the cache used to share the resolved image urls between processes, not shared if empty
+IMAGE_SERVE_MEMO_CACHE_ALIAS = os.environ.get('IMAGE_SERVE_MEMO_CACHE_ALIAS', '')
+
+# seconds the resolved image urls are kept in the shared cache
+IMAGE_SERVE_MEMO_TIMEOUT = int(os.environ.get('IMAGE_SERVE_MEMO_TIMEOUT', 86400))
+
+# number of threads fetching the content from github in parallel during an import
+IMPORTER_WORKERS = int(os.environ.get('IMPORTER_WORKERS', 8))
+
+# max number of times a request rate limited by github is retried
+IMPORTER_MAX_RETRIES = int(os.environ.get('IMPORTER_MAX_RETRIES', 3))
+
+# max number of seconds to wait before retrying a request rate limited by github
+IMPORTER_MAX_BACKOFF = int(os.environ.get('IMPORTER_MAX_BACKOFF', 60))
+
+# folder where the responses of github are kept with their etags to only download the files
+# changed since the previous import, disabled if empty
+IMPORTER_RESPONSE_CACHE_DIR = os.environ.get(
+    'IMPORTER_RESPONSE_CACHE_DIR',
+    os.path.join(tempfile.gettempdir(), 'nhsuk-import-responses')
+)
+
+# where the content is imported from: 'api' uses the github contents api (one request per file),
+# 'tarball' downloads the whole content repo in one request, 'local' reads IMPORT_PATH
+IMPORT_SOURCE = os.environ.get('IMPORT_SOURCE', 'api')
+
+# local folder or zip/tar archive imported by the 'local' source and
+# whether it's in the layout written by the exporter instead of the one of the content repo
+IMPORT_PATH = os.environ.get('IMPORT_PATH', '')
+IMPORT_EXPORT_LAYOUT = os.environ.get('IMPORT_EXPORT_LAYOUT', '').lower() == 'true'
+
+# branch, tag or commit of the content repo imported by the 'tarball' source
+IMPORT_REF = os.environ.get('IMPORT_REF', 'master')
+IMPORT_COMMIT_URL_FORMAT = os.environ.get(
+    'IMPORT_COMMIT_URL_FORMAT',
+    'https://api.github.com/repos/nhsuk/betahealth/commits/{ref}'
+)
+IMPORT_TARBALL_URL_FORMAT = os.environ.get(
+    'IMPORT_TARBALL_URL_FORMAT',
+    'https://api.github.com/repos/nhsuk/betahealth/tarball/{ref}'
+)
+
+# folder where the content downloaded by the 'tarball' source is kept, one subfolder per commit
+IMPORTER_CACHE_DIR = os.environ.get(
+    'IMPORTER_CACHE_DIR',
+    os.path.join(tempfile.gettempdir(), 'nhsuk-import-cache')
+)
@@ -12,5 +12,11 @@ class DisableMigrations(object):
 
 MIGRATION_MODULES = DisableMigrations()
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    }
+}
+
 TEST_RUNNER = 'core.testing.runner.CustomTestSuiteRunner'
 FRONTEND_PREVIEW_URL = 'http://example.com/preview/{signature}/{page_id}/{revision_id}'
@@ -16,8 +16,8 @@ urlpatterns = [
     url(r'^api/', include(api_router.urls)),
 
     url(
-        r'^images/(?P<signature>[^/]*)/(?P<image_id>\d*)/(?P<filter_spec>[^/]*)/\d*/(?P<slug>[^/]*)$',
-        ServeView.as_view(), name='images_serve'
+        r'^images/(?P<signature>[^/]*)/(?P<image_id>\d*)/(?P<filter_spec>[^/]*)/(?P<version>\d*)/(?P<slug>[^/]*)$',
+        ServeView.as_view(action=settings.IMAGE_SERVE_ACTION), name='images_serve'
     ),
     url(r'', include(wagtail_urls)),
 ]
@@ -1,5 +1,10 @@
+from wagtail.wagtailcore.blocks import (
+    BaseStreamBlock, BaseStructBlock, ListBlock
+)
 from wagtail.wagtailcore.blocks.stream_block import \
     StreamBlock as WagtailStreamBlock
+from wagtail.wagtailcore.blocks.stream_block import StreamValue
+from wagtail.wagtailimages.blocks import ImageChooserBlock
 
 
 class StreamBlock(WagtailStreamBlock):
@@ -11,3 +16,46 @@ class StreamBlock(WagtailStreamBlock):
         if output:
             output = [{'type': item['type'], 'props': item['value']} for item in output]
         return output
+
+
+def get_image_ids(block, value):
+    """
+    Returns the set of ids of the images referenced in the raw JSON `value` of `block`
+    at any level of nesting (e.g. the images of a gallery inside tabs).
+    """
+    if not value:
+        return set()
+
+    if isinstance(block, ImageChooserBlock):
+        return {value}
+
+    if isinstance(block, BaseStreamBlock):
+        children = (
+            (block.child_blocks[item['type']], item.get('value'))
+            for item in value if item.get('type') in block.child_blocks
+        )
+    elif isinstance(block, BaseStructBlock):
+        children = (
+            (child_block, value.get(name))
+            for name, child_block in block.child_blocks.items()
+        )
+    elif isinstance(block, ListBlock):
+        children = ((block.child_block, item) for item in value)
+    else:
+        return set()
+
+    image_ids = set()
+    for child_block, child_value in children:
+        image_ids |= get_image_ids(child_block, child_value)
+    return image_ids
+
+
+def get_stream_image_ids(value):
+    """
+    Returns the set of ids of the images referenced in the StreamField `value`
+    or an empty set if `value` is not a StreamValue or has already been converted
+    to python objects.
+    """
+    if not isinstance(value, StreamValue) or not value.is_lazy:
+        return set()
+    return get_image_ids(value.stream_block, value.stream_data)
@@ -3,7 +3,8 @@ from unittest import TestCase
 from wagtail.wagtailcore.blocks.field_block import CharBlock
 from wagtail.wagtailcore.blocks.stream_block import StreamValue
 
-from pages.blocks import StreamBlock
+from pages import components
+from pages.blocks import StreamBlock, get_stream_image_ids
 
 
 class TestCharBlock(CharBlock):
@@ -42,3 +43,42 @@ class StreamBlockTestCase(TestCase):
             representation,
             [{'type': 'test', 'props': expected}]
         )
+
+
+class GetStreamImageIdsTestCase(TestCase):
+    def test_nested_images(self):
+        """
+        Tests that it returns the ids of the images at any level of nesting.
+        """
+        block = StreamBlock([
+            components.text.as_tuple(),
+            components.image.as_tuple(),
+            components.gallery.as_tuple(),
+            components.tabs.as_tuple(),
+        ])
+        value = StreamValue(block, [
+            {'type': 'text', 'value': {'variant': 'markdown', 'value': 'text'}},
+            {'type': 'image', 'value': 1},
+            {'type': 'gallery', 'value': {
+                'variant': 'inline',
+                'children': [
+                    {'type': 'image', 'value': 2},
+                    {'type': 'image', 'value': 3},
+                ]
+            }},
+            {'type': 'tabs', 'value': {
+                'variant': 'top',
+                'children': [
+                    {'type': 'tab', 'value': {
+                        'label': 'tab',
+                        'children': [{'type': 'image', 'value': 4}]
+                    }},
+                ]
+            }},
+            {'type': 'image', 'value': None},
+        ], is_lazy=True)
+
+        self.assertEqual(get_stream_image_ids(value), {1, 2, 3, 4})
+
+    def test_not_stream_value(self):
+        self.assertEqual(get_stream_image_ids('value'), set())